@@ -0,0 +1,5 @@
+"""
+An offline benchmark harness for syndicate.
+
+    python -m bench.run --help
+"""
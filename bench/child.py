@@ -0,0 +1,57 @@
+"""
+Runs syndicate once, as configured by the environment, and writes what it
+measured as JSON to the file named by `BENCH_METRICS`.
+
+This is run in a fresh interpreter by :mod:`bench.run` for every case, so that
+peak memory usage isn't muddied by the cases before it.
+"""
+import contextlib
+import json
+import os
+import resource
+import runpy
+import sys
+import time
+
+def main():
+    # Imported here so that import time counts towards the run.
+    start = time.perf_counter()
+    import frontmatter
+    parse = {'calls': 0, 'seconds': 0.0}
+    loads = frontmatter.loads
+    def _timed_loads(*args, **kwargs):
+        parse_start = time.perf_counter()
+        try:
+            return loads(*args, **kwargs)
+        finally:
+            parse['calls'] += 1
+            parse['seconds'] += time.perf_counter() - parse_start
+    frontmatter.loads = _timed_loads
+
+    error = None
+    with open(os.getenv('BENCH_LOG', os.devnull), 'w') as log, contextlib.redirect_stdout(log):
+        try:
+            if os.getenv('BENCH_TARGET') == 'elsewhere':
+                import syndicate
+                from syndicate.utils import iter_post_batches
+                for posts in iter_post_batches():
+                    syndicate.elsewhere(posts, os.getenv('INPUT_SILOS').splitlines())
+            else:
+                runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'entrypoint.py'), run_name='__main__')
+        except SystemExit:
+            pass
+        except Exception as err:
+            error = repr(err)
+
+    with open(os.getenv('BENCH_METRICS'), 'w') as f:
+        json.dump({
+            'wall_seconds': time.perf_counter() - start,
+            'parse_calls': parse['calls'],
+            'parse_seconds': parse['seconds'],
+            # NOTE ru_maxrss is in kilobytes on Linux, but bytes on macOS.
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+            'error': error,
+        }, f)
+
+if __name__ == '__main__':
+    main()
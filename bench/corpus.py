@@ -0,0 +1,55 @@
+"""
+Synthetic corpora of markdown posts for benchmarking.
+"""
+import os
+import random
+import subprocess
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod '
+    'tempor incididunt ut labore et dolore magna aliqua ut enim ad minim veniam '
+    'quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo'
+).split()
+
+def generate(count, post_dir='posts', paragraphs=20, synced=0.0, seed=0):
+    """
+    Returns a dictionary of `count` markdown posts with YAML frontmatter,
+    encoded as bytes and keyed by their path in `post_dir`, along with a
+    dictionary of the DEV articles already syndicated from the `synced`
+    fraction of them, keyed by article ID.
+    """
+    rng = random.Random(seed)
+    files = {}
+    articles = {}
+    for n in range(count):
+        title = f"Post number {n}, {' '.join(rng.choices(WORDS, k=4))}"
+        frontmatter = [f'title: {title}', f"tags: {', '.join(rng.sample(WORDS, 3))}", f'date: 2020-01-{n % 28 + 1:02d}']
+        if rng.random() < synced:
+            frontmatter.append(f'dev_silo_id: {n + 1}')
+        body = '\n\n'.join(
+            ' '.join(rng.choices(WORDS, k=rng.randint(40, 120))).capitalize() + '.'
+            for _ in range(paragraphs)
+        )
+        contents = '---\n' + '\n'.join(frontmatter) + '\n---\n' + body + '\n'
+        files[f'{post_dir}/post-{n:05d}.md'] = contents.encode('utf-8')
+        if f'dev_silo_id: {n + 1}' in frontmatter:
+            articles[n + 1] = {'body_markdown': 'an older version of ' + title}
+    return files, articles
+
+def checkout(files, directory):
+    """
+    (SIDE-EFFECT) Commits the given files to a new git repo in `directory`, as
+    if it had been checked out by a workflow, and returns the commit SHA.
+    """
+    def _git(*args):
+        return subprocess.run(['git', *args], cwd=directory, check=True, capture_output=True, text=True).stdout.strip()
+    _git('init', '-q')
+    _git('config', 'user.email', 'bench@localhost')
+    _git('config', 'user.name', 'bench')
+    for path, contents in files.items():
+        os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(directory, path), 'wb') as f:
+            f.write(contents)
+    _git('add', '-A')
+    _git('commit', '-qm', 'initial')
+    return _git('rev-parse', 'HEAD')
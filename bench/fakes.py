@@ -0,0 +1,358 @@
+"""
+Local stand-ins for the Github REST API and the DEV API, just convincing enough
+to run syndicate end to end against, with configurable latency, error rates and
+rate limits.
+"""
+import base64
+import collections
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+class FakeServer:
+    """
+    A threaded HTTP server answering requests via the `routes` of a subclass,
+    and counting them as it goes.
+
+    Every request is delayed by `latency` seconds. A fraction of them given by
+    `error_rate` fail with a 502, and no more than `rate_limit[0]` requests are
+    answered every `rate_limit[1]` seconds before the rest get a 429.
+    """
+    routes = []
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit=None, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.requests = collections.Counter()
+        self.statuses = collections.Counter()
+        self._random = random.Random(seed)
+        self._window = collections.deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def dispatch(self, method, path, query, body, headers):
+        """Returns the `(status, headers, payload)` answer to the given request."""
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests[method] += 1
+            throttle = self._throttle()
+            fail = self._random.random() < self.error_rate
+        if throttle:
+            return (429, {'Retry-After': str(throttle), 'X-RateLimit-Remaining': '0'}, {'error': 'slow down'})
+        if fail:
+            return (502, {}, {'error': 'bad gateway'})
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return handler(self, query, body, headers, *match.groups())
+        return (404, {}, {'message': f'Not Found: {method} {path}'})
+
+    def _throttle(self):
+        """Returns the seconds to wait if this request is over the rate limit, else 0."""
+        if not self.rate_limit:
+            return 0
+        capacity, period = self.rate_limit
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - period:
+            self._window.popleft()
+        if len(self._window) >= capacity:
+            return math.ceil(self._window[0] + period - now)
+        self._window.append(now)
+        return 0
+
+class FakeGithub(FakeServer):
+    """
+    A Github REST API serving a single repository with a single branch, whose
+    only commit added the given `files` (a dictionary of bytes keyed by path).
+    """
+    def __init__(self, files, repository='bench/corpus', branch='main', head_sha=None, **kwargs):
+        super().__init__(**kwargs)
+        self.repository = repository
+        self.branch = branch
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        tree = self._add_tree({path:self._add_blob(contents) for path, contents in files.items()})
+        self.head = head_sha or hashlib.sha1(f'commit {tree}'.encode('utf-8')).hexdigest()
+        self.commits[self.head] = {'tree': tree, 'parents': [], 'message': 'initial'}
+
+    def _add_blob(self, contents):
+        sha = hashlib.sha1(b'blob %d\0' % len(contents) + contents).hexdigest()
+        self.blobs[sha] = contents
+        return sha
+
+    def _add_tree(self, entries):
+        sha = hashlib.sha1(json.dumps(sorted(entries.items())).encode('utf-8')).hexdigest()
+        self.trees[sha] = entries
+        return sha
+
+    def _repo_url(self):
+        return f'{self.url}/repos/{self.repository}'
+
+    def _tree_of(self, sha):
+        return self.trees[self.commits[sha]['tree']] if sha in self.commits else self.trees[sha]
+
+    def _changes(self, before, after):
+        old, new = (self._tree_of(before) if before else {}), self._tree_of(after)
+        changes = []
+        for path in sorted(set(old) | set(new)):
+            if path not in new:
+                changes.append({'filename': path, 'status': 'removed', 'sha': old[path]})
+            elif path not in old:
+                changes.append({'filename': path, 'status': 'added', 'sha': new[path]})
+            elif old[path] != new[path]:
+                changes.append({'filename': path, 'status': 'modified', 'sha': new[path]})
+        return changes
+
+    def get_repo(self, query, body, headers):
+        return (200, {}, {
+            'id': 1,
+            'name': self.repository.split('/')[-1],
+            'full_name': self.repository,
+            'url': self._repo_url(),
+            'default_branch': self.branch,
+        })
+
+    def get_commit(self, query, body, headers, sha):
+        if sha not in self.commits:
+            return (404, {}, {'message': 'No commit found'})
+        parents = self.commits[sha]['parents']
+        files = self._changes(parents[0] if parents else None, sha)
+        return (200, {}, {
+            'sha': sha,
+            'url': f'{self._repo_url()}/commits/{sha}',
+            'files': files,
+            'total_files': len(files),
+        })
+
+    def get_compare(self, query, body, headers, before, after):
+        return (200, {}, {'url': f'{self._repo_url()}/compare/{before}...{after}', 'files': self._changes(before, after), 'commits': []})
+
+    def get_tree(self, query, body, headers, sha):
+        return (200, {}, {
+            'sha': sha,
+            'url': f'{self._repo_url()}/git/trees/{sha}',
+            'truncated': False,
+            'tree': [
+                {'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob}
+                for path, blob in self._tree_of(sha).items()
+            ],
+        })
+
+    def get_blob(self, query, body, headers, sha):
+        contents = self.blobs[sha]
+        return (200, {}, {'sha': sha, 'size': len(contents), 'encoding': 'base64', 'content': base64.b64encode(contents).decode('ascii')})
+
+    def get_contents(self, query, body, headers, path):
+        sha = self._tree_of(query.get('ref', self.head))[path]
+        contents = self.blobs[sha]
+        return (200, {}, {
+            'type': 'file',
+            'path': path,
+            'name': path.split('/')[-1],
+            'sha': sha,
+            'encoding': 'base64',
+            'content': base64.b64encode(contents).decode('ascii'),
+        })
+
+    def get_git_commit(self, query, body, headers, sha):
+        commit = self.commits[sha]
+        return (200, {}, {
+            'sha': sha,
+            'url': f'{self._repo_url()}/git/commits/{sha}',
+            'tree': {'sha': commit['tree'], 'url': f"{self._repo_url()}/git/trees/{commit['tree']}"},
+            'parents': [{'sha': parent} for parent in commit['parents']],
+            'message': commit['message'],
+        })
+
+    def post_tree(self, query, body, headers):
+        entries = dict(self._tree_of(body['base_tree'])) if body.get('base_tree') else {}
+        for element in body['tree']:
+            entries[element['path']] = self._add_blob(element['content'].encode('utf-8'))
+        sha = self._add_tree(entries)
+        return (201, {}, {'sha': sha, 'url': f'{self._repo_url()}/git/trees/{sha}', 'tree': []})
+
+    def post_commit(self, query, body, headers):
+        sha = hashlib.sha1(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+        self.commits[sha] = {'tree': body['tree'], 'parents': body['parents'], 'message': body['message']}
+        return (201, {}, {'sha': sha, 'url': f'{self._repo_url()}/git/commits/{sha}'})
+
+    def get_ref(self, query, body, headers, ref):
+        return (200, {}, {'ref': f'refs/{ref}', 'url': f'{self._repo_url()}/git/refs/{ref}', 'object': {'sha': self.head, 'type': 'commit'}})
+
+    def patch_ref(self, query, body, headers, ref):
+        if not body.get('force') and self.head not in self._ancestors(body['sha']):
+            return (422, {}, {'message': 'Update is not a fast forward'})
+        self.head = body['sha']
+        return self.get_ref(query, body, headers, ref)
+
+    def graphql(self, query, body, headers):
+        """Answers just the GraphQL queries and mutations syndicate makes."""
+        variables = body.get('variables') or {}
+        head = self._tree_of(self.head)
+        if 'createCommitOnBranch' in body['query']:
+            changes = variables['input']
+            if changes['expectedHeadOid'] != self.head:
+                return (200, {}, {
+                    'data': {'createCommitOnBranch': None},
+                    'errors': [{'type': 'STALE_DATA', 'message': f"Expected branch to point to \"{changes['expectedHeadOid']}\" but it did not."}],
+                })
+            entries = dict(head)
+            for addition in changes['fileChanges'].get('additions', []):
+                entries[addition['path']] = self._add_blob(base64.b64decode(addition['contents']))
+            tree = self._add_tree(entries)
+            sha = hashlib.sha1(f"commit {tree} {self.head}".encode('utf-8')).hexdigest()
+            self.commits[sha] = {'tree': tree, 'parents': [self.head], 'message': changes['message']['headline']}
+            self.head = sha
+            return (200, {}, {'data': {'createCommitOnBranch': {'commit': {'oid': sha}}}})
+        oid = variables.get('revision', self.head)
+        if oid.endswith('^'):
+            oid = self.commits[oid[:-1]]['parents'][0]
+        tree = self._tree_of(oid)
+        target = {'oid': oid}
+        for alias, variable in re.findall(r'(\w+): file\(path: \$(\w+)\)', body['query']):
+            path = variables[variable]
+            target[alias] = {'object': {'text': self.blobs[tree[path]].decode('utf-8')}} if path in tree else None
+        if 'object(expression:' in body['query']:
+            return (200, {}, {'data': {'repository': {'object': target}}})
+        return (200, {}, {'data': {'repository': {'ref': {'target': target}}}})
+
+    def _ancestors(self, sha):
+        seen, queue = set(), [sha]
+        while queue:
+            current = queue.pop()
+            if current in seen or current not in self.commits:
+                continue
+            seen.add(current)
+            queue.extend(self.commits[current]['parents'])
+        return seen
+
+    _repo = r'/repos/[^/]+/[^/]+'
+    routes = [
+        ('GET', _repo, get_repo),
+        ('GET', _repo + r'/commits/([^/]+)', get_commit),
+        ('GET', _repo + r'/compare/([^.]+)\.\.\.(.+)', get_compare),
+        ('GET', _repo + r'/git/trees/([^/]+)', get_tree),
+        ('GET', _repo + r'/git/blobs/([^/]+)', get_blob),
+        ('GET', _repo + r'/contents/(.+)', get_contents),
+        ('GET', _repo + r'/git/commits/([^/]+)', get_git_commit),
+        ('POST', _repo + r'/git/trees', post_tree),
+        ('POST', _repo + r'/git/commits', post_commit),
+        ('GET', _repo + r'/git/refs?/(.+)', get_ref),
+        ('PATCH', _repo + r'/git/refs?/(.+)', patch_ref),
+        ('POST', r'/graphql', graphql),
+    ]
+
+class FakeDev(FakeServer):
+    """
+    A DEV API serving the articles of a single account, optionally starting out
+    with some `articles` (dictionaries of article attributes keyed by ID).
+    """
+    def __init__(self, articles=None, **kwargs):
+        super().__init__(**kwargs)
+        self.articles = {id:self._article(id, article) for id, article in (articles or {}).items()}
+        self._ids = itertools.count(max(self.articles, default=0) + 1)
+
+    def _article(self, id, article):
+        body = article.get('body_markdown', '')
+        title = re.search(r'^title:\s*(.*)$', body, re.MULTILINE)
+        return dict(
+            article,
+            id=id,
+            title=title.group(1).strip() if title else None,
+            url=f'{self.url}/bench/article-{id}',
+            published=bool(article.get('published')),
+        )
+
+    def list_articles(self, query, body, headers):
+        page, per_page = int(query.get('page', 1)), int(query.get('per_page', 30))
+        articles = [self.articles[id] for id in sorted(self.articles)]
+        return (200, {}, articles[(page - 1) * per_page:page * per_page])
+
+    def create_article(self, query, body, headers):
+        if not headers.get('api-key'):
+            return (401, {}, {'error': 'unauthorized'})
+        with self._lock:
+            id = next(self._ids)
+            self.articles[id] = self._article(id, body['article'])
+        return (201, {}, self.articles[id])
+
+    def update_article(self, query, body, headers, id):
+        id = int(id)
+        if id not in self.articles:
+            return (404, {}, {'error': 'not found'})
+        with self._lock:
+            self.articles[id] = self._article(id, dict(self.articles[id], **body['article']))
+        return (200, {}, self.articles[id])
+
+    routes = [
+        ('GET', r'/api/articles/me/all', list_articles),
+        ('POST', r'/api/articles', create_article),
+        ('PUT', r'/api/articles/(\d+)', update_article),
+    ]
+
+### privates ###
+
+def _handler_for(fake):
+    """Returns a request handler class which hands every request to `fake`."""
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # NOTE Otherwise delayed ACKs add ~40ms to every keep-alive request.
+        disable_nagle_algorithm = True
+
+        def _answer(self):
+            url = urllib.parse.urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            query = dict(urllib.parse.parse_qsl(url.query))
+            status, headers, payload = fake.dispatch(
+                self.command,
+                urllib.parse.unquote(url.path),
+                query,
+                body,
+                {key.lower():value for key, value in self.headers.items()}
+            )
+            data = json.dumps(payload).encode('utf-8')
+            if self.command == 'GET' and status == 200:
+                etag = f'"{hashlib.sha1(data).hexdigest()}"'
+                headers = dict(headers, ETag=etag)
+                if self.headers.get('If-None-Match') == etag:
+                    status, data = 304, b''
+            with fake._lock:
+                fake.statuses[status] += 1
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _answer
+
+        def log_message(self, format, *args):
+            pass
+    return _Handler
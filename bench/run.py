@@ -0,0 +1,106 @@
+"""
+Runs syndicate end to end against local stand-ins for Github and DEV, over
+synthetic corpora of posts, and reports how long it took, how many requests it
+made, how much memory it used and how long it spent parsing posts.
+
+    python -m bench.run --posts 10 100 1000 --latency 0.05
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench import corpus
+from bench.fakes import FakeDev, FakeGithub
+
+COLUMNS = ('posts', 'wall_seconds', 'github_requests', 'dev_requests', 'dev_429s', 'dev_5xxs', 'parse_calls', 'parse_seconds', 'peak_rss_mb')
+
+def run_case(posts, args):
+    """Returns the metrics of a single run of syndicate over a corpus of `posts` posts."""
+    files, articles = corpus.generate(posts, paragraphs=args.paragraphs, synced=args.synced)
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = os.path.join(tmp, 'workspace')
+        os.makedirs(workspace)
+        head = corpus.checkout(files, workspace) if args.source == 'local' else None
+        github = FakeGithub(files, head_sha=head, latency=args.latency)
+        dev = FakeDev(
+            articles,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            rate_limit=tuple(args.rate_limit) if args.rate_limit else None
+        )
+        with github, dev:
+            env = dict(
+                os.environ,
+                BENCH_METRICS=os.path.join(tmp, 'metrics.json'),
+                BENCH_LOG=args.log or os.devnull,
+                BENCH_TARGET=args.target,
+                GITHUB_API_URL=github.url,
+                GITHUB_GRAPHQL_URL=f'{github.url}/graphql',
+                GITHUB_TOKEN='bench',
+                GITHUB_REPOSITORY=github.repository,
+                GITHUB_REF=f'refs/heads/{github.branch}',
+                GITHUB_SHA=github.head,
+                GITHUB_WORKSPACE=workspace,
+                RUNNER_TEMP=os.path.join(tmp, 'runner'),
+                DEV_API_URL=f'{dev.url}/api',
+                DEV_API_KEY='bench',
+                # NOTE The stand-in enforces its own rate limit, if any.
+                DEV_RATE_LIMIT='none',
+                INPUT_SILOS='DEV',
+                INPUT_MARK_AS_SYNDICATED=json.dumps(args.mark),
+                SYNDICATE_CONTENT_SOURCE=args.source,
+                SYNDICATE_BACKFILL='all',
+                SYNDICATE_POST_DIR='posts',
+            )
+            subprocess.run(
+                [sys.executable, '-m', 'bench.child'],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                env=env,
+                check=True
+            )
+            with open(env['BENCH_METRICS']) as f:
+                metrics = json.load(f)
+        metrics.update(
+            posts=posts,
+            github_requests=sum(github.requests.values()),
+            dev_requests=sum(dev.requests.values()),
+            dev_429s=dev.statuses[429],
+            dev_5xxs=sum(count for status, count in dev.statuses.items() if status >= 500),
+        )
+        return metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, nargs='+', default=[10, 100, 1000], help='corpus sizes to run (default: %(default)s)')
+    parser.add_argument('--paragraphs', type=int, default=20, help='paragraphs per post (default: %(default)s)')
+    parser.add_argument('--synced', type=float, default=0.5, help='fraction of posts already on DEV (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request (default: %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of DEV requests that fail with a 502 (default: %(default)s)')
+    parser.add_argument('--rate-limit', type=float, nargs=2, metavar=('REQUESTS', 'SECONDS'), help='DEV rate limit (default: none)')
+    parser.add_argument('--source', choices=('github', 'local'), default='github', help='where to read posts from (default: %(default)s)')
+    parser.add_argument('--target', choices=('entrypoint', 'elsewhere'), default='entrypoint', help='what to run (default: %(default)s)')
+    parser.add_argument('--mark', action='store_true', help='mark syndicated posts, too')
+    parser.add_argument('--log', help='write the action log of each run to this file')
+    parser.add_argument('--json', help='also write the results to this file, as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    print('  '.join(f'{column:>15}' for column in COLUMNS))
+    for posts in args.posts:
+        metrics = run_case(posts, args)
+        results.append(metrics)
+        print('  '.join(
+            f'{metrics[column]:>15.3f}' if isinstance(metrics[column], float) else f'{metrics[column]:>15}'
+            for column in COLUMNS
+        ))
+        if metrics['error']:
+            print(f'  ! {metrics["error"]}', file=sys.stderr)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Measures how long the action takes to start up and get out of the way when it
+has nothing to do, and which heavy dependencies it loads while doing so.
+
+    python -m bench.startup --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Dependencies which take long enough to import that no-op steps should avoid them.
+HEAVY_MODULES = ('github', 'requests', 'frontmatter', 'yaml')
+# Steps which shouldn't need to talk to anything.
+CASES = {
+    'no silos': {'INPUT_SILOS': '', 'INPUT_MARK_AS_SYNDICATED': 'false'},
+    'nothing to mark': {'INPUT_SILOS': '', 'INPUT_MARK_AS_SYNDICATED': 'true'},
+}
+
+def run_case(env, runs):
+    """Returns the wall times of `runs` runs of the entrypoint in `env`, and the heavy modules it imported."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entrypoint = os.path.join(root, 'entrypoint.py')
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, entrypoint], cwd=root, env=env, check=True, capture_output=True)
+        seconds.append(time.perf_counter() - start)
+    imports = subprocess.run(
+        [sys.executable, '-X', 'importtime', entrypoint],
+        cwd=root, env=env, check=True, capture_output=True, text=True
+    ).stderr
+    loaded = {line.rpartition('|')[2].strip() for line in imports.splitlines() if line.startswith('import time:')}
+    return seconds, sorted(module for module in HEAVY_MODULES if module in loaded)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='runs of each case (default: %(default)s)')
+    parser.add_argument('--json', help='also write the results to this file, as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        interpreter = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', 'pass'], check=True)
+            interpreter.append(time.perf_counter() - start)
+        print(f"{'case':>16}  {'median_seconds':>15}  {'over_python':>15}  heavy imports")
+        for case, inputs in CASES.items():
+            env = dict(
+                os.environ,
+                GITHUB_SHA='0' * 40,
+                GITHUB_REPOSITORY='bench/corpus',
+                GITHUB_REF='refs/heads/main',
+                RUNNER_TEMP=tmp,
+                **inputs
+            )
+            seconds, heavy = run_case(env, args.runs)
+            median = statistics.median(seconds)
+            overhead = median - statistics.median(interpreter)
+            results.append({'case': case, 'median_seconds': median, 'over_python_seconds': overhead, 'heavy_imports': heavy})
+            print(f"{case:>16}  {median:>15.3f}  {overhead:>15.3f}  {', '.join(heavy) or '-'}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -2,63 +2,93 @@
 from datetime import datetime
 import json
 import os
-import sys
-import syndicate
-from syndicate.utils import action_log, action_setoutput, job_getoutput, job_addoutput, get_posts, fronted, mark_syndicated_posts
+from syndicate import checkpoint, coalesce, profiling
+from syndicate.utils import action_log, action_setinstrumentation, action_setoutput, job_getoutput, job_addoutput, iter_post_batches, fronted, merge_results, prefetch, read_posts, removed_posts, DEFAULT_BATCH_SIZE, DEFAULT_READ_SIZE
 
 action_inputs = {
     'silos': os.getenv('INPUT_SILOS').splitlines(),
     'mark_as_syndicated': json.loads(os.getenv('INPUT_MARK_AS_SYNDICATED'))
 }
+backfill = os.getenv('SYNDICATE_BACKFILL')
+unpublishing = os.getenv('SYNDICATE_UNPUBLISH', 'false').lower() == 'true'
+batch_size = int(os.getenv('SYNDICATE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+read_size = int(os.getenv('SYNDICATE_READ_SIZE', DEFAULT_READ_SIZE))
+# How many reads of posts may be done ahead of the posts being syndicated.
+READ_AHEAD = 2
 
-posts = get_posts()
-if not posts:
-    action_log("No posts added or updated, nothing to do.")
-    action_setoutput("time", datetime.now())
-    sys.exit()
-
-# Do the thing.
-# Result set format:
-# {
-#     '<silo>': {
-#         'added': {
-#             'path/to/new_post': ( <silo post id>, <silo post URL> ),
-#             ...
-#         },
-#         'modified': {
-#             'path/to/updated_post': ( <silo post id>, <silo post URL> ),
-#             ...
-#         },
-#     },
-#     ...
-# }
-syndicated_posts = syndicate.elsewhere(posts, action_inputs['silos']) or {}
-action_setoutput('syndicated_posts', syndicated_posts)
-# Merge output with output of any previous runs
-job_addoutput(syndicated_posts)
-
-if action_inputs['mark_as_syndicated']:
-    action_log("Marking newly syndicated posts...")
-    ## NOTE
-    # If silos were provided, commit only the results of this step. In the case
-    # where no silos were provided, commit all job results so far.
-    #
-    # This allows us to bundle syndications into as few or many commits as we
-    # want in our workflows.
-    ##
-    if not action_inputs['silos']:
-       syndicated_posts = job_getoutput()
+def syndicate_posts(posts):
+    """Syndicates the given posts, and returns the results."""
+    # NOTE Only loaded when there's something to syndicate.
+    import syndicate
+    # Do the thing.
+    # Result set format:
+    # {
+    #     '<silo>': {
+    #         'added': {
+    #             'path/to/new_post': ( <silo post id>, <silo post URL> ),
+    #             ...
+    #         },
+    #         'modified': {
+    #             'path/to/updated_post': ( <silo post id>, <silo post URL> ),
+    #             ...
+    #         },
+    #     },
+    #     ...
+    # }
+    syndicated_posts = syndicate.elsewhere(posts, action_inputs['silos']) or {}
+    # Merge output with output of any previous runs
+    job_addoutput(syndicated_posts)
+    return syndicated_posts
+
+def finish_batch(syndicated_posts, posts):
+    """
+    Marks the given batch of syndicated posts as syndicated if asked to, and
+    remembers they're done if backfilling.
+    """
+    if action_inputs['mark_as_syndicated']:
+        mark(syndicated_posts, posts)
+    if backfill:
+        checkpoint.add(action_inputs['silos'], [post.path for post in posts])
 
-    # Just focus on the added ones.
+def unpublish_removed(exclude=()):
+    """
+    Unpublishes the posts removed by the commit(s) this workflow was triggered
+    for, except those in `exclude`, and returns the results; or None if there
+    were none.
+    """
+    posts = removed_posts(exclude=exclude)
+    if not posts:
+        return None
+    # NOTE Only loaded when there's something to unpublish.
+    import syndicate
+    # Result set format:
+    # {
+    #     '<silo>': {
+    #         'removed': {
+    #             'path/to/removed_post': ( <silo post id>, <silo post URL> ),
+    #             ...
+    #         },
+    #     },
+    #     ...
+    # }
+    unpublished_posts = syndicate.unpublish(posts, action_inputs['silos']) or {}
+    job_addoutput(unpublished_posts)
+    return unpublished_posts
+
+def mark(syndicated_posts, posts):
+    """Marks the given posts as added to the silos that the given results say they were added to."""
+    action_log("Marking newly syndicated posts...")
+    # Just focus on the added ones in this batch.
+    paths = {post.path for post in posts}
     indexed_paths_by_silo = {
-        silo: results['added']
+        silo: {path:result for path, result in results['added'].items() if path in paths}
         for silo, results in syndicated_posts.items()
         if results and 'added' in results
     }
 
     if not indexed_paths_by_silo or not any(indexed_paths_by_silo.values()):
         action_log("Nothing new to mark.")
-        sys.exit()
+        return
 
     # {
     #     'path/to/post': {
@@ -74,9 +104,107 @@ if action_inputs['mark_as_syndicated']:
             silo_ids_by_path.setdefault(path, {})
             silo_ids_by_path[path][silo] = sid
 
+    # NOTE Only loaded when there's something to mark.
+    from syndicate.marking import mark_syndicated_posts
     mark_syndicated_posts(
         silo_ids_by_path,
-        {post.path:fronted(post) for post in posts}
+        {post.path:fronted(post) for post in posts if post.path in silo_ids_by_path}
     )
 
-action_setoutput("time", datetime.now())
+def mark_job_results():
+    """
+    Marks every post added to a silo by previous steps of this job, reading
+    only those posts.
+    """
+    syndicated_posts = job_getoutput()
+    paths = sorted({path for results in syndicated_posts.values() for path in (results.get('added') or {})})
+    if not paths:
+        action_log("Nothing new to mark.")
+        return
+    mark(syndicated_posts, read_posts(paths))
+
+def syndicate_all(exclude=()):
+    """
+    Syndicates the posts this workflow was triggered for, except those in
+    `exclude`, as they're read, and unpublishes the removed ones if asked to;
+    returning the results, or None if there were no posts to syndicate.
+    """
+    ## NOTE
+    # When backfilling, posts are syndicated a batch at a time, remembering which
+    # ones are done so that a failed run can pick up where it left off.
+    ##
+    done = checkpoint.load(action_inputs['silos']) if backfill else set()
+    if done:
+        action_log(f"Picking up where we left off, {len(done)} posts are already done.")
+
+    ## NOTE
+    # Posts are read a few at a time, and syndicated as soon as they've been
+    # read, while the next few are read. They're marked and checkpointed a whole
+    # batch at a time though, so as not to make a commit for every few posts.
+    ##
+    syndicated_posts = None
+    batch, batch_results = [], {}
+    for posts in prefetch(iter_post_batches(batch_size=read_size, exclude=done | set(exclude)), size=READ_AHEAD):
+        if not posts:
+            continue
+        results = syndicate_posts(posts)
+        syndicated_posts = merge_results(syndicated_posts or {}, results)
+        batch_results = merge_results(batch_results, results)
+        batch.extend(posts)
+        if len(batch) >= batch_size:
+            finish_batch(batch_results, batch)
+            batch, batch_results = [], {}
+    if batch:
+        finish_batch(batch_results, batch)
+
+    if backfill:
+        checkpoint.clear(action_inputs['silos'])
+
+    ## NOTE
+    # Posts removed from the repo are only unpublished if asked to.
+    ##
+    if unpublishing:
+        unpublished_posts = unpublish_removed(exclude)
+        if unpublished_posts:
+            syndicated_posts = merge_results(syndicated_posts or {}, unpublished_posts)
+    return syndicated_posts
+
+def main():
+    """Syndicates the posts this workflow was triggered for, and sets the outputs of this step."""
+    ## NOTE
+    # If silos were provided, commit only the results of this step. In the case
+    # where no silos were provided, commit all job results so far.
+    #
+    # This allows us to bundle syndications into as few or many commits as we
+    # want in our workflows, and such marking-only steps needn't look at any
+    # posts but the ones to mark.
+    ##
+    if not action_inputs['silos']:
+        if action_inputs['mark_as_syndicated']:
+            mark_job_results()
+        else:
+            action_log("No silos specified, nothing to do.")
+        action_setinstrumentation()
+        action_setoutput("time", datetime.now())
+        return
+
+    ## NOTE
+    # When coalescing, runs for successive pushes to the same branch take turns,
+    # and leave posts changed again since to the runs for the later pushes.
+    ##
+    if coalesce.coalescing():
+        with coalesce.lease():
+            syndicated_posts = syndicate_all(exclude=coalesce.catch_up(backfill))
+    else:
+        syndicated_posts = syndicate_all()
+
+    if syndicated_posts is None:
+        action_log("No posts added or updated, nothing to do.")
+    else:
+        action_setoutput('syndicated_posts', json.dumps(syndicated_posts))
+    action_setinstrumentation()
+    action_setoutput("time", datetime.now())
+
+if __name__ == '__main__':
+    with profiling.profiled():
+        main()
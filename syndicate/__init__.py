@@ -1,7 +1,6 @@
-from syndicate.utils import action_log, action_warn
+from syndicate import journal, ledger, registry
+from syndicate.utils import action_log, action_warn, concurrently, merge_results, silo_id_for, Post
 
-import functools
-import importlib.util
 import os
 import sys
 
@@ -35,6 +34,16 @@ def elsewhere(posts, silos):
     Where possible, silo adapters should only create posts in a 'draft' or
     unpublished status, to allow time for review and any platform-specific
     changes to be made by the author.
+
+    Posts that a silo already has, and whose contents haven't changed since they
+    were last sent there, are skipped entirely.
+    @see :func:`~syndicate.ledger.is_unchanged`
+
+    The outcome for every post and silo is appended to a journal as each silo
+    finishes. When resuming a failed run, posts the journal says were already
+    syndicated successfully are not sent again; their journaled results are
+    returned instead.
+    @see :func:`~syndicate.journal.resuming`
     """
     if not posts:
         action_log("No posts to syndicate, nothing to syndicate.")
@@ -45,43 +54,155 @@ def elsewhere(posts, silos):
 
     silos = list(set(silos))  # de-dupe the given list of silos
     action_log(f"You want to publish to these places: {silos}")
-
-    specs = {silo:_locate(silo) for silo in silos if _locate(silo)}
-    if list(specs.keys()) != silos:
-        action_warn(f"I don't know how to publish to these places: { [silo for silo in silos if silo not in specs] }")
-
-    api_keys = {silo:_get_api_key(silo) for silo in silos if _get_api_key(silo)}
-    if list(api_keys.keys()) != silos:
-        action_warn(f"I don't have API keys for these places: { [silo for silo in silos if silo not in api_keys] }")
+    api_keys = _usable(silos)
+    # NOTE Every silo and record is handed the same posts, so that each post is
+    # only parsed and rewritten once, however many of them look at it.
+    posts = [Post.of(post) for post in posts]
 
     action_log("I'll do what I can.")
-    results = {
-        silo:_syndicate(spec, api_keys[silo], posts)
-        for silo, spec in specs.items()
-        if silo in api_keys
-    }
+    # NOTE
+    # Silos are independent of one another, so syndicate to all of them at
+    # once. Each adapter is responsible for limiting its own concurrency.
+    # @see :func:`~syndicate.registry.workers_for`
+    known_content = ledger.load()
+    outcomes = journal.load() if journal.resuming() else None
+    def _syndicate_to(silo):
+        changed_posts = [post for post in posts if not ledger.is_unchanged(known_content, silo, post)]
+        if len(changed_posts) < len(posts):
+            action_log(f"{silo} already has the latest version of {len(posts) - len(changed_posts)} of these posts, skipping them.")
+        done = journal.successes(outcomes, silo, changed_posts)
+        if done:
+            action_log(f"{silo} got {sum(len(paths) for paths in done.values())} of these posts last time, skipping them.")
+        pending_posts = [post for post in changed_posts if not any(post.path in paths for paths in done.values())]
+        results = {'added': {}, 'modified': {}}
+        if pending_posts:
+            results = _syndicate(silo, api_keys[silo], pending_posts)
+            journal.record(silo, results, pending_posts)
+            ledger.record(known_content, silo, results, pending_posts)
+        return merge_results({silo: results}, {silo: done})[silo] if done else results
+
+    targets = list(api_keys)
+    results = dict(zip(targets, concurrently(_syndicate_to, targets, max_workers=len(targets))))
+    ledger.save(known_content)
     if results:
         return results
     else:
         action_warn("Sorry, can't do anything with that!")
         return None
 
+def unpublish(posts, silos):
+    """
+    Unpublishes the given posts, which have been removed from this repo, from
+    each of the given silos that they have a silo ID for; and returns a
+    dictionary of the results keyed by the silo that generated them.
+
+    If a silo has no defined adapter, or its adapter can't unpublish posts (i.e.
+    has no `unpublish` entrypoint), it is ignored.
+    If a silo has no defined API key, it is ignored.
+
+    Result dictionary is formatted like so:
+
+        {
+            <silo>: {
+              'removed': {
+                 <path/to/post>: <silo id>,
+                 ...
+              }
+            },
+            ...
+        }
+
+    Adapters should unpublish posts in whatever way leaves them recoverable on
+    the silo, e.g. by turning them back into drafts or archiving them, rather
+    than deleting them outright.
+    """
+    if not posts:
+        action_log("No posts removed, nothing to unpublish.")
+        return None
+    if not silos:
+        action_log('No silos specified, nowhere to unpublish from.')
+        return None
+
+    silos = list(set(silos))  # de-dupe the given list of silos
+    action_log(f"You want to unpublish {len(posts)} removed posts from these places: {silos}")
+    api_keys = _usable(silos)
+
+    known_content = ledger.load()
+    def _unpublish_from(silo):
+        adapter = registry.load(silo)
+        if not hasattr(adapter, 'unpublish'):
+            action_warn(f"I don't know how to unpublish posts from {silo}, leaving them there.")
+            return {'removed': {}}
+        published_posts = [post for post in posts if silo_id_for(post, silo)]
+        if not published_posts:
+            action_log(f"None of these posts were ever on {silo}, nothing to unpublish.")
+            return {'removed': {}}
+        results = _in_batches(silo, adapter.unpublish, published_posts, api_keys[silo])
+        # NOTE Should a post come back, it needs sending again.
+        ledger.forget(known_content, silo, [path for path, result in results.get('removed', {}).items() if result])
+        return results
+
+    targets = list(api_keys)
+    results = dict(zip(targets, concurrently(_unpublish_from, targets, max_workers=len(targets))))
+    ledger.save(known_content)
+    return results or None
+
 ### privates ###
 
-@functools.lru_cache(maxsize=10)
-def _locate(silo):
-    """Locates the given silo adapter and returns its Python module name if found."""
+def _syndicate(silo, api_key, posts):
+    """
+    Loads and invokes the entrypoint of the adapter for the given silo, within
+    the limits of its capabilities, returning the results.
+
+    Posts too big for the silo are left out, and the rest are handed over in
+    batches as big as it can take.
+    @see :func:`~syndicate.registry.capabilities`
+    """
     if not silo:
         raise ValueError('missing silo')
-    return getattr(importlib.util.find_spec(f'syndicate.silos.{silo.lower()}'), 'name', None)
-
-def _syndicate(silo_spec, api_key, posts):
-    """Loads and invokes the entrypoint of the given silo adaptor, returning the results."""
-    if not silo_spec:
-        raise ValueError('missing silo spec')
     if not api_key:
         raise ValueError('missing API key')
-    return importlib.import_module(silo_spec).syndicate(posts, api_key)
+    adapter = registry.load(silo)
+    capabilities = registry.capabilities(silo)
+    if capabilities.max_payload_bytes:
+        too_big = [post for post in posts if len(getattr(post, 'decoded_content', b'')) > capabilities.max_payload_bytes]
+        if too_big:
+            action_warn(f"These posts are too big for {silo}, skipping them: {[post.path for post in too_big]}")
+            posts = [post for post in posts if post not in too_big]
+            if not posts:
+                return {'added': {}, 'modified': {}}
+    return _in_batches(silo, adapter.syndicate, posts, api_key)
+
+def _in_batches(silo, entrypoint, posts, api_key):
+    """
+    Invokes the given entrypoint of the adapter for the given silo on the given
+    posts, in batches as big as it can take, returning the merged results.
+    @see :func:`~syndicate.registry.capabilities`
+    """
+    batch_size = registry.capabilities(silo).batch_size or len(posts)
+    if batch_size >= len(posts):
+        return entrypoint(posts, api_key)
+    results = {}
+    for start in range(0, len(posts), batch_size):
+        results = merge_results(results, {silo: entrypoint(posts[start:start + batch_size], api_key)})
+    return results[silo]
+
+def _usable(silos):
+    """
+    Returns the API keys of those of the given silos which have both an adapter
+    and an API key, keyed by silo; warning about the rest.
+    """
+    # NOTE Adapters are only located here; they're loaded when first used.
+    specs = {silo:registry.locate(silo) for silo in silos}
+    specs = {silo:spec for silo, spec in specs.items() if spec}
+    if list(specs.keys()) != silos:
+        action_warn(f"I don't know how to publish to these places: { [silo for silo in silos if silo not in specs] }")
+
+    api_keys = {silo:_get_api_key(silo) for silo in silos}
+    api_keys = {silo:api_key for silo, api_key in api_keys.items() if api_key}
+    if list(api_keys.keys()) != silos:
+        action_warn(f"I don't have API keys for these places: { [silo for silo in silos if silo not in api_keys] }")
+    return {silo:api_key for silo, api_key in api_keys.items() if silo in specs}
 
 def _get_api_key(silo):
     """Returns the API key for the given silo, as defined in the environment."""
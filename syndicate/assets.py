@@ -0,0 +1,164 @@
+from syndicate.utils import action_log, action_warn, blob_shas, parent_sha, read_posts, state_path, Post
+
+import functools
+import json
+import os
+import posixpath
+import re
+import threading
+import urllib.parse
+
+# Markdown images, e.g. ![alt](path/to/image.png "title")
+MARKDOWN_IMAGE = re.compile(r'(!\[[^\]]*\]\(\s*<?)([^)\s>]+)(>?(?:\s+(?:"[^"]*"|\'[^\']*\'))?\s*\))')
+# HTML images, e.g. <img src="path/to/image.png">
+HTML_IMAGE = re.compile(r'(<img\b[^>]*?\bsrc\s*=\s*["\'])([^"\']+)(["\'])', re.IGNORECASE)
+
+def rewrite(post, namespace='github', resolve=None):
+    """
+    Returns the text of the given post with every image it links to in this
+    repo by a relative path linked to by an absolute URL instead, so that they
+    still show up when the post is syndicated.
+
+    By default, images are linked to where Github serves their raw contents as
+    of the latest known commit. Silos which host images themselves can pass a
+    `resolve` function taking the path and contents of an image and returning
+    its URL, along with a `namespace` to cache those URLs under.
+
+    Images are identified by their blob SHA, and their URLs cached by it, so
+    each image is only resolved once no matter how many posts or runs use it.
+    @see :func:`~syndicate.assets.cache_path`
+
+    (MEMOIZED) A :class:`~syndicate.utils.Post` is only rewritten once for each
+    `namespace`, however many times its rewritten text is asked for.
+
+    Rewriting can be turned off by setting `SYNDICATE_REWRITE_ASSETS` to 'false'.
+    """
+    if not post:
+        raise ValueError("missing post")
+    text = post.text
+    if os.getenv('SYNDICATE_REWRITE_ASSETS', 'true').lower() == 'false':
+        return text
+    if not isinstance(post, Post):
+        return _rewrite(post, namespace, resolve)
+    if namespace not in post.rewrites:
+        post.rewrites[namespace] = _rewrite(post, namespace, resolve)
+    return post.rewrites[namespace]
+
+def raw_url(path, sha=None):
+    """
+    Returns the URL at which Github serves the raw contents of the given file in
+    this repo, as of the given commit (by default, the latest known one).
+    """
+    if not os.getenv('GITHUB_REPOSITORY'):
+        raise ValueError("missing GITHUB_REPOSITORY")
+    sha = sha or parent_sha()
+    quoted = urllib.parse.quote(path)
+    server = os.getenv('GITHUB_SERVER_URL', 'https://github.com').rstrip('/')
+    if server == 'https://github.com':
+        return f"https://raw.githubusercontent.com/{os.getenv('GITHUB_REPOSITORY')}/{sha}/{quoted}"
+    # NOTE Github Enterprise doesn't have a raw.githubusercontent.com.
+    return f"{server}/{os.getenv('GITHUB_REPOSITORY')}/raw/{sha}/{quoted}"
+
+def cache_path():
+    """
+    Returns the path of the asset URL cache, or None if it isn't kept anywhere.
+
+    The cache lives wherever `SYNDICATE_ASSET_CACHE` says it does; point it at a
+    cached file to share it across workflow runs as well.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    return state_path('SYNDICATE_ASSET_CACHE', 'assets.json')
+
+### privates ###
+
+def _rewrite(post, namespace, resolve):
+    """Returns the text of the given post with its images linked to as by :func:`rewrite`."""
+    text = post.text
+    targets = {
+        match.group(2): _repo_path(post.path, match.group(2))
+        for pattern in (MARKDOWN_IMAGE, HTML_IMAGE)
+        for match in pattern.finditer(text)
+    }
+    targets = {target:path for target, path in targets.items() if path}
+    if not targets:
+        return text
+    shas = blob_shas(targets.values())
+    urls = {}
+    for target, path in targets.items():
+        url = _url_for(namespace, resolve, path, shas[path]) if path in shas else None
+        if url:
+            urls[target] = url
+    if not urls:
+        return text
+
+    def _replace(match):
+        return match.group(1) + urls.get(match.group(2), match.group(2)) + match.group(3)
+    return HTML_IMAGE.sub(_replace, MARKDOWN_IMAGE.sub(_replace, text))
+
+def _repo_path(post_path, target):
+    """
+    Returns the path in this repo of the given link target of the given post,
+    or None if it doesn't point into this repo.
+    """
+    url = urllib.parse.urlsplit(target)
+    if url.scheme or url.netloc or not url.path:
+        return None
+    path = urllib.parse.unquote(url.path)
+    if path.startswith('/'):
+        path = path.lstrip('/')
+    else:
+        path = posixpath.join(posixpath.dirname(post_path), path)
+    path = posixpath.normpath(path)
+    return None if path.startswith('..') else path
+
+def _url_for(namespace, resolve, path, sha):
+    """
+    Returns the URL of the given image, resolving and caching it if it hasn't
+    been already; or None if it can't be resolved.
+    """
+    cache = _cache(cache_path())
+    key = f'{namespace}:{sha}'
+    with _lock:
+        if key in cache:
+            return cache[key]
+    if resolve:
+        url = resolve(path, read_posts([path])[0].decoded_content)
+    else:
+        url = raw_url(path)
+    if not url:
+        action_warn(f"Couldn't resolve a URL for '{path}', leaving it be.")
+        return None
+    action_log(f"Linking to '{path}' as {url}")
+    with _lock:
+        cache[key] = url
+        _save(cache)
+    return url
+
+@functools.lru_cache(maxsize=32)
+def _cache(path):
+    """
+    (MEMOIZED) Returns the asset URL cache kept at the given path, keyed by
+    namespace and blob SHA.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        action_warn(f"Ignoring unreadable asset cache at {path}")
+        return {}
+
+def _save(cache):
+    """(SIDE-EFFECT) Writes the given asset URL cache to disk, if it's kept anywhere."""
+    path = cache_path()
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+# Posts are syndicated concurrently, and all share the same cache.
+_lock = threading.Lock()
@@ -0,0 +1,55 @@
+from syndicate.utils import state_path
+
+import hashlib
+import os
+
+def load(silos):
+    """
+    Returns the set of paths already dealt with by an earlier, unfinished run
+    of this action syndicating to the given silos.
+    @see :func:`~syndicate.checkpoint.checkpoint_path`
+    """
+    path = checkpoint_path(silos)
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+def add(silos, paths):
+    """
+    (SIDE-EFFECT) Notes that the given paths have been dealt with by this run of
+    the action syndicating to the given silos.
+    """
+    path = checkpoint_path(silos)
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        f.writelines(f'{p}\n' for p in paths)
+        f.flush()
+        os.fsync(f.fileno())
+
+def clear(silos):
+    """(SIDE-EFFECT) Forgets the progress of this run of the action, now that it's finished."""
+    path = checkpoint_path(silos)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def checkpoint_path(silos):
+    """
+    Returns the path of the checkpoint file for a run of the action syndicating
+    to the given silos, or None if checkpointing is disabled.
+
+    Checkpoints are kept in the directory named by `SYNDICATE_CHECKPOINT_DIR`.
+    Each `SYNDICATE_SHARD` of a run has its own checkpoint, so shards can share
+    the directory.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    directory = state_path('SYNDICATE_CHECKPOINT_DIR')
+    if not directory:
+        return None
+    key = ','.join(sorted(silo.lower() for silo in silos))
+    if os.getenv('SYNDICATE_SHARD'):
+        key += f"@{os.getenv('SYNDICATE_SHARD')}"
+    key = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(directory, f'checkpoint-{key}')
@@ -0,0 +1,182 @@
+from syndicate.utils import action_log, action_setenv, action_warn, branch_name, parent_sha, repo, span
+
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+# How long a lease is good for unless otherwise specified, in seconds.
+DEFAULT_LEASE_TTL = 600
+# How long to wait between checks on a lease held by someone else, in seconds.
+LEASE_POLL_INTERVAL = 5
+# How many times a lease is renewed over the course of its TTL while held.
+LEASE_RENEWALS = 3
+# Commits made by this action, which never supersede anything.
+OWN_COMMIT_PREFIX = '(syndicate):'
+
+def coalescing():
+    """
+    Returns True if this run should coalesce its work with that of the runs
+    for any commits pushed after the one that triggered it.
+    @see :func:`~syndicate.coalesce.catch_up`
+    """
+    return os.getenv('SYNDICATE_COALESCE', 'false').lower() == 'true'
+
+@contextlib.contextmanager
+def lease(ttl=None):
+    """
+    (SIDE-EFFECT) Holds the syndication lease on the branch that triggered this
+    Github workflow for the duration of the managed block, waiting for any other
+    run holding it to let go first; so that runs for successive pushes don't
+    write to silos at the same time.
+
+    The lease is a ref in this repo pointing at a commit whose message says who
+    holds it and until when. It is renewed in the background while the block
+    runs, so that it's only ever held past its expiry (and taken over) by a run
+    which is no longer around to renew it, e.g. one that was cancelled.
+
+    `ttl` defaults to `SYNDICATE_LEASE_TTL` seconds, or `DEFAULT_LEASE_TTL`.
+    """
+    ttl = float(ttl or os.getenv('SYNDICATE_LEASE_TTL', DEFAULT_LEASE_TTL))
+    holder = f"{os.getenv('GITHUB_RUN_ID', 'local')}-{secrets.token_hex(4)}"
+    with span('acquire lease'):
+        _acquire(holder, ttl)
+    stop = threading.Event()
+    # NOTE Running in a copy of the current context ensures things like the
+    # environment of the run carry over into the background thread.
+    renewer = threading.Thread(target=contextvars.copy_context().run, args=(_keep, holder, ttl, stop), daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+        _release(holder)
+
+def catch_up(backfill=os.getenv('SYNDICATE_BACKFILL')):
+    """
+    Moves this run up to the current head of the branch that triggered it, and
+    returns the paths of the files that commits pushed since then have changed,
+    and which the runs for those pushes will syndicate.
+
+    Those files have been superseded: the runs for those pushes will syndicate
+    their latest contents, so this one needn't. Everything else is read as of
+    the branch head, so nothing is syndicated from stale contents.
+
+    Which files are superseded depends on `backfill`, as it does for the later
+    runs: by default, each run only syndicates the head commit of its push, so
+    only the files changed by the latest commit pushed are superseded; when
+    backfilling 'push', the files changed by any commit since are.
+    @see :func:`~syndicate.utils.parent_sha`
+    @see :func:`~syndicate.utils.iter_post_batches`
+    """
+    with span('catch up'):
+        base = parent_sha()
+        head = _branch_head()
+        if head == base:
+            return set()
+        comparison = repo().compare(base, head)
+        # NOTE Marking commits are pushed with the GITHUB_TOKEN, which never
+        # triggers a workflow run of its own.
+        commits = [
+            commit for commit in comparison.commits
+            if not commit.commit.message.startswith(OWN_COMMIT_PREFIX)
+        ]
+        if backfill != 'push':
+            commits = commits[-1:]
+        superseded = set()
+        for commit in commits:
+            superseded.update(file.filename for file in repo().get_commit(commit.sha).files)
+        action_log(f"{branch_name()} has moved on to {head}, which supersedes {len(superseded)} files.")
+        action_setenv('SYNDICATE_SHA', head)
+        os.environ['SYNDICATE_SHA'] = head
+        return superseded
+
+### privates ###
+
+def _acquire(holder, ttl):
+    """(SIDE-EFFECT) Takes the lease for `holder` once it's free."""
+    from github import GithubException
+    sha = made = None
+    while True:
+        # NOTE The commit identifying the lease is made afresh once it's as old
+        # as the time between renewals, so that a lease taken after a long wait
+        # is still good for most of its TTL; but not for every attempt, since
+        # Github limits how fast content can be created.
+        if sha is None or time.time() - made > ttl / LEASE_RENEWALS:
+            made = time.time()
+            sha = _lease_commit(holder, ttl)
+        try:
+            repo().create_git_ref(_lease_ref(), sha)
+            action_log(f"Took the lease on {branch_name()}.")
+            return
+        except GithubException as err:
+            if err.status != 422:  # it already exists
+                raise
+        ref = repo().get_git_ref(_lease_ref()[len('refs/'):])
+        current = _lease_of(ref.object.sha)
+        if current.get('expires', 0) < time.time():
+            action_warn(f"Taking over the lease on {branch_name()} from {current.get('holder')}, which let it expire.")
+            ref.edit(sha, force=True)
+            # NOTE Someone else may have taken it over at the same time.
+            if repo().get_git_ref(_lease_ref()[len('refs/'):]).object.sha == sha:
+                return
+            continue
+        action_log(f"Waiting for {current.get('holder')} to let go of the lease on {branch_name()}...")
+        time.sleep(LEASE_POLL_INTERVAL)
+
+def _keep(holder, ttl, stop):
+    """(SIDE-EFFECT) Renews the lease held by `holder` regularly, until told to stop."""
+    while not stop.wait(ttl / LEASE_RENEWALS):
+        _renew(holder, ttl)
+
+def _renew(holder, ttl):
+    """(SIDE-EFFECT) Pushes back the expiry of the lease held by `holder`, if it still holds it."""
+    try:
+        ref = repo().get_git_ref(_lease_ref()[len('refs/'):])
+        current = _lease_of(ref.object.sha)
+        if current.get('holder') != holder:
+            action_warn(f"Lost the lease on {branch_name()} to {current.get('holder')}.")
+            return
+        ref.edit(_lease_commit(holder, ttl), force=True)
+    except Exception as err:  # NOTE Never fail a run over this, it'll be tried again.
+        action_warn(f"Failed to renew the lease on {branch_name()}: {err}")
+
+def _release(holder):
+    """(SIDE-EFFECT) Lets go of the given lease, unless someone else has taken it over."""
+    try:
+        current = repo().get_git_ref(_lease_ref()[len('refs/'):])
+        if _lease_of(current.object.sha).get('holder') == holder:
+            current.delete()
+            action_log(f"Let go of the lease on {branch_name()}.")
+    except Exception as err:  # NOTE Never fail a run over this.
+        action_warn(f"Failed to let go of the lease on {branch_name()}, it will expire on its own: {err}")
+
+def _lease_commit(holder, ttl):
+    """
+    Returns the SHA of a new commit identifying the lease held by `holder` for
+    the next `ttl` seconds; parentless and empty.
+    """
+    return repo().create_git_commit(
+        json.dumps({'holder': holder, 'expires': time.time() + ttl}),
+        repo().create_git_tree([]),
+        []
+    ).sha
+
+def _lease_of(sha):
+    """Returns the holder and expiry of the lease identified by the given commit."""
+    try:
+        return json.loads(repo().get_git_commit(sha).message)
+    except ValueError:
+        return {}
+
+def _branch_head():
+    """Returns the SHA the branch that triggered this workflow currently points to."""
+    return repo().get_git_ref(f'heads/{branch_name()}').object.sha
+
+def _lease_ref():
+    """Returns the name of the ref holding the lease on the branch that triggered this workflow."""
+    return f'refs/syndicate/leases/{branch_name()}'
@@ -0,0 +1,95 @@
+from syndicate import http
+from syndicate.utils import action_error
+
+import os
+import requests
+
+# Requests to the Github GraphQL API share the limits of the Github silo.
+SILO_NAME = 'GITHUB'
+# The most files read by a single query, to stay well within the node limits.
+# @see https://docs.github.com/en/graphql/overview/rate-limits-and-node-limits-for-the-graphql-api
+MAX_FILES_PER_QUERY = 100
+
+def request(query, variables, idempotent=False):
+    """
+    Returns the decoded response to the given query of the Github GraphQL API,
+    or None if the request itself failed.
+
+    Requests are POSTs, so they're only retried after failures that may have
+    reached Github if they're `idempotent`, i.e. not mutations.
+    @see :func:`~syndicate.http.request`
+    """
+    response = http.request(
+        SILO_NAME,
+        'POST',
+        os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql'),
+        headers={'Authorization': f"bearer {os.getenv('GITHUB_TOKEN')}"},
+        json={'query': query, 'variables': variables},
+        idempotent=idempotent,
+    )
+    if response.status_code != requests.codes.ok:
+        action_error(f"Github GraphQL request failed: {http.error_details(response)}")
+        return None
+    return response.json()
+
+def read_files(paths, ref=None, revision=None):
+    """
+    Returns the SHA of the commit the given `ref` points to (or the one named by
+    the given `revision`, e.g. 'abc123^'), along with the text of each of the
+    given paths as of that commit, keyed by path; reading as many files per
+    request as it can.
+
+    Paths which don't exist in that commit are left out.
+    """
+    if not os.getenv('GITHUB_REPOSITORY'):
+        raise ValueError("missing GITHUB_REPOSITORY")
+    if not ref and not revision:
+        raise ValueError("missing ref or revision")
+    paths = list(paths)
+    oid = None
+    texts = {}
+    for start in range(0, len(paths), MAX_FILES_PER_QUERY):
+        # NOTE Once the first request has resolved which commit is meant, the
+        # rest read from that same commit, in case the ref moves meanwhile.
+        oid, chunk = _read_chunk(paths[start:start + MAX_FILES_PER_QUERY], None if oid else ref, oid or revision)
+        texts.update(chunk)
+    if oid is None:
+        oid, _ = _read_chunk([], ref, revision)
+    return oid, texts
+
+### privates ###
+
+def _read_chunk(paths, ref, revision):
+    """
+    Returns the SHA of the commit named by the given revision, or the one the
+    given ref points to, along with the text of each of the given paths as of
+    it; in a single request.
+    """
+    owner, _, name = os.getenv('GITHUB_REPOSITORY').partition('/')
+    files = ''.join(f' f{n}: file(path: $p{n}) {{ object {{ ... on Blob {{ text }} }} }}' for n in range(len(paths)))
+    files = f' ... on Commit {{{files} }}' if paths else ''
+    parameters = ''.join(f', $p{n}: String!' for n in range(len(paths)))
+    if revision:
+        query = (
+            f'query($owner: String!, $name: String!, $revision: String!{parameters})'
+            f' {{ repository(owner: $owner, name: $name) {{ object(expression: $revision) {{ oid{files} }} }} }}'
+        )
+        variables = {'owner': owner, 'name': name, 'revision': revision}
+    else:
+        query = (
+            f'query($owner: String!, $name: String!, $ref: String!{parameters})'
+            f' {{ repository(owner: $owner, name: $name) {{ ref(qualifiedName: $ref) {{ target {{ oid{files} }} }} }} }}'
+        )
+        variables = {'owner': owner, 'name': name, 'ref': ref}
+    response = request(query, dict(variables, **{f'p{n}': path for n, path in enumerate(paths)}), idempotent=True)
+    if response is None or response.get('errors'):
+        raise ValueError(f"failed to read files at {revision or ref}: {response and response.get('errors')}")
+    repository = response['data']['repository']
+    commit = repository['object'] if revision else (repository['ref'] or {}).get('target')
+    if not commit:
+        raise ValueError(f"no such commit as {revision or ref}")
+    return commit['oid'], {
+        path: commit[f'f{n}']['object']['text']
+        for n, path in enumerate(paths)
+        if commit.get(f'f{n}') and commit[f'f{n}'].get('object')
+    }
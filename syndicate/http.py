@@ -0,0 +1,191 @@
+from syndicate import ratelimit, registry
+from syndicate.utils import action_log, action_warn, record_request
+
+import email.utils
+import functools
+import os
+import random
+import requests
+from requests.adapters import HTTPAdapter
+import time
+import urllib.parse
+import urllib3
+
+# The number of times a failed request is retried unless otherwise specified.
+DEFAULT_RETRIES = 3
+# Responses with these status codes are considered transient, and retried.
+RETRY_STATUSES = {
+    requests.codes.too_many_requests,
+    requests.codes.internal_server_error,
+    requests.codes.bad_gateway,
+    requests.codes.service_unavailable,
+    requests.codes.gateway_timeout,
+}
+# Requests using these methods can safely be sent again after any failure.
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# How long to wait for a connection to a silo, in seconds.
+CONNECT_TIMEOUT = 10
+# How long to wait for a silo to respond unless otherwise specified, in seconds.
+DEFAULT_TIMEOUT = 60
+# Bounds (in seconds) of the exponential backoff between retries.
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 60
+
+def request(silo, method, url, rate_limit=None, idempotent=None, **kwargs):
+    """
+    Makes an HTTP request to the given silo over its pooled session and returns
+    the response, retrying transient failures with jittered exponential backoff.
+
+    Transient failures are connection errors, timeouts and any of the
+    `RETRY_STATUSES`. A `Retry-After` header on the response is honoured in
+    place of the usual backoff. Once the retries are spent, the last response is
+    returned (or the last error raised) as-is for the caller to deal with.
+
+    Unless it's `idempotent` (by default, if its method is one of the
+    `IDEMPOTENT_METHODS`), a request the silo may already have acted on (e.g. a
+    POST which timed out waiting for a response) is never sent again; only one
+    which was rate limited, or never got through to the silo at all, is.
+
+    Unless given a `timeout`, the request gives up on connecting after
+    `CONNECT_TIMEOUT` seconds, and on a response after as many as
+    :func:`~syndicate.http.timeout_for` says.
+
+    If the silo has a `rate_limit`, requests wait their turn in the silo's
+    token bucket, which adapts to any rate limit headers in the responses and
+    is drained entirely when the silo tells us to back off.
+    Unless given one, the rate limit its adapter declares is used.
+    @see :func:`~syndicate.ratelimit.budget_for`
+
+    Every attempt is recorded against the host it was made to.
+    @see :func:`~syndicate.utils.instrumentation`
+
+    Any keyword arguments are passed along to :py:meth:`requests.Session.request`.
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    retries = retries_for(silo)
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, timeout_for(silo)))
+    if rate_limit is None:
+        rate_limit = registry.capabilities(silo).rate_limit
+    budget = ratelimit.budget_for(rate_limit, method, silo)
+    bucket = ratelimit.bucket_for(silo, *budget) if budget else None
+    attempt = 0
+    while True:
+        if bucket:
+            bucket.acquire()
+        start = time.monotonic()
+        try:
+            response = session_for(silo).request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as err:
+            record_request(urllib.parse.urlsplit(url).hostname, 'error', time.monotonic() - start)
+            if attempt >= retries or not (idempotent or _never_sent(err)):
+                action_warn(f"{silo}: {method} {url} failed after {attempt} retries: {err}")
+                raise
+            delay = backoff(attempt)
+            action_warn(f"{silo}: {method} {url} failed ({err}), retrying in {delay:.1f}s [{attempt + 1}/{retries}]")
+        else:
+            elapsed = time.monotonic() - start
+            record_request(urllib.parse.urlsplit(url).hostname, response.status_code, elapsed, response.headers)
+            action_log(f"{silo}: {method} {url} -> {response.status_code} in {elapsed:.3f}s" + (f" after {attempt} retries" if attempt else ""))
+            if bucket:
+                bucket.observe(response.headers)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            if not idempotent and response.status_code != requests.codes.too_many_requests:
+                return response
+            delay = _retry_after(response)
+            if delay is None:
+                delay = backoff(attempt)
+            if bucket and response.status_code == requests.codes.too_many_requests:
+                # Make everyone else wait, too.
+                bucket.pause(delay)
+            action_warn(f"{silo}: {method} {url} returned {response.status_code}, retrying in {delay:.1f}s [{attempt + 1}/{retries}]")
+        time.sleep(delay)
+        attempt += 1
+
+@functools.lru_cache(maxsize=None)
+def session_for(silo):
+    """
+    (MEMOIZED) Returns a keep-alive :py:class:`requests.Session` dedicated to
+    the given silo, with a connection pool big enough to serve its workers.
+    @see :func:`~syndicate.registry.workers_for`
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=registry.workers_for(silo))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def retries_for(silo):
+    """
+    Returns the number of times a failed request to the given silo should be
+    retried, as defined in the environment.
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    return int(os.getenv(
+        f"{silo.upper()}_RETRIES",
+        os.getenv('SYNDICATE_RETRIES', DEFAULT_RETRIES)
+    ))
+
+def timeout_for(silo):
+    """
+    Returns the number of seconds to wait for the given silo to respond to a
+    request, as defined in the environment.
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    return float(os.getenv(
+        f"{silo.upper()}_TIMEOUT",
+        os.getenv('SYNDICATE_TIMEOUT', DEFAULT_TIMEOUT)
+    ))
+
+def backoff(attempt):
+    """Returns a 'full jitter' exponential backoff delay for the given attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def error_details(response):
+    """
+    Returns the most useful description of what went wrong with the given
+    response: its JSON body if it has one, otherwise its raw text.
+    """
+    try:
+        return response.json()
+    except ValueError:
+        return response.text or response.reason
+
+### privates ###
+
+def _never_sent(err):
+    """
+    Returns True if the given request error means the request never got through
+    to the server, so it can't have acted on it.
+    """
+    if isinstance(err, requests.ConnectTimeout):
+        return True
+    # NOTE requests wraps urllib3's errors, e.g. a refused connection is a
+    # NewConnectionError, itself wrapped in a MaxRetryError.
+    reason = err.args[0] if err.args else None
+    reason = getattr(reason, 'reason', reason)
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, ConnectionRefusedError))
+
+def _retry_after(response):
+    """
+    Returns the number of seconds the given response asks us to wait before
+    trying again, or None if it doesn't say.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
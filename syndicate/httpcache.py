@@ -0,0 +1,214 @@
+from syndicate.utils import action_debug, action_warn, state_path
+
+import functools
+import hashlib
+import json
+import os
+import requests
+import threading
+import time
+
+# The most the cache holds unless otherwise specified, in megabytes.
+DEFAULT_CACHE_MB = 64
+# Response headers worth keeping along with a cached response body.
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link')
+
+class CachingAdapter(requests.adapters.HTTPAdapter):
+    """
+    A transport adapter for :mod:`requests` which keeps the responses to GET
+    requests carrying an `ETag` or `Last-Modified` header on disk, and asks for
+    them again conditionally; answering from the cache whenever the server says
+    they haven't changed.
+
+    Github doesn't count such `304 Not Modified` answers against the rate limit
+    of the token used.
+    @see https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api#use-conditional-requests-if-appropriate
+    """
+    def send(self, request, stream=False, **kwargs):
+        directory = cache_dir()
+        if request.method != 'GET' or stream or not directory:
+            return super().send(request, stream=stream, **kwargs)
+        path = os.path.join(directory, _key_for(request))
+        entry = _read(path)
+        if entry:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+        response = super().send(request, stream=stream, **kwargs)
+        if response.status_code == requests.codes.not_modified and entry:
+            action_debug(f"GITHUB: {request.url} hasn't changed, using the cached response")
+            _touch(path)
+            return _cached_response(request, response, entry)
+        if response.status_code == requests.codes.ok and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            _write(path, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'headers': {key:response.headers[key] for key in CACHED_HEADERS if key in response.headers},
+                'body': response.content.decode(response.encoding or 'utf-8'),
+            })
+        return response
+
+def cache_dir():
+    """
+    Returns the directory of the cache of Github API responses, or None if
+    there isn't one.
+
+    The cache lives wherever `SYNDICATE_HTTP_CACHE` says it does; point it at a
+    cached directory to share it across workflow runs as well.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    return state_path('SYNDICATE_HTTP_CACHE', 'http-cache')
+
+def max_bytes():
+    """Returns the most the cache may hold, as set by `SYNDICATE_HTTP_CACHE_MB`."""
+    return int(float(os.getenv('SYNDICATE_HTTP_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024)
+
+@functools.lru_cache(maxsize=None)
+def session_for(protocol, host, port, retry=None, pool_size=None):
+    """
+    (MEMOIZED) Returns a :class:`requests.Session` for talking to the given
+    server by way of the cache, shared by every request made to it with the
+    same `retry` policy and `pool_size`.
+    """
+    session = requests.Session()
+    # NOTE Stops requests from looking for credentials in a .netrc file.
+    session.auth = lambda request: request
+    adapter = CachingAdapter(
+        max_retries=retry if retry is not None else requests.adapters.DEFAULT_RETRIES,
+        pool_connections=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+        pool_maxsize=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+    )
+    session.mount(f'{protocol}://', adapter)
+    return session
+
+def install():
+    """
+    (SIDE-EFFECT) Makes every request PyGithub makes from now on go by way of
+    the cache; which is only used if there's a :func:`cache_dir` at the time of
+    each request.
+    @see :class:`~syndicate.httpcache.CachingAdapter`
+    """
+    from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+    with _install_lock:
+        if getattr(Requester, '_syndicate_cached', False):
+            return
+
+        def _caching(base):
+            class _CachingConnection(base):
+                def __init__(self, *args, **kwargs):
+                    super().__init__(*args, **kwargs)
+                    # NOTE PyGithub creates a connection per request once its
+                    # connection classes are replaced, so they all share the one
+                    # session, to keep reusing connections.
+                    self.session = session_for(self.protocol, self.host, self.port, self.retry, self.pool_size)
+
+                def close(self):
+                    pass
+            return _CachingConnection
+
+        Requester.injectConnectionClasses(_caching(HTTPRequestsConnectionClass), _caching(HTTPSRequestsConnectionClass))
+        Requester._syndicate_cached = True
+
+### privates ###
+
+def _key_for(request):
+    """
+    Returns the name of the cache entry for the given request: a hash of its
+    URL, of what it accepts, and of who's asking, since Github answers each of
+    those differently.
+    """
+    identity = '\n'.join([
+        request.url,
+        request.headers.get('Accept', ''),
+        request.headers.get('Authorization', ''),
+    ])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def _read(path):
+    """Returns the cache entry at the given path, or None if there isn't a usable one."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        action_warn(f"Ignoring unreadable cached response at {path}")
+        return None
+
+def _write(path, entry):
+    """(SIDE-EFFECT) Writes the given cache entry to the given path, and makes room for it."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    data = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+    # NOTE Write-then-rename, so a crash never leaves a half-written entry.
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    _touch(path)
+    _evict(directory, len(data))
+
+def _touch(path):
+    """(SIDE-EFFECT) Marks the cache entry at the given path as recently used."""
+    # NOTE Stamped with the system clock, which is finer grained than that of
+    # some filesystems.
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except OSError:
+        pass
+
+def _evict(directory, added):
+    """
+    (SIDE-EFFECT) Once the given cache directory holds more than it may, deletes
+    the least recently used entries in it until it's down to three quarters of
+    that.
+    """
+    limit = max_bytes()
+    with _evict_lock:
+        if directory not in _sizes:
+            _sizes[directory] = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        else:
+            _sizes[directory] += added
+        if _sizes[directory] <= limit:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_file() and not entry.name.endswith('.tmp')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= limit * 3 // 4:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # evicted by another process
+            total -= size
+        _sizes[directory] = total
+    action_debug(f"Trimmed the Github response cache down to {total} bytes")
+
+def _cached_response(request, response, entry):
+    """Returns the given `304 Not Modified` response, turned back into the cached one it stands for."""
+    cached = requests.Response()
+    cached.status_code = requests.codes.ok
+    cached.reason = 'OK'
+    cached.url = response.url
+    cached.request = request
+    cached.connection = response.connection
+    cached.encoding = 'utf-8'
+    cached._content = entry['body'].encode('utf-8')
+    # NOTE The fresh headers say how much of the rate limit is left.
+    cached.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+    cached.headers.update(response.headers)
+    cached.headers.pop('Content-Encoding', None)
+    cached.headers.pop('Transfer-Encoding', None)
+    cached.headers['Content-Length'] = str(len(cached._content))
+    return cached
+
+_install_lock = threading.Lock()
+_evict_lock = threading.Lock()
+# The approximate size of each cache directory in use, by directory.
+_sizes = {}
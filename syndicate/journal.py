@@ -0,0 +1,110 @@
+from syndicate.ledger import fingerprint
+from syndicate.utils import action_warn, state_path
+
+import json
+import os
+import threading
+import time
+
+def load():
+    """
+    Returns the latest outcome journaled for each post syndicated to each silo,
+    keyed by `(silo, path)`; or None if the journal is disabled.
+
+    Each outcome is a dictionary like so:
+
+        {
+            'silo': <silo>,
+            'path': <path/to/post>,
+            'fingerprint': <fingerprint of the post contents>,
+            'bucket': 'added' | 'modified',
+            'result': <silo result, or None if syndication failed>,
+            'time': <seconds since the epoch>
+        }
+
+    @see :func:`~syndicate.journal.journal_path`
+    """
+    path = journal_path()
+    if not path:
+        return None
+    outcomes = {}
+    if not os.path.exists(path):
+        return outcomes
+    with open(path) as f:
+        for line in f:
+            try:
+                outcome = json.loads(line)
+            except ValueError:
+                # NOTE A run that died mid-write may leave a partial last line.
+                action_warn(f"Ignoring unreadable journal entry: {line!r}")
+                continue
+            outcomes[(outcome['silo'], outcome['path'])] = outcome
+    return outcomes
+
+def record(silo, results, posts):
+    """
+    (SIDE-EFFECT) Appends the outcome of syndicating each of the given posts to
+    the given silo to the journal, according to its `results`.
+
+    Posts missing from the results are not journaled.
+    """
+    path = journal_path()
+    if not path:
+        return
+    posts_by_path = {post.path:post for post in posts}
+    now = time.time()
+    lines = [
+        json.dumps({
+            'silo': silo,
+            'path': post_path,
+            'fingerprint': fingerprint(posts_by_path[post_path]),
+            'bucket': bucket,
+            'result': result,
+            'time': now,
+        }, separators=(',', ':')) + '\n'
+        for bucket, outcome in (results or {}).items()
+        for post_path, result in (outcome or {}).items()
+        if post_path in posts_by_path
+    ]
+    if not lines:
+        return
+    with _lock:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+def successes(outcomes, silo, posts):
+    """
+    Returns the journaled results of the given posts that were already
+    syndicated successfully to the given silo, in their current form, formatted
+    like the results of :func:`~syndicate.elsewhere`.
+    """
+    results = {}
+    if not outcomes:
+        return results
+    for post in posts:
+        outcome = outcomes.get((silo, post.path))
+        if outcome and outcome['result'] and outcome['fingerprint'] == fingerprint(post):
+            results.setdefault(outcome['bucket'], {})[post.path] = outcome['result']
+    return results
+
+def resuming():
+    """Returns True if this run should only retry what previous runs failed to do."""
+    return os.getenv('SYNDICATE_RESUME', 'false').lower() == 'true'
+
+def journal_path():
+    """
+    Returns the path of the journal file, or None if the journal is disabled.
+
+    The journal lives wherever `SYNDICATE_JOURNAL` says it does; point it at a
+    cached file to resume failed workflow runs as well.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    return state_path('SYNDICATE_JOURNAL', 'journal.jsonl')
+
+### privates ###
+
+# Silos are syndicated concurrently, and all write to the same journal.
+_lock = threading.Lock()
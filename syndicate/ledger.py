@@ -0,0 +1,108 @@
+from syndicate import assets
+from syndicate.utils import action_warn, silo_id_for, state_path, Post
+
+import hashlib
+import json
+import os
+import threading
+
+def load():
+    """
+    Returns the ledger of content last syndicated successfully, keyed by silo
+    and then by path:
+
+        {
+            <silo>: {
+                <path/to/post>: <fingerprint>,
+                ...
+            },
+            ...
+        }
+
+    Returns an empty ledger if there is none yet, or None if the ledger is
+    disabled.
+    @see :func:`~syndicate.ledger.ledger_path`
+    """
+    path = ledger_path()
+    if not path:
+        return None
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as err:
+        action_warn(f"Ignoring unreadable ledger at '{path}': {err}")
+        return {}
+
+def save(ledger):
+    """(SIDE-EFFECT) Persists the given ledger, if the ledger is enabled."""
+    path = ledger_path()
+    if not path or ledger is None:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # NOTE Write-then-rename, so a crash never leaves a half-written ledger.
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(ledger, f, separators=(',', ':'))
+    os.replace(f'{path}.tmp', path)
+
+def ledger_path():
+    """
+    Returns the path of the ledger file, or None if the ledger is disabled.
+
+    The ledger lives wherever `SYNDICATE_LEDGER` says it does; point it at a
+    cached or committed file to share it between workflow runs as well.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    return state_path('SYNDICATE_LEDGER', 'ledger.json')
+
+def fingerprint(post):
+    """
+    Returns a hash of the contents the given post would be syndicated with,
+    i.e. with its images linked to where they are as of the latest known commit.
+    @see :func:`~syndicate.assets.rewrite`
+    """
+    if not post:
+        raise ValueError("missing post")
+    return hashlib.sha256(assets.rewrite(Post.of(post)).encode('utf-8')).hexdigest()
+
+def is_unchanged(ledger, silo, post):
+    """
+    Returns True if the given post is already known to the given silo, and the
+    ledger says the silo was last sent exactly what we'd be sending it now.
+    """
+    if not ledger or not ledger.get(silo):
+        return False
+    return bool(silo_id_for(post, silo)) and ledger[silo].get(post.path) == fingerprint(post)
+
+def record(ledger, silo, results, posts):
+    """
+    (SIDE-EFFECT) Notes in the ledger the fingerprints of the given posts that
+    were successfully syndicated to the given silo, according to its `results`.
+    """
+    if ledger is None:
+        return
+    posts_by_path = {post.path:post for post in posts}
+    with _lock:
+        entries = ledger.setdefault(silo, {})
+        for outcome in (results or {}).values():
+            for path, result in (outcome or {}).items():
+                if result and path in posts_by_path:
+                    entries[path] = fingerprint(posts_by_path[path])
+
+def forget(ledger, silo, paths):
+    """
+    (SIDE-EFFECT) Removes the given posts from what the ledger knows the given
+    silo to have, e.g. once they've been unpublished from it.
+    """
+    if ledger is None:
+        return
+    with _lock:
+        entries = ledger.get(silo) or {}
+        for path in paths:
+            entries.pop(path, None)
+
+### privates ###
+
+# Silos are syndicated concurrently, and all record into the same ledger.
+_lock = threading.Lock()
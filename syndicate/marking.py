@@ -0,0 +1,176 @@
+from syndicate import graphql, http
+from syndicate.utils import action_error, action_log, action_setenv, action_warn, branch_name, parent_sha, silo_id_for, silo_key_for, span
+
+import base64
+import frontmatter
+import os
+import time
+
+# Commits are made by way of the Github GraphQL API.
+SILO_NAME = graphql.SILO_NAME
+CREATE_COMMIT = '''
+mutation($input: CreateCommitOnBranchInput!) {
+  createCommitOnBranch(input: $input) {
+    commit { oid }
+  }
+}
+'''
+
+def mark_syndicated_posts(silo_ids_by_path, fronted_posts_by_path):
+    """
+    Injects the given silo IDs for the given posts into their frontmatter
+    and commits the updated posts back to this repo.
+
+    If a silo ID already exists in a given post, that's fine: we assume IDs don't
+    change, and so we don't try to change them.
+
+    If the branch has moved on since the posts were read, the posts are read
+    again from its new head, the IDs are injected into them afresh, and the
+    commit is retried with jittered exponential backoff.
+    @see :func:`~syndicate.http.retries_for`
+
+    Returns the SHA of the new commit, or None if there was nothing to commit
+    or it couldn't be done.
+    """
+    if not silo_ids_by_path:
+        raise ValueError("missing silo IDs")
+    if not fronted_posts_by_path:
+        raise ValueError("missing fronted posts")
+
+    head = parent_sha()
+    retries = http.retries_for(SILO_NAME)
+    attempt = 0
+    while True:
+        updated_fronted_posts_by_path, silos_included = _inject(silo_ids_by_path, fronted_posts_by_path)
+        try:
+            return commit_updated_posts(updated_fronted_posts_by_path, silos_included, head)
+        except _HeadMoved:
+            if attempt >= retries:
+                action_error(f"Failed to mark syndicated posts: {branch_name()} kept moving after {attempt} retries")
+                return None
+        delay = http.backoff(attempt)
+        action_warn(f"{branch_name()} moved on from {head}, marking again in {delay:.1f}s [{attempt + 1}/{retries}]")
+        time.sleep(delay)
+        try:
+            head, fronted_posts_by_path = _read_head(silo_ids_by_path.keys())
+        except ValueError as err:
+            action_error(f"Failed to mark syndicated posts: couldn't read them from {branch_name()} again: {err}")
+            return None
+        attempt += 1
+
+@span('mark posts')
+def commit_updated_posts(fronted_posts_by_path, silos, head=None):
+    """
+    Commits the (presumably changed) given posts on top of `head` (by default,
+    the parent SHA of this step) on the remote GITHUB_REF of this repo, and
+    returns the SHA of the new commit; or None if it failed.
+
+    This takes a single request, using the `createCommitOnBranch` mutation of
+    the Github GraphQL API. The commit is only made if the branch still points
+    at `head`; if it doesn't, :class:`_HeadMoved` is raised.
+    @see https://docs.github.com/en/graphql/reference/mutations#createcommitonbranch
+    """
+    if not fronted_posts_by_path:
+        action_log("All good: already marked.")
+        return None
+    if not os.getenv("GITHUB_TOKEN"):
+        raise ValueError("missing GITHUB_TOKEN")
+    if not os.getenv("GITHUB_REPOSITORY"):
+        raise ValueError("missing GITHUB_REPOSITORY")
+    if not os.getenv("GITHUB_REF"):
+        raise ValueError("missing GITHUB_REF")
+
+    head = head or parent_sha()
+    response = graphql.request(CREATE_COMMIT, {
+        'input': {
+            'branch': {
+                'repositoryNameWithOwner': os.getenv('GITHUB_REPOSITORY'),
+                'branchName': branch_name(),
+            },
+            'expectedHeadOid': head,
+            'message': {'headline': f'(syndicate): adding IDs for {silos}'},
+            'fileChanges': {
+                'additions': [
+                    {
+                        'path': path,
+                        'contents': base64.b64encode(frontmatter.dumps(fronted_post).encode('utf-8')).decode('ascii'),
+                    }
+                    for path, fronted_post in fronted_posts_by_path.items()
+                ]
+            },
+        }
+    })
+    if response is None:
+        return None
+    errors = response.get('errors')
+    if errors:
+        if any(_is_stale(error) for error in errors):
+            raise _HeadMoved(head)
+        action_error(f"Failed to mark syndicated posts: {errors}")
+        return None
+    new_sha = response['data']['createCommitOnBranch']['commit']['oid']
+    ## NOTE Need to update the reference SHA for future workflow steps, and
+    # for the rest of this one.
+    action_setenv('SYNDICATE_SHA', new_sha)
+    os.environ['SYNDICATE_SHA'] = new_sha
+    action_log("Syndicate posts marked.")
+    return new_sha
+
+### privates ###
+
+class _HeadMoved(Exception):
+    """Raised when the branch being committed to has moved on from the expected head."""
+
+def _inject(silo_ids_by_path, fronted_posts_by_path):
+    """
+    Returns the given posts which are missing any of the given silo IDs with
+    those IDs added to their frontmatter, keyed by path, along with the set of
+    silos whose IDs were added.
+    """
+    updated_fronted_posts_by_path = {}
+    silos_included = set()
+    for path, silo_ids_by_silo in silo_ids_by_path.items():
+        fronted_post = fronted_posts_by_path.get(path)
+        if fronted_post is None:
+            continue
+
+        # Format:
+        # {
+        #     'dev_silo_id': 42,
+        #     'medium_silo_id': 'abc123',
+        #     ...
+        # }
+        new_silo_ids = {}
+        for silo, sid in silo_ids_by_silo.items():
+            # Ignore already posts marked with this silo
+            if not silo_id_for(fronted_post, silo):
+                new_silo_ids[silo_key_for(silo)] = sid
+                silos_included.add(silo)
+
+        # Only add to commit if there're any new IDs to add.
+        if not new_silo_ids:
+            continue
+
+        # Create new fronted post with old frontmatter merged with silo IDs.
+        updated_post = frontmatter.Post(**dict(fronted_post.to_dict(), **new_silo_ids))
+        updated_fronted_posts_by_path[path] = updated_post
+    return updated_fronted_posts_by_path, silos_included
+
+def _read_head(paths):
+    """
+    Returns the SHA the remote GITHUB_REF currently points to, along with the
+    :py:class:`frontmatter.Post` representation of each of the given paths
+    there, keyed by path.
+
+    Paths which no longer exist are left out.
+    @see :func:`~syndicate.graphql.read_files`
+    """
+    try:
+        head, texts = graphql.read_files(paths, ref=os.getenv('GITHUB_REF'))
+    except ValueError as err:
+        raise ValueError(f"failed to read the head of {branch_name()}: {err}")
+    return head, {path:frontmatter.loads(text) for path, text in texts.items()}
+
+def _is_stale(error):
+    """Returns True if the given GraphQL error says the branch isn't where we expected it to be."""
+    return error.get('type') == 'STALE_DATA' or 'expected branch to point to' in error.get('message', '').lower()
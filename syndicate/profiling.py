@@ -0,0 +1,97 @@
+from syndicate.utils import action_log, action_log_group
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+# The number of hot functions and allocation sites summarised in the log.
+SUMMARY_SIZE = 15
+# The number of frames of traceback kept for each allocation.
+TRACEBACK_DEPTH = 10
+
+@contextlib.contextmanager
+def profiled(modes=os.getenv('SYNDICATE_PROFILE')):
+    """
+    Profiles the managed block according to `modes`, a comma-separated list of:
+    - 'cpu', to profile it with cProfile
+    - 'mem', to trace its memory allocations with tracemalloc
+
+    When it's done, the full reports are written to the profile directory, and
+    a summary of them is printed to the Github workflow log.
+    @see :func:`~syndicate.profiling.profile_dir`
+
+    Does nothing if no modes are given.
+    """
+    modes = {mode.strip().lower() for mode in (modes or '').split(',') if mode.strip()}
+    unknown = modes - {'cpu', 'mem'}
+    if unknown:
+        raise ValueError(f"unknown profiling modes {sorted(unknown)}")
+    if not modes:
+        yield
+        return
+
+    profiler = cProfile.Profile() if 'cpu' in modes else None
+    if 'mem' in modes:
+        tracemalloc.start(TRACEBACK_DEPTH)
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        snapshot = None
+        if 'mem' in modes:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        if profiler:
+            _report_cpu(profiler, os.path.join(directory, 'profile-cpu.pstats'))
+        if snapshot:
+            _report_mem(snapshot, peak, os.path.join(directory, 'profile-mem.txt'))
+
+def profile_dir():
+    """
+    Returns the directory profiling reports are written to.
+
+    That's wherever `SYNDICATE_PROFILE_DIR` says it is, or by default a
+    directory in the RUNNER_TEMP directory of the running Github workflow job,
+    where later steps can upload them as artifacts.
+    """
+    if os.getenv('SYNDICATE_PROFILE_DIR'):
+        return os.getenv('SYNDICATE_PROFILE_DIR')
+    return os.path.join(os.getenv('RUNNER_TEMP', os.getcwd()), 'syndicate', 'profile')
+
+### privates ###
+
+@action_log_group('Profile: CPU')
+def _report_cpu(profiler, path):
+    """(SIDE-EFFECT) Dumps the stats of the given profiler to `path` and logs the hottest functions."""
+    profiler.dump_stats(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).strip_dirs().sort_stats('cumulative').print_stats(SUMMARY_SIZE)
+    action_log(summary.getvalue().strip())
+    action_log(f"Full profile written to {path}")
+
+@action_log_group('Profile: memory')
+def _report_mem(snapshot, peak, path):
+    """(SIDE-EFFECT) Writes the biggest allocation sites in `snapshot` to `path` and logs the top ones."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    stats = snapshot.statistics('traceback')
+    with open(path, 'w') as f:
+        f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+        for stat in stats:
+            f.write(f"\n{stat}\n")
+            f.writelines(f"    {line}\n" for line in stat.traceback.format())
+    action_log(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB")
+    for stat in snapshot.statistics('lineno')[:SUMMARY_SIZE]:
+        action_log(str(stat))
+    action_log(f"Full report written to {path}")
@@ -0,0 +1,119 @@
+import functools
+import os
+import threading
+import time
+
+class TokenBucket:
+    """
+    A thread-safe token bucket allowing at most `capacity` requests every
+    `period` seconds, refilling continuously.
+
+    Callers :meth:`acquire` a token before each request, blocking until one is
+    available, and tell the bucket what the server said about its quota via
+    :meth:`observe` so that it can adapt to the real limits.
+    """
+    def __init__(self, capacity, period, clock=time.monotonic, sleep=time.sleep):
+        if not capacity or capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not period or period <= 0:
+            raise ValueError("period must be positive")
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """(SIDE-EFFECT) Blocks until a request can be made, and takes a token for it."""
+        while True:
+            with self._lock:
+                now = self._refill()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """(SIDE-EFFECT) Stops handing out tokens for the given number of seconds."""
+        with self._lock:
+            now = self._refill()
+            self.tokens = 0.0
+            self._paused_until = max(self._paused_until, now + seconds)
+
+    def observe(self, headers):
+        """
+        (SIDE-EFFECT) Adapts the bucket to any rate limit information found in
+        the given response headers.
+
+        Understands both the common `X-RateLimit-*` headers and the standard
+        `RateLimit-*` ones, where `*-Reset` may be either a Unix timestamp or a
+        number of seconds from now.
+        """
+        remaining = _header(headers, 'RateLimit-Remaining')
+        if remaining is None:
+            return
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+        if remaining < 1:
+            reset = _header(headers, 'RateLimit-Reset')
+            if reset is not None:
+                # NOTE Anything bigger than a year is taken to be a timestamp.
+                self.pause(reset - time.time() if reset > 31536000 else reset)
+
+    def _refill(self):
+        """Tops up the bucket for the time elapsed since it was last touched, returning the current time."""
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+@functools.lru_cache(maxsize=None)
+def bucket_for(silo, capacity, period):
+    """
+    (MEMOIZED) Returns the :class:`TokenBucket` shared by every request made to
+    the given silo under the given budget.
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    return TokenBucket(capacity, period)
+
+def budget_for(rate_limit, method, silo=None):
+    """
+    Returns the `(requests, seconds)` budget applicable to requests made with
+    the given HTTP method, or None if unlimited.
+
+    Silo adapters declare their `RATE_LIMIT` either as a single budget for all
+    requests or as a dictionary of budgets keyed by HTTP method. This can be
+    overridden for all requests to a `silo` by setting `<SILO>_RATE_LIMIT` in
+    the environment to `<requests>/<seconds>`, or to `none` to lift the limit.
+    """
+    override = os.getenv(f'{silo.upper()}_RATE_LIMIT') if silo else None
+    if override:
+        if override.lower() == 'none':
+            return None
+        requests, _, seconds = override.partition('/')
+        return (float(requests), float(seconds or 1))
+    if isinstance(rate_limit, dict):
+        return rate_limit.get(method.upper())
+    return rate_limit
+
+### privates ###
+
+def _header(headers, name):
+    """Returns the numeric value of the named rate limit header, or None if absent."""
+    for key in (f'X-{name}', name):
+        value = headers.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
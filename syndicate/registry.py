@@ -0,0 +1,85 @@
+from syndicate.utils import action_warn, max_workers_for
+
+import collections
+import functools
+import importlib
+import importlib.util
+
+# Third-party silo adapters register themselves under this entry point group,
+# by naming the module that implements them, e.g. in `pyproject.toml`:
+#
+#     [project.entry-points."syndicate.silos"]
+#     medium = "syndicate_medium"
+ENTRY_POINT_GROUP = 'syndicate.silos'
+
+# What a silo adapter can tell us about itself, by way of a `CAPABILITIES`
+# dictionary at the top level of its module:
+# - batch_size: the most posts it can be given at once, or None if unlimited
+# - max_workers: how many concurrent requests it makes by default
+# - rate_limit: its request budget, as understood by :func:`~syndicate.ratelimit.budget_for`
+# - max_payload_bytes: the biggest post it can take, or None if unlimited
+Capabilities = collections.namedtuple('Capabilities', ['batch_size', 'max_workers', 'rate_limit', 'max_payload_bytes'])
+DEFAULT_CAPABILITIES = Capabilities(batch_size=None, max_workers=None, rate_limit=None, max_payload_bytes=None)
+
+@functools.lru_cache(maxsize=None)
+def locate(silo):
+    """
+    (MEMOIZED) Returns the name of the Python module implementing the adapter
+    for the given silo, or None if there isn't one.
+
+    Adapters built into the `syndicate.silos` package win over any registered
+    as entry points by other packages.
+    @see :data:`~syndicate.registry.ENTRY_POINT_GROUP`
+    """
+    if not silo:
+        raise ValueError('missing silo')
+    spec = importlib.util.find_spec(f'syndicate.silos.{silo.lower()}')
+    if spec:
+        return spec.name
+    for entry_point in _entry_points():
+        if entry_point.name.lower() == silo.lower():
+            return entry_point.value
+    return None
+
+@functools.lru_cache(maxsize=None)
+def load(silo):
+    """(MEMOIZED) Imports and returns the adapter module for the given silo."""
+    name = locate(silo)
+    if not name:
+        raise ValueError(f"no adapter for silo '{silo}'")
+    return importlib.import_module(name)
+
+@functools.lru_cache(maxsize=None)
+def capabilities(silo):
+    """
+    (MEMOIZED) Returns the :data:`Capabilities` the adapter for the given silo
+    declares, with defaults for anything it doesn't; or the defaults if the
+    silo has no adapter.
+    """
+    if not locate(silo):
+        return DEFAULT_CAPABILITIES
+    declared = dict(getattr(load(silo), 'CAPABILITIES', None) or {})
+    unknown = set(declared) - set(Capabilities._fields)
+    if unknown:
+        action_warn(f"Ignoring unknown capabilities of {silo}: {sorted(unknown)}")
+    return DEFAULT_CAPABILITIES._replace(**{key:value for key, value in declared.items() if key not in unknown})
+
+def workers_for(silo):
+    """
+    Returns the maximum number of concurrent requests to make to the given silo:
+    as defined in the environment if it is, otherwise as its adapter declares.
+    @see :func:`~syndicate.utils.max_workers_for`
+    """
+    return max_workers_for(silo, default=capabilities(silo).max_workers)
+
+### privates ###
+
+def _entry_points():
+    """Returns the silo adapters registered as entry points by installed packages."""
+    # NOTE Only loaded when a silo isn't built in, since it's slow to import.
+    import importlib.metadata
+    entry_points = importlib.metadata.entry_points()
+    # NOTE Python < 3.10 returns a dictionary of entry points keyed by group.
+    if hasattr(entry_points, 'select'):
+        return entry_points.select(group=ENTRY_POINT_GROUP)
+    return entry_points.get(ENTRY_POINT_GROUP, [])
@@ -1,14 +1,32 @@
-from syndicate.utils import action_log_group, action_log, action_error, fronted, silo_id_for
+from syndicate.utils import action_log_group, action_log, action_error, action_warn, claimed_silo_ids, concurrently, silo_id_for, Post
+from syndicate import assets, http, registry
+import os
 import requests
 import pprint
+import threading
 
 SILO_NAME = 'DEV'
+API_URL = os.getenv('DEV_API_URL', 'https://dev.to/api')
+# @see https://docs.dev.to/api/#section/Rate-limiting
+RATE_LIMIT = {
+    'POST': (10, 30),  # 10 articles created every 30 seconds
+    'PUT': (30, 30),   # 30 articles updated every 30 seconds
+}
+# @see :data:`~syndicate.registry.Capabilities`
+CAPABILITIES = {
+    'max_workers': 4,
+    'rate_limit': RATE_LIMIT,
+}
 @action_log_group(SILO_NAME)
 def syndicate(posts, api_key):
     """
     Syndicates the given posts to https://dev.to, updating the ones that
     already exist there and creating articles for the ones that don't.
 
+    Existing articles are recognized by the silo ID in a post's frontmatter or,
+    failing that, by its canonical URL or title, so that posts which were never
+    marked as syndicated don't end up with duplicate drafts.
+
     By default, articles are created in a "draft"/unpublished state, but this
     can be overridden by individual posts by specifying `published: true` in
     their frontmatter, if you prefer a "just do it" approach.
@@ -20,21 +38,186 @@ def syndicate(posts, api_key):
     """
 
     action_log(f"Hello? Yes, this is {SILO_NAME}.")
-    results = {
-        'added': {post.path:_create(post, api_key) for post in posts if not silo_id_for(post, SILO_NAME)},
-        'modified': {post.path:_update(post, api_key) for post in posts if silo_id_for(post, SILO_NAME)}
-    }
+    articles = _articles_for(api_key)
+    # NOTE
+    # Creates and updates share the same budget of concurrent requests, since
+    # they're all going to the same place.
+    synced = concurrently(
+        lambda post: _classify_and_sync(Post.of(post), api_key, articles),
+        posts,
+        max_workers=registry.workers_for(SILO_NAME)
+    )
+    results = {'added': {}, 'modified': {}}
+    for path, bucket, response in synced:
+        results[bucket][path] = response
+    action_log("The results are in:")
+    action_log(pprint.pformat(results))
+    return results
+
+@action_log_group(f'{SILO_NAME} (unpublish)')
+def unpublish(posts, api_key):
+    """
+    Unpublishes the https://dev.to articles corresponding to the given posts,
+    which have been removed from this repo.
+
+    The DEV API can't delete articles, so they're turned back into drafts
+    instead: gone from public view, but still there for the author to delete or
+    restore as they see fit.
+
+    @see https://docs.dev.to/api/#operation/updateArticle
+    """
+    action_log(f"Hello? Yes, this is {SILO_NAME}. I'm told these posts are no more.")
+    unpublished = concurrently(
+        lambda post: (post.path, _unpublish(Post.of(post), api_key)),
+        posts,
+        max_workers=registry.workers_for(SILO_NAME)
+    )
+    results = {'removed': dict(unpublished)}
     action_log("The results are in:")
     action_log(pprint.pformat(results))
     return results
 
 ### privates ###
 
-def _create(post, api_key=None):
+def _classify_and_sync(post, api_key, articles):
+    """
+    Syndicates the given post, returning its path, whether it was 'added' or
+    'modified', and the result.
+    """
+    # NOTE
+    # A post is only 'added' if we don't have a silo ID for it yet, even if it
+    # turns out DEV already has a matching article: that way, it gets marked.
+    bucket = 'modified' if silo_id_for(post, SILO_NAME) else 'added'
+    return (post.path, bucket, _sync(post, api_key, articles))
+
+def _sync(post, api_key, articles):
+    """
+    Brings the DEV.to article corresponding to the given post up to date,
+    creating one if need be, and returns its silo ID and URL.
+
+    The article is found in the given index of `articles`: by silo ID if the
+    post has one, otherwise by canonical URL or title. Articles that are already
+    identical to the post are left alone.
+    @see :func:`~syndicate.silos.dev._index_articles`
+    @see :func:`~syndicate.silos.dev._adopt`
+    """
+    silo_id = silo_id_for(post, SILO_NAME)
+    article = articles.get(('id', silo_id)) if silo_id else _adopt(post, articles)
+    body = assets.rewrite(post)
+    if not article:
+        return _update(post, api_key, body=body) if silo_id else _create(post, api_key, body=body)
+    if not silo_id:
+        action_log(f"'{post.name}' is already on {SILO_NAME} as article {article['id']}, not creating another.")
+    if (article.get('body_markdown') or '').strip() == body.strip():
+        action_log(f"'{post.name}' is already up to date on {SILO_NAME}.")
+        return (article['id'], article['url'])
+    return _update(post, api_key, silo_id=article['id'], body=body)
+
+def _articles_for(api_key):
+    """
+    Returns the index of the articles belonging to the authenticated DEV.to
+    user, listing them only once for all the posts of the commit this Github
+    workflow was triggered for, however few of them are syndicated at a time.
+
+    An empty index isn't kept, so that a failure to list the articles is retried.
+    @see :func:`~syndicate.silos.dev._index_articles`
+    """
+    run = (os.getenv('GITHUB_REPOSITORY'), os.getenv('GITHUB_SHA'))
+    with _indexes_lock:
+        if api_key in _indexes and _indexes[api_key][0] == run:
+            return _indexes[api_key][1]
+    articles = _index_articles(api_key)
+    if articles:
+        with _indexes_lock:
+            _indexes[api_key] = (run, articles)
+    return articles
+
+def _index_articles(api_key):
+    """
+    Returns an index of all the articles belonging to the authenticated DEV.to
+    user, published or not, keyed by `('id', <id>)`, `('canonical_url', <url>)`
+    and `('title', <title>)` tuples.
+
+    Where several articles share a title or canonical URL, the oldest wins.
+    If the articles can't be listed, this returns an empty index.
+
+    @see https://docs.dev.to/api/#operation/getUserAllArticles
+    """
+    endpoint = f"{API_URL}/articles/me/all"
+    headers = {'api-key': api_key}
+    per_page = 1000
+    articles = []
+    page = 1
+    while True:
+        try:
+            response = http.request(SILO_NAME, 'GET', endpoint, headers=headers, params={'page': page, 'per_page': per_page})
+        except requests.RequestException as err:
+            response = None
+            action_warn(f"Failed to list existing articles: {err}")
+        if response is None or response.status_code != requests.codes.ok:
+            if response is not None:
+                action_warn(f"Failed to list existing articles: {http.error_details(response)}")
+            action_warn("I won't be able to tell if any of these posts are already there.")
+            return {}
+        batch = response.json()
+        articles.extend(batch)
+        if len(batch) < per_page:
+            break
+        page += 1
+
+    index = {}
+    for article in sorted(articles, key=lambda article: article['id']):
+        for key in ('id', 'canonical_url', 'title'):
+            if article.get(key):
+                index.setdefault((key, article[key]), article)
+    return index
+
+def _match(post, articles):
+    """
+    Returns the article from the given index corresponding to the given post,
+    matched by canonical URL or title; or None if there isn't one.
+    """
+    for key in ('canonical_url', 'title'):
+        value = post.get(key)
+        if value and (key, value) in articles:
+            return articles[(key, value)]
+    return None
+
+def _adopt(post, articles):
+    """
+    (SIDE-EFFECT) Returns the article from the given index which the given post,
+    not yet marked with a silo ID, is already on DEV.to as; or None if there
+    isn't one, and an article should be created for it.
+
+    An article matched by canonical URL or title is only adopted if it doesn't
+    belong to another post already: one marked with its silo ID, or one which
+    adopted it earlier in this run. Once adopted, it can't be matched again.
+    @see :func:`~syndicate.silos.dev._match`
+    """
+    article = _match(post, articles)
+    if not article:
+        return None
+    if article['id'] in claimed_silo_ids(SILO_NAME):
+        action_warn(f"'{post.name}' looks like article {article['id']} on {SILO_NAME}, but another post has it; creating a new one.")
+        return None
+    with _indexes_lock:
+        if _match(post, articles) is not article:
+            action_warn(f"'{post.name}' looks like article {article['id']} on {SILO_NAME}, but another post just took it; creating a new one.")
+            return None
+        for key in ('canonical_url', 'title'):
+            if articles.get((key, article.get(key))) is article:
+                del articles[(key, article[key])]
+    return article
+
+def _create(post, api_key=None, body=None):
     """
     Creates a new article for the given post on DEV.to and returns the silo ID
     and URL of the newly created article.
 
+    The article's body is the given `body`, if the post has already been
+    rewritten for syndication, or the post rewritten otherwise.
+    @see :func:`~syndicate.assets.rewrite`
+
     This tries to create an **unpublished** draft. However, the 'published'
     status can be overridden in the frontmatter of the post itself for a
     "just do it" approach.
@@ -45,7 +228,8 @@ def _create(post, api_key=None):
         raise ValueError("missing API key")
     if not post:
         raise ValueError("missing post")
-    if not fronted(post).get('title'):
+    post = Post.of(post)
+    if not post.get('title'):
         raise ValueError("article is missing a title")
 
     payload = {
@@ -53,26 +237,52 @@ def _create(post, api_key=None):
             # NOTE This can be overridden by explicitly setting 'published' in
             # the frontmatter.
             'published': False,
-            'body_markdown': post.decoded_content.decode('utf-8')
+            'body_markdown': body if body is not None else assets.rewrite(post)
         }
     }
-    endpoint = "https://dev.to/api/articles"
+    endpoint = f"{API_URL}/articles"
     headers = {'api-key': api_key}
-    response = requests.post(endpoint, headers=headers, json=payload)
+    response = http.request(SILO_NAME, 'POST', endpoint, headers=headers, json=payload)
 
     if response.status_code != requests.codes.created:
-        action_error(f"Failed to create draft for '{post.name}': {response.json()}")
+        action_error(f"Failed to create draft for '{post.name}': {http.error_details(response)}")
         return None
     else:
         results = response.json()
         return (results['id'], results['url'])
 
-def _update(post, api_key=None):
+def _update(post, api_key=None, silo_id=None, body=None):
     """
     Updates an article corresponding to the given post on DEV.to and returns the
     silo ID and URL of the updated arcticle.
 
-    If a corresponding article does not exist, this will fail.
+    The article updated is the one identified by `silo_id`, or by the silo ID in
+    the frontmatter of the post if none is given. If a corresponding article
+    does not exist, this will fail. Its body is set as by :func:`_create`.
+
+    @see https://docs.dev.to/api/#operation/updateArticle
+    """
+    if not api_key:
+        raise ValueError("missing API key")
+    if not post:
+        raise ValueError("missing post")
+    post = Post.of(post)
+
+    endpoint = f'{API_URL}/articles/{silo_id or silo_id_for(post, SILO_NAME)}'
+    headers = {'api-key': api_key}
+    payload = {'article': { 'body_markdown': body if body is not None else assets.rewrite(post) } }
+    response = http.request(SILO_NAME, 'PUT', endpoint, headers=headers, json=payload)
+    if response.status_code != requests.codes.ok:
+        action_error(f"Failed to update post '{post.name}': {http.error_details(response)}")
+        return None
+    else:
+        results = response.json()
+        return (results['id'], results['url'])
+
+def _unpublish(post, api_key=None):
+    """
+    Turns the DEV.to article corresponding to the given post back into a draft
+    and returns the silo ID and URL of the unpublished article.
 
     @see https://docs.dev.to/api/#operation/updateArticle
     """
@@ -80,14 +290,19 @@ def _update(post, api_key=None):
         raise ValueError("missing API key")
     if not post:
         raise ValueError("missing post")
+    post = Post.of(post)
 
-    endpoint = f'https://dev.to/api/articles/{silo_id_for(post, SILO_NAME)}'
+    endpoint = f'{API_URL}/articles/{silo_id_for(post, SILO_NAME)}'
     headers = {'api-key': api_key}
-    payload = {'article': { 'body_markdown': post.decoded_content.decode('utf-8') } }
-    response = requests.put(endpoint, headers=headers, json=payload)
+    payload = {'article': { 'published': False } }
+    response = http.request(SILO_NAME, 'PUT', endpoint, headers=headers, json=payload)
     if response.status_code != requests.codes.ok:
-        action_error(f"Failed to update post '{post.name}': {response.json()}")
+        action_error(f"Failed to unpublish post '{post.name}': {http.error_details(response)}")
         return None
     else:
         results = response.json()
         return (results['id'], results['url'])
+
+_indexes_lock = threading.Lock()
+# The latest index of articles listed with each API key, and the run it was listed for.
+_indexes = {}
@@ -1,42 +1,312 @@
-import frontmatter
+import base64
+import collections
+import collections.abc
+import concurrent.futures
+import contextlib
+import contextvars
 import functools
-from github import Github, InputGitTreeElement
+import glob
+import hashlib
 import json
+import logging
 import os
-import requests
+import queue
+import re
+import secrets
+import subprocess
+import threading
+import time
+
+# The number of concurrent requests made to a silo unless otherwise specified.
+DEFAULT_MAX_WORKERS = 4
+# The number of posts syndicated at a time unless otherwise specified.
+DEFAULT_BATCH_SIZE = 50
+# The number of posts read at a time unless otherwise specified.
+DEFAULT_READ_SIZE = 8
+# The number of repositories kept authenticated at a time unless otherwise specified.
+DEFAULT_REPO_CACHE_SIZE = 32
 
 def action_log(msg):
     """(SIDE-EFFECT) Prints `msg` to the Github workflow log."""
-    print(msg)
+    _emit(msg)
 
 def action_debug(msg):
     """(SIDE-EFFECT) Prints `msg` to the Github workflow debug log."""
-    print(f"::debug::{msg}")
+    _emit(f"::debug::{msg}")
 
 def action_warn(msg):
     """(SIDE-EFFECT) Prints `msg` to the Github workflow warning log."""
-    print(f"::warning::{msg}")
+    _emit(f"::warning::{msg}")
 
 def action_error(msg):
     """(SIDE-EFFECT) Prints `msg` to the Github workflow error log."""
-    print(f"::error::{msg}")
+    _emit(f"::error::{msg}")
 
 def action_log_group(title):
     """
     Decorates a function such that all its generated log statements are grouped
     in the Github workflow log under `title`.
+
+    The grouped statements are buffered and printed together once the function
+    returns, so that groups running concurrently do not garble one another. The
+    time the function took is recorded as a span, and noted at the end of the
+    group.
+    @see :func:`~syndicate.utils.span`
     """
 
     def _decorator(func):
         @functools.wraps(func)
         def _wrapper(*args, **kwargs):
-            print(f"::group::{title}")
-            result = func(*args, **kwargs)
-            print("::endgroup::")
-            return result
+            buffer = []
+            token = _log_buffer.set(buffer)
+            start = time.perf_counter()
+            try:
+                with span(title):
+                    return func(*args, **kwargs)
+            finally:
+                _log_buffer.reset(token)
+                buffer.append(f"(took {time.perf_counter() - start:.3f}s)")
+                _emit("\n".join([f"::group::{title}", *buffer, "::endgroup::"]))
         return _wrapper
     return _decorator
 
+def concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Applies `func` to each of the given `items` using a bounded pool of threads
+    and returns the results in the same order as `items`.
+
+    Any exception raised by `func` is re-raised here.
+    """
+    items = list(items)
+    if not items:
+        return []
+    max_workers = max(1, min(max_workers or 1, len(items)))
+    if max_workers == 1:
+        return [func(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # NOTE Running each call in a copy of the current context ensures
+        # things like log grouping carry over into the worker threads.
+        futures = [
+            pool.submit(contextvars.copy_context().run, func, item)
+            for item in items
+        ]
+        return [future.result() for future in futures]
+
+def prefetch(items, size=1):
+    """
+    Yields the given `items` in order, while a background thread works on
+    producing up to `size` of the ones after them.
+
+    This lets a slow producer (e.g. one downloading posts) get ahead of a slow
+    consumer (e.g. one syndicating them), without ever holding more than `size`
+    finished items that haven't been consumed yet. Any exception raised by the
+    producer is re-raised here, once the items before it have been yielded.
+    """
+    buffer = queue.Queue(maxsize=max(1, size))
+    stop = threading.Event()
+    end = object()
+
+    def _put(entry):
+        """Puts the given entry in the buffer once there's room, unless told to stop first."""
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce():
+        try:
+            for item in items:
+                if not _put((item, None)):
+                    return
+            _put((end, None))
+        except Exception as err:
+            _put((end, err))
+
+    # NOTE Running in a copy of the current context ensures things like log
+    # grouping carry over into the background thread.
+    threading.Thread(target=contextvars.copy_context().run, args=(_produce,), daemon=True).start()
+    try:
+        while True:
+            item, err = buffer.get()
+            if item is end:
+                if err:
+                    raise err
+                return
+            yield item
+    finally:
+        # Let the producer go if we're done early.
+        stop.set()
+
+def max_workers_for(silo, default=None):
+    """
+    Returns the maximum number of concurrent requests to make to the given silo,
+    as defined in the environment, or `default` if it isn't.
+    """
+    if not silo:
+        raise ValueError("missing silo")
+    return int(os.getenv(
+        f"{silo.upper()}_MAX_WORKERS",
+        os.getenv('SYNDICATE_MAX_WORKERS', default or DEFAULT_MAX_WORKERS)
+    ))
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Records the time spent in the managed block as a span called `name`, with
+    the given attributes, nested under any span it was started in.
+    @see :func:`~syndicate.utils.instrumentation`
+    """
+    parent = _current_span.get()
+    record = {
+        'id': secrets.token_hex(8),
+        'parent': parent['id'] if parent else None,
+        'name': name,
+        'attributes': attributes,
+        'start': time.time_ns(),
+    }
+    token = _current_span.set(record)
+    try:
+        yield record
+    finally:
+        _current_span.reset(token)
+        record['end'] = time.time_ns()
+        spans, _, _ = _recorded()
+        with _instrumentation_lock:
+            spans.append(record)
+
+def record_request(host, status, seconds, headers=None):
+    """
+    (SIDE-EFFECT) Records a request made to the given host, along with any rate
+    limit headroom advertised in the response `headers`.
+    @see :func:`~syndicate.utils.instrumentation`
+    """
+    headers = {key.lower():value for key, value in (headers or {}).items()}
+    remaining = headers.get('x-ratelimit-remaining', headers.get('ratelimit-remaining'))
+    limit = headers.get('x-ratelimit-limit', headers.get('ratelimit-limit'))
+    _, requests_by_host, rate_limits = _recorded()
+    with _instrumentation_lock:
+        stats = requests_by_host.setdefault(host, {'count': 0, 'seconds': 0.0, 'statuses': {}})
+        stats['count'] += 1
+        stats['seconds'] = round(stats['seconds'] + seconds, 6)
+        stats['statuses'][str(status)] = stats['statuses'].get(str(status), 0) + 1
+        if remaining is not None:
+            headroom = rate_limits.setdefault(host, {})
+            headroom['remaining'] = int(remaining)
+            headroom['lowest'] = min(int(remaining), headroom.get('lowest', int(remaining)))
+            if limit is not None:
+                headroom['limit'] = int(limit)
+
+def instrumentation():
+    """
+    Returns a summary of everything recorded so far in this run, formatted
+    like so:
+
+        {
+            'phases': {
+                <span name>: {'count': 1, 'seconds': 0.42, 'max_seconds': 0.42},
+                ...
+            },
+            'requests': {
+                <host>: {'count': 12, 'seconds': 1.23, 'statuses': {'200': 12}},
+                ...
+            },
+            'rate_limits': {
+                <host>: {'remaining': 4990, 'lowest': 4990, 'limit': 5000},
+                ...
+            }
+        }
+    """
+    spans, requests_by_host, rate_limits = _recorded()
+    with _instrumentation_lock:
+        phases = {}
+        for record in spans:
+            seconds = (record['end'] - record['start']) / 1e9
+            phase = phases.setdefault(record['name'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            phase['count'] += 1
+            phase['seconds'] = round(phase['seconds'] + seconds, 6)
+            phase['max_seconds'] = round(max(phase['max_seconds'], seconds), 6)
+        return {
+            'phases': phases,
+            'requests': json.loads(json.dumps(requests_by_host)),
+            'rate_limits': json.loads(json.dumps(rate_limits)),
+        }
+
+def action_setinstrumentation():
+    """
+    (SIDE-EFFECT) Sets the `instrumentation` output of the running Github
+    workflow step to a JSON summary of what was recorded during this run.
+
+    If `SYNDICATE_TRACE_FILE` is set, every span is also written there in the
+    OpenTelemetry (OTLP/JSON) trace format.
+    @see https://opentelemetry.io/docs/specs/otlp/#json-protobuf-encoding
+    """
+    action_setoutput('instrumentation', json.dumps(instrumentation(), separators=(',', ':')))
+    if not os.getenv('SYNDICATE_TRACE_FILE'):
+        return
+    trace_id = secrets.token_hex(16)
+    recorded_spans, _, _ = _recorded()
+    with _instrumentation_lock:
+        spans = [
+            {
+                'traceId': trace_id,
+                'spanId': record['id'],
+                **({'parentSpanId': record['parent']} if record['parent'] else {}),
+                'name': record['name'],
+                'kind': 1,  # SPAN_KIND_INTERNAL
+                'startTimeUnixNano': str(record['start']),
+                'endTimeUnixNano': str(record['end']),
+                'attributes': [
+                    {'key': key, 'value': {'stringValue': str(value)}}
+                    for key, value in record['attributes'].items()
+                ],
+            }
+            for record in recorded_spans
+        ]
+    with open(os.getenv('SYNDICATE_TRACE_FILE'), 'w') as f:
+        json.dump({
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'syndicate'}}]},
+                'scopeSpans': [{'scope': {'name': 'syndicate'}, 'spans': spans}],
+            }]
+        }, f)
+
+@contextlib.contextmanager
+def recording():
+    """
+    Records the spans and requests of the managed block (and of anything it
+    runs concurrently) apart from everything else, such that
+    :func:`~syndicate.utils.instrumentation` only summarises those within it.
+    """
+    token = _recording.set(([], {}, {}))
+    try:
+        yield
+    finally:
+        _recording.reset(token)
+
+@contextlib.contextmanager
+def environment(**overrides):
+    """
+    Runs the managed block (and anything it runs concurrently) as though the
+    process environment had the given variables set, or unset if given None;
+    without changing the environment of anything else running at the same time.
+
+    Changes made to the environment within the block stay within it.
+
+    NOTE Subprocesses inherit the real process environment, not the one seen
+    within the block: anything run in a subprocess must be handed
+    `env=dict(os.environ)` explicitly to see it, like :func:`_git` is.
+    """
+    _install_environ()
+    overlay = dict(_environment.get() or {}, **overrides)
+    token = _environment.set(overlay)
+    try:
+        yield
+    finally:
+        _environment.reset(token)
+
 def action_setenv(key, value):
     """
     (SIDE-EFFECT) Sets an environment variable of the running Github workflow job.
@@ -51,31 +321,161 @@ def job_addoutput(results):
     """
     (SIDE-EFFECT) Persist `results` for future steps in the running Github
     workflow job.
+
+    Results are appended to the job state file, one compact record per post,
+    so persisting them costs no more than the results themselves, however many
+    posts earlier steps syndicated.
+    @see :func:`~syndicate.utils.job_state_path`
+    """
+    path = job_state_path()
+    if not path:
+        action_debug("No RUNNER_TEMP directory, not persisting results for future steps.")
+        return
+    lines = [
+        json.dumps([silo, bucket, post_path, result], separators=(',', ':')) + '\n'
+        for silo, outcome in (results or {}).items()
+        for bucket, posts in (outcome or {}).items()
+        for post_path, result in (posts or {}).items()
+    ]
+    if not lines:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.writelines(lines)
+
+def merge_results(results, new_results):
+    """
+    Returns the given syndication results with the `new_results` folded in,
+    silo by silo and path by path; where both have a result for the same post,
+    the new one wins.
+    @see :func:`~syndicate.elsewhere`
+    """
+    merged = {silo:{bucket:dict(posts) for bucket, posts in (outcome or {}).items()} for silo, outcome in results.items()}
+    for silo, outcome in (new_results or {}).items():
+        for bucket, posts in (outcome or {}).items():
+            merged.setdefault(silo, {}).setdefault(bucket, {}).update(posts or {})
+    return merged
+
+def job_getoutput(silos=None):
     """
-    syndicated_posts = job_getoutput()
-    syndicated_posts.update(results)
-    action_setenv('SYNDICATE_POSTS', json.dumps(syndicated_posts))
+    Returns the persisted results of the running Github workflow job, merged
+    silo by silo and path by path; only those of the given `silos`, if any.
 
-def job_getoutput():
-    """Returns the persisted results of the running Github workflow job."""
+    Results persisted by other jobs and brought into this one, e.g. by the jobs
+    of a sharded run, are folded in first.
+    @see :func:`~syndicate.utils.merge_results`
+    @see :func:`~syndicate.utils.merged_result_paths`
+    """
     # Default to an empty dictionary if no results have yet been persisted.
-    return json.loads(os.getenv('SYNDICATE_POSTS', '{}'))
+    results = {}
+    silos = {silo.lower() for silo in silos} if silos else None
+    for path in merged_result_paths() + [job_state_path()]:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path) as f:
+            if path.endswith('.json'):
+                # NOTE The `syndicated_posts` output of a step, saved to a file.
+                records = (
+                    (silo, bucket, post_path, result)
+                    for silo, outcome in (json.load(f) or {}).items()
+                    for bucket, posts in (outcome or {}).items()
+                    for post_path, result in (posts or {}).items()
+                )
+            else:
+                records = (json.loads(line) for line in f if line.strip())
+            for silo, bucket, post_path, result in records:
+                if silos is None or silo.lower() in silos:
+                    results.setdefault(silo, {}).setdefault(bucket, {})[post_path] = result
+    return results
+
+def merged_result_paths():
+    """
+    Returns the paths of the files holding results of other jobs to fold into
+    those of this one, as matched by the `SYNDICATE_MERGE_RESULTS` glob pattern.
+
+    Files ending in '.json' hold a `syndicated_posts` output; any others are job
+    state files.
+    @see :func:`~syndicate.utils.job_state_path`
+    """
+    pattern = os.getenv('SYNDICATE_MERGE_RESULTS')
+    if not pattern:
+        return []
+    return sorted(glob.glob(pattern, recursive=True))
+
+def job_state_path():
+    """
+    Returns the path of the file in which the results of the running Github
+    workflow job are persisted, or None if there's nowhere to put it.
+    @see :func:`~syndicate.utils.state_path`
+    """
+    return state_path(None, 'job-state.jsonl')
+
+def state_path(env_var, name=None):
+    """
+    Returns the path of the file (or directory) called `name` in which this
+    action keeps some state, or None if it isn't kept anywhere.
+
+    That's wherever the `env_var` environment variable says it is, unless it
+    says 'false'. By default it's in a `syndicate` directory in the RUNNER_TEMP
+    directory, which is shared by every step of the running Github workflow job
+    and emptied when the job ends; point `env_var` at a path restored and saved
+    by a cache to keep the state across workflow runs as well.
+    """
+    setting = os.getenv(env_var) if env_var else None
+    if setting and setting.lower() == 'false':
+        return None
+    if setting:
+        return setting
+    if not os.getenv('RUNNER_TEMP'):
+        return None
+    return os.path.join(os.getenv('RUNNER_TEMP'), 'syndicate', *([name] if name else []))
+
+def shard_for(spec):
+    """
+    Returns the given shard specification, e.g. '3/8' for the third of eight
+    shards, as a (shard, shards) tuple; or None if there isn't one.
+    """
+    if not spec:
+        return None
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"invalid shard '{spec}', expected e.g. '3/8'")
+    if not 1 <= index <= count:
+        raise ValueError(f"invalid shard '{spec}', expected 1/{count} to {count}/{count}")
+    return index, count
+
+def in_shard(path, shard):
+    """
+    Returns True if the given path belongs to the given (shard, shards) tuple.
+
+    Paths are spread across shards by a hash of the path alone, so every job of
+    a sharded run agrees on which shard each post belongs to, and a post always
+    lands in the same one.
+    """
+    if not shard:
+        return True
+    index, count = shard
+    digest = hashlib.sha1(path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count == index - 1
 
-# Memoize authentication and repo fetching.
-@functools.lru_cache(maxsize=1)
 def repo():
     """
-    (MEMOIZED) Returns an authenticated reference to a repository object for the
+    Returns an authenticated reference to a repository object for the
     repository this Github action is running in.
+
+    (MEMOIZED) The most recently used repositories are kept, along with the
+    clients they were fetched by, so that switching between them is free.
+    @see :data:`~syndicate.utils.DEFAULT_REPO_CACHE_SIZE`
     @see https://pygithub.readthedocs.io/en/latest/github_objects/Repository.html#github.Repository.Repository
     """
     if not os.getenv("GITHUB_TOKEN"):
         raise ValueError("missing GITHUB_TOKEN")
     if not os.getenv("GITHUB_REPOSITORY"):
         raise ValueError("missing GITHUB_REPOSITORY")
-
-    gh = Github(os.getenv("GITHUB_TOKEN"))
-    return gh.get_repo(os.getenv("GITHUB_REPOSITORY"))
+    # NOTE Github provides GITHUB_API_URL, which differs on Github Enterprise.
+    client = _github(os.getenv("GITHUB_TOKEN"), os.getenv("GITHUB_API_URL", "https://api.github.com"))
+    return _repo_of(client, os.getenv("GITHUB_REPOSITORY"))
 
 def parent_sha():
     """
@@ -86,6 +486,13 @@ def parent_sha():
         raise ValueError("missing GITHUB_SHA")
     return os.getenv('SYNDICATE_SHA', os.getenv("GITHUB_SHA"))
 
+def branch_name():
+    """Returns the name of the branch that triggered this Github workflow."""
+    ref = os.getenv('GITHUB_REF')
+    if not ref:
+        raise ValueError("missing GITHUB_REF")
+    return ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+
 def get_trigger_payload():
     """
     Returns a list of lightweight File objects describing each of the modified
@@ -111,33 +518,297 @@ def file_contents(filepath):
     # to the post frontmatter by previous actions.
     return repo().get_contents(filepath, ref=parent_sha())
 
+def bulk_file_contents(filepaths, shas=None):
+    """
+    Returns a list of ContentFile-like :class:`Post` objects matching the given
+    paths in the latest known commit to this repo, in the same order.
+
+    Rather than asking for each file in turn, this reads the commit's tree once
+    to learn the blob SHA of every path and then fetches the blobs concurrently.
+    If the blob SHAs are already known, they can be given as `shas` (a dictionary
+    keyed by path) to skip reading the tree altogether.
+    @see :func:`~syndicate.utils.file_contents`
+    """
+    filepaths = list(filepaths)
+    if not filepaths:
+        return []
+    shas = dict(shas or {})
+    if not all(path in shas for path in filepaths):
+        tree = repo().get_git_tree(parent_sha(), recursive=True)
+        if tree.raw_data.get('truncated'):
+            action_warn("This repo is too big to read in one go, some posts will be fetched individually.")
+        shas = dict(
+            {element.path:element.sha for element in tree.tree if element.type == 'blob'},
+            **shas
+        )
+
+    def _fetch(path):
+        # NOTE Anything missing from a truncated tree is fetched the slow way.
+        if path not in shas:
+            contents = file_contents(path)
+            return Post.of(contents)
+        blob = repo().get_git_blob(shas[path])
+        return Post(path, blob.sha, base64.b64decode(blob.content))
+    return concurrently(
+        _fetch,
+        filepaths,
+        max_workers=int(os.getenv('SYNDICATE_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    )
+
 def get_posts(post_dir=os.getenv('SYNDICATE_POST_DIR', 'posts')):
     """
-    Returns the latest known :func:`~syndicate.utils.file_contents` of the files
-    added and modified in the commit that triggered this Github workflow.
+    Returns the latest known contents of the files added and modified in the
+    commit that triggered this Github workflow, as ContentFile-like objects;
+    only those in the `SYNDICATE_SHARD` of the posts, if any.
+    @see :func:`~syndicate.utils.iter_post_batches`
     """
-    files = get_trigger_payload()
-    if not files:
-        raise ValueError("target commit was empty")
+    return [post for batch in iter_post_batches(post_dir, batch_size=None, backfill=None) for post in batch]
 
-    posts = [file for file in files if file.filename.startswith(post_dir)]
-    return [
-        file_contents(post.filename)
-        for post in posts
-        if post.status != 'deleted'  # ignore deleted files
+def iter_post_batches(
+    post_dir=os.getenv('SYNDICATE_POST_DIR', 'posts'),
+    batch_size=int(os.getenv('SYNDICATE_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+    backfill=os.getenv('SYNDICATE_BACKFILL'),
+    exclude=(),
+    shard=os.getenv('SYNDICATE_SHARD'),
+):
+    """
+    Yields the latest known contents of the posts to syndicate, as lists of at
+    most `batch_size` ContentFile-like objects; each batch is only fetched once
+    the previous one has been dealt with, so that there's never more than one
+    batch of posts in memory at a time.
+
+    Which posts are yielded depends on `backfill`:
+    - by default, the ones added or modified in the commit that triggered this
+      Github workflow
+    - 'push', the ones added or modified by any of the commits in the push that
+      triggered this Github workflow
+    - 'all', every post in `post_dir`
+
+    Any paths in `exclude` are skipped, as are any outside the given `shard` of
+    the posts, e.g. '3/8' for the third of eight shards.
+    @see :func:`~syndicate.utils.in_shard`
+
+    The posts are read from the content source named by the
+    `SYNDICATE_CONTENT_SOURCE` environment variable: 'local' reads them from the
+    repo checked out in the GITHUB_WORKSPACE, 'github' reads them over the Github
+    API. By default, the local checkout is used if it's usable and the API if not.
+    @see :data:`~syndicate.utils.CONTENT_SOURCES`
+    """
+    source = content_source()
+    shard = shard_for(shard)
+    with span('list posts', backfill=backfill or 'none'):
+        if not backfill:
+            files = source.changes(None)
+            if not files:
+                raise ValueError("target commit was empty")
+        elif backfill == 'push':
+            files = source.changes(_push_range())
+        elif backfill == 'all':
+            files = source.everything(post_dir)
+        else:
+            raise ValueError(f"unknown backfill mode '{backfill}'")
+
+    exclude = set(exclude)
+    files = [
+        file for file in files
+        if file.filename.startswith(post_dir)
+        and file.status != 'removed'  # ignore deleted files
+        and file.filename not in exclude
+        and in_shard(file.filename, shard)
+    ]
+    if shard:
+        action_log(f"Shard {shard[0]} of {shard[1]} has {len(files)} posts.")
+    batch_size = batch_size or len(files) or 1
+    for start in range(0, len(files), batch_size):
+        with span('read posts', count=len(files[start:start + batch_size])):
+            batch = source.read(files[start:start + batch_size])
+        yield batch
+
+def removed_posts(
+    post_dir=os.getenv('SYNDICATE_POST_DIR', 'posts'),
+    backfill=os.getenv('SYNDICATE_BACKFILL'),
+    exclude=(),
+    shard=os.getenv('SYNDICATE_SHARD'),
+):
+    """
+    Returns the contents of the posts removed by the commit that triggered this
+    Github workflow as they were just before it, as ContentFile-like objects;
+    all read at once.
+
+    When backfilling 'push', the posts removed by any of the commits in the push
+    are returned, as they were before the push. When backfilling 'all', there
+    are none: only posts that exist are considered.
+
+    Any paths in `exclude`, or outside the given `shard` of the posts, are skipped.
+    @see :func:`~syndicate.utils.iter_post_batches`
+    """
+    if backfill == 'all':
+        return []
+    source = content_source()
+    shard = shard_for(shard)
+    commit_range = _push_range() if backfill == 'push' else None
+    with span('list removed posts'):
+        files = source.changes(commit_range)
+    exclude = set(exclude)
+    paths = [
+        file.filename for file in files
+        if file.filename.startswith(post_dir)
+        and file.status == 'removed'
+        and file.filename not in exclude
+        and in_shard(file.filename, shard)
     ]
+    if not paths:
+        return []
+    if not os.getenv('GITHUB_SHA'):
+        raise ValueError("missing GITHUB_SHA")
+    before = commit_range[0] if commit_range else f"{os.getenv('GITHUB_SHA')}^"
+    with span('read removed posts', count=len(paths)):
+        return source.read_at(paths, before)
+
+def read_posts(paths):
+    """
+    Returns the latest known contents of the posts at the given paths, as a
+    list of ContentFile-like objects, read from the configured content source.
+    @see :func:`~syndicate.utils.content_source`
+    """
+    with span('read posts', count=len(paths)):
+        return content_source().read([_ChangedFile(path, 'modified', None) for path in paths])
+
+def claimed_silo_ids(silo, post_dir=os.getenv('SYNDICATE_POST_DIR', 'posts')):
+    """
+    Returns the set of IDs for the given `silo` found in the frontmatter of the
+    posts in `post_dir`, as of the latest known commit; i.e. the articles which
+    already belong to a post.
+    @see :func:`~syndicate.utils.parent_sha`
+    """
+    return _claimed_silo_ids(silo, post_dir, parent_sha())
+
+def blob_shas(paths):
+    """
+    Returns the git blob SHAs of whichever of the given paths are files in the
+    latest known commit, keyed by path, according to the content source.
+    @see :func:`~syndicate.utils.content_source`
+    """
+    paths = sorted(set(paths))
+    if not paths:
+        return {}
+    return content_source().shas(paths)
+
+def content_source():
+    """
+    Returns the :data:`~syndicate.utils.CONTENT_SOURCES` entry named by the
+    `SYNDICATE_CONTENT_SOURCE` environment variable, picking the local checkout
+    over the Github API if left up to us.
+    """
+    source = os.getenv('SYNDICATE_CONTENT_SOURCE', 'auto').lower()
+    if source == 'auto':
+        source = 'local' if _local_checkout() else 'github'
+    if source not in CONTENT_SOURCES:
+        raise ValueError(f"unknown content source '{source}'")
+    action_debug(f"Reading posts from the {source} content source.")
+    return CONTENT_SOURCES[source]
+
+class Post:
+    """
+    A light-weight, ContentFile-like representation of a post in this repo,
+    which decodes and parses its contents at most once, and only when needed.
+    @see https://pygithub.readthedocs.io/en/latest/github_objects/ContentFile.html#github.ContentFile.ContentFile
+    """
+    __slots__ = ('path', 'sha', 'decoded_content', '_text', '_fronted', '_header', 'rewrites')
+
+    def __init__(self, path, sha, decoded_content):
+        self.path = path
+        self.sha = sha
+        self.decoded_content = decoded_content
+        self._text = None
+        self._fronted = None
+        self._header = None
+        # The text of this post as rewritten for syndication, keyed by namespace.
+        # @see :func:`~syndicate.assets.rewrite`
+        self.rewrites = {}
+
+    @classmethod
+    def of(cls, contents):
+        """
+        Returns a :class:`Post` of the given ContentFile-like object.
+
+        If `contents` is actually already a `Post`, this is a no-op.
+        """
+        if not contents:
+            raise ValueError("missing contents")
+        if isinstance(contents, cls):
+            return contents
+        return cls(contents.path, getattr(contents, 'sha', None), contents.decoded_content)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def text(self):
+        """(LAZY) The contents of this post as a string."""
+        if self._text is None:
+            self._text = self.decoded_content.decode('utf-8')
+        return self._text
+
+    @property
+    def fronted(self):
+        """(LAZY) The :py:class:`frontmatter.Post` representation of this post."""
+        if self._fronted is None:
+            import frontmatter
+            with span('parse post', path=self.path):
+                self._fronted = frontmatter.loads(self.text)
+        return self._fronted
+
+    @property
+    def metadata(self):
+        """(LAZY) The frontmatter of this post."""
+        return self.fronted.metadata
+
+    def get(self, key, default=None):
+        """
+        Returns the value of `key` in the frontmatter of this post, or `default`
+        if it's not there.
+
+        Simple keys are looked up without parsing the post: the frontmatter is
+        scanned for top-level keys with plain scalar values, and the full YAML
+        parser is only used if the key's value (or the frontmatter itself) is
+        anything more complicated than that.
+        @see :func:`~syndicate.utils._scan_header`
+        """
+        if self._fronted is None:
+            if self._header is None:
+                header = _scan_header(self.text)
+                self._header = _UNSCANNABLE if header is None else header
+            if self._header is not _UNSCANNABLE:
+                value = self._header.get(key, default)
+                if value is not _COMPLEX:
+                    return value
+        return self.fronted.get(key, default)
+
+    @property
+    def body(self):
+        """(LAZY) The contents of this post without its frontmatter."""
+        return self.fronted.content
+
+    def __repr__(self):
+        return f'Post(path={self.path!r}, sha={self.sha!r})'
 
 def fronted(post):
     """
     Returns the :py:class:`frontmatter.Post` representation of the given
     :func:`~syndicate.utils.file_contents` object.
 
-    If `post` is actually already a `frontmatter.Post`, this is a no-op.
+    If `post` is actually already a `frontmatter.Post`, this is a no-op. If it
+    is a :class:`Post`, its cached representation is returned.
     """
     if not post:
         raise ValueError("missing post")
+    import frontmatter
     if isinstance(post, frontmatter.Post):
         return post
+    if isinstance(post, Post):
+        return post.fronted
     raw_contents = post.decoded_content.decode('utf-8')
     return frontmatter.loads(raw_contents)
 
@@ -154,107 +825,453 @@ def silo_id_for(post, silo):
         raise ValueError("missing post")
     if not silo:
         raise ValueError("missing silo")
+    if isinstance(post, Post):
+        return post.get(silo_key_for(silo))
     return fronted(post).get(silo_key_for(silo))
 
-def mark_syndicated_posts(silo_ids_by_path, fronted_posts_by_path):
-    """
-    Injects the given silo IDs for the given posts into their frontmatter
-    and commits the updated posts back to this repo.
-
-    If a silo ID already exists in a given post, that's fine: we assume IDs don't
-    change, and so we don't try to change them.
-
-    Returns a dictionary which is the response of the commit request.
-    """
-    if not silo_ids_by_path:
-        raise ValueError("missing silo IDs")
-    if not fronted_posts_by_path:
-        raise ValueError("missing fronted posts")
-
-    updated_fronted_posts_by_path = {}
-    silos_included = set()
-    for path, silo_ids_by_silo in silo_ids_by_path.items():
-        fronted_post = fronted_posts_by_path[path]
-
-        # Format:
-        # {
-        #     'dev_silo_id': 42,
-        #     'medium_silo_id': 'abc123',
-        #     ...
-        # }
-        new_silo_ids = {}
-        for silo, sid in silo_ids_by_silo.items():
-            # Ignore already posts marked with this silo
-            if not silo_id_for(fronted_post, silo):
-                new_silo_ids[silo_key_for(silo)] = sid
-                silos_included.add(silo)
-
-        # Only add to commit if there're any new IDs to add.
-        if not new_silo_ids:
+### privates ###
+
+# Memoize authentication and repo fetching.
+@functools.lru_cache(maxsize=int(os.getenv('SYNDICATE_REPO_CACHE_SIZE', DEFAULT_REPO_CACHE_SIZE)))
+def _github(token, base_url):
+    """
+    (MEMOIZED) Returns a Github API client authenticated with the given token,
+    whose reads are cached whenever there's somewhere to cache them.
+    @see :class:`~syndicate.httpcache.CachingAdapter`
+    """
+    # NOTE PyGithub takes a while to import, so only do so when it's needed.
+    from github import Github
+    from github.Requester import Requester
+    from syndicate import httpcache
+    httpcache.install()
+    Requester.injectLogger(_github_request_log)
+    return Github(
+        token,
+        base_url=base_url,
+        # NOTE
+        # By default, PyGithub waits a quarter second between any two requests,
+        # which serializes our concurrent reads. Writes are still spaced out.
+        seconds_between_requests=None
+    )
+
+@functools.lru_cache(maxsize=int(os.getenv('SYNDICATE_REPO_CACHE_SIZE', DEFAULT_REPO_CACHE_SIZE)))
+def _repo_of(client, name):
+    """(MEMOIZED) Returns the repository of the given name, fetched by the given client."""
+    return client.get_repo(name)
+
+# A lightweight, File-like description of a changed file. The blob SHA is only
+# given if it is known to match the latest known commit.
+# @see https://pygithub.readthedocs.io/en/latest/github_objects/File.html#github.File.File
+_ChangedFile = collections.namedtuple('_ChangedFile', ['filename', 'status', 'sha'])
+
+def _github_changes(commit_range):
+    """
+    Returns a list of lightweight File-like objects describing each of the files
+    changed by the trigger commit of this Github workflow, or by the given
+    `(before, after)` range of commits, according to the Github API.
+    """
+    if commit_range:
+        files = repo().compare(*commit_range).files
+    else:
+        files = get_trigger_payload()
+    # NOTE
+    # The changes describe the files as of GITHUB_SHA, so we can only trust their
+    # blob SHAs if no commits have been made since.
+    trusted = parent_sha() == os.getenv('GITHUB_SHA')
+    return [
+        _ChangedFile(file.filename, file.status, file.sha if trusted else None)
+        for file in files
+    ]
+
+def _github_everything(post_dir):
+    """
+    Returns a list of lightweight File-like objects describing every file in
+    `post_dir` in the latest known commit, according to the Github API.
+    """
+    tree = repo().get_git_tree(parent_sha(), recursive=True)
+    if tree.raw_data.get('truncated'):
+        action_warn("This repo is too big to read in one go, some posts may be missing.")
+    return [
+        _ChangedFile(element.path, 'unchanged', element.sha)
+        for element in tree.tree
+        if element.type == 'blob' and element.path.startswith(post_dir)
+    ]
+
+def _github_read(files):
+    """
+    Returns the latest known :func:`~syndicate.utils.bulk_file_contents` of the
+    given files, read over the Github API.
+    """
+    return bulk_file_contents(
+        [file.filename for file in files],
+        shas={file.filename:file.sha for file in files if file.sha}
+    )
+
+def _local_changes(commit_range):
+    """
+    Returns a list of lightweight File-like objects describing each of the files
+    changed by the trigger commit of this Github workflow, or by the given
+    `(before, after)` range of commits, according to the local checkout.
+
+    Falls back to the Github API if the local history isn't deep enough to tell
+    (e.g. in a shallow clone).
+    """
+    if not _local_checkout():
+        raise ValueError("no usable local checkout at GITHUB_WORKSPACE")
+    if not os.getenv('GITHUB_SHA'):
+        raise ValueError("missing GITHUB_SHA")
+    before, after = commit_range or (f"{os.getenv('GITHUB_SHA')}^", os.getenv('GITHUB_SHA'))
+    try:
+        # A shallow clone won't have the parent, and would make it seem as if
+        # every file had just been added.
+        _git('cat-file', '-e', before)
+    except subprocess.CalledProcessError:
+        return _github_changes(commit_range)
+    # NOTE Renames are detected so that, like over the Github API, a renamed
+    # post counts as changed at its new path rather than removed at its old one.
+    output = _git('diff', '--find-renames', '--name-status', '-z', before, after)
+    fields = iter(output.split('\0'))
+    statuses = {'A': 'added', 'D': 'removed', 'M': 'modified', 'R': 'renamed'}
+    files = []
+    for status in fields:
+        if not status:
             continue
+        if status[:1] == 'R':
+            next(fields)  # the path it was renamed from
+        files.append(_ChangedFile(next(fields), statuses.get(status[:1], 'changed'), None))
+    return files
 
-        # Create new fronted post with old frontmatter merged with silo IDs.
-        updated_post = frontmatter.Post(**dict(fronted_post.to_dict(), **new_silo_ids))
-        updated_fronted_posts_by_path[path] = updated_post
-    return commit_updated_posts(updated_fronted_posts_by_path, silos_included)
+def _local_everything(post_dir):
+    """
+    Returns a list of lightweight File-like objects describing every file in
+    `post_dir` in the local checkout.
+    """
+    if not _local_checkout():
+        raise ValueError("no usable local checkout at GITHUB_WORKSPACE")
+    output = _git('ls-files', '-z', '--', post_dir)
+    return [_ChangedFile(path, 'unchanged', None) for path in output.split('\0') if path]
 
-def commit_updated_posts(fronted_posts_by_path, silos):
+def _local_read(files):
     """
-    Returns the response of committing the (presumably changed) given posts to
-    the remote GITHUB_REF of this repo by following the recipe outlined here:
+    Returns the :class:`Post` contents of the given files, read straight from
+    the local checkout of this repo.
+    """
+    workspace = os.getenv('GITHUB_WORKSPACE')
+    posts = []
+    for file in files:
+        with open(os.path.join(workspace, file.filename), 'rb') as f:
+            contents = f.read()
+        posts.append(Post(file.filename, _git_blob_sha(contents), contents))
+    return posts
 
-        https://developer.github.com/v3/git/
+def _github_read_at(paths, revision):
+    """
+    Returns the :class:`Post` contents of the given paths as of the given
+    revision, read over the Github GraphQL API in as few requests as possible.
+    """
+    # NOTE Only loaded when there's something to read.
+    from syndicate import graphql
+    _, texts = graphql.read_files(paths, revision=revision)
+    return [Post(path, None, texts[path].encode('utf-8')) for path in paths if path in texts]
 
-    1. Get the current commit object
-    2. Retrieve the tree it points to
-    3. Retrieve the content of the blob object that tree has for that
-       particular file path
-    4. Change the content somehow and post a new blob object with that new
-       content, getting a blob SHA back
-    5. Post a new tree object with that file path pointer replaced with your
-       new blob SHA getting a tree SHA back
-    6. Create a new commit object with the current commit SHA as the parent
-       and the new tree SHA, getting a commit SHA back
-    7. Update the reference of your branch to point to the new commit SHA
+def _local_read_at(paths, revision):
     """
-    if not fronted_posts_by_path:
-        action_log("All good: already marked.")
-        return None
-    if not os.getenv("GITHUB_TOKEN"):
-        raise ValueError("missing GITHUB_TOKEN")
-    if not os.getenv("GITHUB_REPOSITORY"):
-        raise ValueError("missing GITHUB_REPOSITORY")
-    if not os.getenv("GITHUB_REF"):
-        raise ValueError("missing GITHUB_REF")
+    Returns the :class:`Post` contents of the given paths as of the given
+    revision, read from the history of the local checkout in a single git
+    command.
 
-    parent = parent_sha()
-    # Create a new tree with our updated blobs.
-    new_tree = repo().create_git_tree(
-        [
-            InputGitTreeElement(
-                path,
-                mode='100644', # 'file', @see https://developer.github.com/v3/git/trees/#tree-object
-                type='blob',
-                content=frontmatter.dumps(fronted_post)
-            )
-            for path, fronted_post in fronted_posts_by_path.items()
-        ],
-        base_tree=repo().get_git_tree(parent)
-    )
+    Falls back to the Github API if the local history doesn't go back that far
+    (e.g. in a shallow clone).
+    """
+    if not _local_checkout():
+        raise ValueError("no usable local checkout at GITHUB_WORKSPACE")
+    try:
+        _git('cat-file', '-e', revision)
+    except subprocess.CalledProcessError:
+        return _github_read_at(paths, revision)
+    output = subprocess.run(
+        ['git', '-c', 'safe.directory=*', 'cat-file', '--batch'],
+        cwd=os.getenv('GITHUB_WORKSPACE'),
+        env=dict(os.environ),
+        input=''.join(f'{revision}:{path}\n' for path in paths).encode('utf-8'),
+        check=True,
+        capture_output=True
+    ).stdout
+    # Format: <sha> SP <type> SP <size> LF <contents> LF, or <object> SP missing LF
+    posts = []
+    position = 0
+    for path in paths:
+        end = output.index(b'\n', position)
+        header = output[position:end].decode('utf-8').split()
+        position = end + 1
+        if header[-1] == 'missing':
+            continue
+        sha, _, size = header
+        contents = output[position:position + int(size)]
+        position += int(size) + 1
+        posts.append(Post(path, sha, contents))
+    return posts
 
-    # Commit the new tree.
-    new_commit = repo().create_git_commit(
-        f'(syndicate): adding IDs for {silos}',
-        new_tree,
-        [repo().get_git_commit(parent)]
-    )
-    # Poosh it.
-    ref_name = os.getenv('GITHUB_REF').lstrip('refs/')
+@functools.lru_cache(maxsize=1)
+def _claimed_silo_ids(silo, post_dir, sha):
+    """
+    (MEMOIZED) Returns the IDs for the given silo found in the posts in
+    `post_dir` as of the given commit, read from the content source.
+    """
+    source = content_source()
+    with span('read claimed silo IDs', silo=silo):
+        posts = source.read(source.everything(post_dir))
+    return frozenset(silo_id for silo_id in (silo_id_for(Post.of(post), silo) for post in posts) if silo_id)
+
+def _github_shas(paths):
+    """
+    Returns the blob SHAs of whichever of the given paths are files in the
+    latest known commit, according to the Github API.
+    """
+    tree = _github_tree(parent_sha())
+    return {path:tree[path] for path in paths if path in tree}
+
+@functools.lru_cache(maxsize=1)
+def _github_tree(sha):
+    """(MEMOIZED) Returns the blob SHAs of every file in the given commit, keyed by path."""
+    tree = repo().get_git_tree(sha, recursive=True)
+    if tree.raw_data.get('truncated'):
+        action_warn("This repo is too big to read in one go, some files may be missing.")
+    return {element.path:element.sha for element in tree.tree if element.type == 'blob'}
+
+def _local_shas(paths):
+    """
+    Returns the blob SHAs of whichever of the given paths are files in the
+    local checkout.
+    """
+    if not _local_checkout():
+        raise ValueError("no usable local checkout at GITHUB_WORKSPACE")
+    shas = {}
+    # Format: <mode> SP <type> SP <sha> TAB <path>
+    for entry in _git('ls-tree', '-z', 'HEAD', '--', *paths).split('\0'):
+        if not entry:
+            continue
+        info, _, path = entry.partition('\t')
+        _, kind, sha = info.split()
+        if kind == 'blob':
+            shas[path] = sha
+    return shas
+
+# The places posts can be read from, by name.
+ContentSource = collections.namedtuple('ContentSource', ['changes', 'everything', 'read', 'shas', 'read_at'])
+CONTENT_SOURCES = {
+    'github': ContentSource(_github_changes, _github_everything, _github_read, _github_shas, _github_read_at),
+    'local': ContentSource(_local_changes, _local_everything, _local_read, _local_shas, _local_read_at),
+}
+
+@functools.lru_cache(maxsize=1)
+def _local_checkout():
+    """
+    (MEMOIZED) Returns True if this repo is checked out in the GITHUB_WORKSPACE
+    at the latest known commit, such that posts can be read straight from disk.
+    @see :func:`~syndicate.utils.parent_sha`
+    """
+    if not os.getenv('GITHUB_WORKSPACE'):
+        return False
     try:
-        repo().get_git_ref(ref_name).edit(new_commit.sha)
-    except github.GithubException as err:
-        action_error(f"Failed to mark syndicated posts: {err}")
+        return _git('rev-parse', 'HEAD').strip() == parent_sha()
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+def _push_range():
+    """
+    Returns the `(before, after)` range of commits in the push event that
+    triggered this Github workflow.
+    @see https://developer.github.com/v3/activity/events/types/#pushevent
+    """
+    if not os.getenv('GITHUB_EVENT_PATH'):
+        raise ValueError("missing GITHUB_EVENT_PATH")
+    with open(os.getenv('GITHUB_EVENT_PATH')) as f:
+        event = json.load(f)
+    if not event.get('before') or not event.get('after'):
+        raise ValueError("triggering event was not a push")
+    if not event['before'].strip('0'):
+        raise ValueError("push created a new branch, try backfilling 'all' posts instead")
+    return (event['before'], event['after'])
+
+# Stands in for values too complicated for :func:`_scan_header` to make out.
+_COMPLEX = object()
+# Stands in for frontmatter too complicated for :func:`_scan_header` to scan.
+_UNSCANNABLE = {}
+_HEADER_BOUNDARY = re.compile(r'^-{3,}\s*$', re.MULTILINE)
+_HEADER_KEY = re.compile(r'([A-Za-z_][\w-]*)[ \t]*:(?:[ \t]+(.*?))?[ \t]*')
+_YAML_BOOLS = {
+    **dict.fromkeys(('yes', 'Yes', 'YES', 'true', 'True', 'TRUE', 'on', 'On', 'ON'), True),
+    **dict.fromkeys(('no', 'No', 'NO', 'false', 'False', 'FALSE', 'off', 'Off', 'OFF'), False),
+}
+_YAML_NULLS = {'~', 'null', 'Null', 'NULL'}
+
+def _scan_header(text):
+    """
+    Returns the top-level keys of the YAML frontmatter of the given post text,
+    mapped to their values if they're simple scalars and to `_COMPLEX` if not;
+    or None if the frontmatter can't be scanned at all.
+
+    This mimics :py:func:`frontmatter.loads` for the keys it makes out, without
+    going anywhere near the body of the post or a YAML parser. Only a YAML
+    header is scanned: anything else (e.g. a JSON or TOML header, or no header
+    at all) is left to the full parser.
+    """
+    text = text.strip()
+    if not _HEADER_BOUNDARY.match(text):
         return None
-    ## NOTE Need to update the reference SHA for future workflow steps.
-    action_setenv('SYNDICATE_SHA', new_commit.sha)
-    action_log("Syndicate posts marked.")
+    parts = _HEADER_BOUNDARY.split(text, 2)
+    if len(parts) < 3:
+        return None
+    header = {}
+    key = None
+    for line in parts[1].splitlines():
+        if not line.strip() or line.startswith('#'):
+            continue
+        if line[0] in ' \t-' and key:
+            # Part of a multi-line value, like a list or a folded string.
+            header[key] = _COMPLEX
+            continue
+        match = _HEADER_KEY.fullmatch(line)
+        if not match or match.group(1) in _YAML_BOOLS or match.group(1) in _YAML_NULLS:
+            return None
+        key = match.group(1)
+        header[key] = _scan_scalar(match.group(2))
+    return header
+
+def _scan_scalar(value):
+    """Returns the given YAML scalar as PyYAML's SafeLoader would, or `_COMPLEX` if unsure."""
+    if not value:
+        return _COMPLEX
+    if value in _YAML_BOOLS:
+        return _YAML_BOOLS[value]
+    if value in _YAML_NULLS:
+        return None
+    if re.fullmatch(r'-?(0|[1-9][0-9]*)', value):
+        return int(value)
+    if value[0] == "'" and value[-1] == "'" and len(value) > 1:
+        inner = value[1:-1]
+        return inner.replace("''", "'") if "'" not in inner.replace("''", '') else _COMPLEX
+    if value[0] == '"' and value[-1] == '"' and len(value) > 1:
+        inner = value[1:-1]
+        return inner if '"' not in inner and '\\' not in inner else _COMPLEX
+    if value[0] in '0123456789+-.[]{}#&*!|>\'"%@`,?:<=~' or ': ' in value or ' #' in value or '\t' in value or value.endswith(':'):
+        return _COMPLEX
+    return value
+
+def _git(*args):
+    """Runs the given git command in the GITHUB_WORKSPACE and returns its output."""
+    return subprocess.run(
+        # NOTE The workspace is usually owned by a different user than us.
+        ['git', '-c', 'safe.directory=*', *args],
+        cwd=os.getenv('GITHUB_WORKSPACE'),
+        # NOTE Passed explicitly, so that git sees any contextual environment.
+        # @see :func:`~syndicate.utils.environment`
+        env=dict(os.environ),
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+
+def _git_blob_sha(contents):
+    """Returns the SHA git would give a blob with the given contents."""
+    return hashlib.sha1(b'blob %d\0' % len(contents) + contents).hexdigest()
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_spans = []
+_requests = {}
+_rate_limits = {}
+_recording = contextvars.ContextVar('recording', default=None)
+_instrumentation_lock = threading.Lock()
+
+def _recorded():
+    """
+    Returns the spans, requests and rate limits being recorded in the current
+    context: those of the enclosing :func:`~syndicate.utils.recording`, if any.
+    """
+    return _recording.get() or (_spans, _requests, _rate_limits)
+
+_environment = contextvars.ContextVar('environment', default=None)
+_environ_lock = threading.Lock()
+
+class _ContextualEnviron(collections.abc.MutableMapping):
+    """
+    Stands in for :data:`os.environ`, overlaying it with whatever variables the
+    current context sets by way of :func:`~syndicate.utils.environment`.
+    """
+    def __init__(self, environ):
+        self.environ = environ
+
+    def __getitem__(self, key):
+        overlay = _environment.get()
+        if overlay is not None and key in overlay:
+            if overlay[key] is None:
+                raise KeyError(key)
+            return overlay[key]
+        return self.environ[key]
+
+    def __setitem__(self, key, value):
+        overlay = _environment.get()
+        if overlay is None:
+            self.environ[key] = value
+        else:
+            overlay[key] = value
+
+    def __delitem__(self, key):
+        overlay = _environment.get()
+        if overlay is None:
+            del self.environ[key]
+            return
+        self[key]  # raises KeyError if it isn't set
+        overlay[key] = None
+
+    def __iter__(self):
+        overlay = _environment.get() or {}
+        yield from (key for key in self.environ if key not in overlay)
+        yield from (key for key, value in overlay.items() if value is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        return dict(self)
+
+def _install_environ():
+    """(SIDE-EFFECT) Makes :data:`os.environ` (and so :func:`os.getenv`) contextual, once."""
+    with _environ_lock:
+        if not isinstance(os.environ, _ContextualEnviron):
+            os.environ = _ContextualEnviron(os.environ)
+
+class _GithubRequestRecorder(logging.Handler):
+    """
+    Records the requests PyGithub makes, by way of its debug log; which is then
+    passed on to PyGithub's own logger, as though we weren't listening.
+    @see :func:`~syndicate.utils.record_request`
+    """
+    def emit(self, record):
+        # Format: verb, scheme, hostname, url, request headers, input, status, response headers, output
+        if isinstance(record.args, tuple) and len(record.args) == 9:
+            _, _, hostname, _, _, _, status, headers, _ = record.args
+            # NOTE PyGithub doesn't tell us how long the request took.
+            record_request(hostname, status, 0.0, headers)
+        logger = logging.getLogger('github.Requester')
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+# The logger PyGithub is given to log its requests to, so they can be recorded.
+# NOTE Made outside of the logging hierarchy, so that whatever logging has been
+# configured by the host (including for PyGithub) is left alone.
+_github_request_log = logging.Logger('syndicate.github', logging.DEBUG)
+_github_request_log.addHandler(_GithubRequestRecorder())
+
+_log_buffer = contextvars.ContextVar('log_buffer', default=None)
+_log_lock = threading.Lock()
+
+def _emit(msg):
+    """(SIDE-EFFECT) Prints `msg`, or buffers it if inside a log group."""
+    buffer = _log_buffer.get()
+    if buffer is not None:
+        buffer.append(msg)
+        return
+    with _log_lock:
+        print(msg)
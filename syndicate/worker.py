@@ -0,0 +1,259 @@
+from syndicate.coalesce import OWN_COMMIT_PREFIX
+from syndicate.utils import action_error, action_log, action_log_group, action_warn, environment, recording
+
+import collections
+import concurrent.futures
+import hashlib
+import hmac
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+
+# The number of pushes handled at once unless otherwise specified.
+DEFAULT_WORKER_THREADS = 4
+# How long to wait between looks at a queue directory, in seconds.
+QUEUE_POLL_INTERVAL = 2
+
+class Dispatcher:
+    """
+    Handles events on a pool of threads, in the order they were submitted for
+    any one key (e.g. repository), and concurrently across keys.
+    """
+    def __init__(self, handle, max_workers=None):
+        self.handle = handle
+        self.pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('SYNDICATE_WORKER_THREADS', DEFAULT_WORKER_THREADS)),
+            thread_name_prefix='syndicate-worker'
+        )
+        self.lock = threading.Lock()
+        # The events waiting on the one being handled for each key, by key.
+        self.waiting = {}
+
+    def submit(self, key, event):
+        """(SIDE-EFFECT) Handles the given event once those before it with the same key have been."""
+        with self.lock:
+            if key in self.waiting:
+                self.waiting[key].append(event)
+                return
+            self.waiting[key] = collections.deque()
+        self.pool.submit(self._handle, key, event)
+
+    def shutdown(self):
+        """(SIDE-EFFECT) Waits for every event submitted so far to be handled."""
+        while True:
+            with self.lock:
+                if not self.waiting:
+                    break
+            time.sleep(0.05)
+        self.pool.shutdown(wait=True)
+
+    def _handle(self, key, event):
+        try:
+            self.handle(event)
+        except Exception as err:
+            action_error(f"Failed to handle event for {key}: {err!r}")
+        with self.lock:
+            if not self.waiting[key]:
+                del self.waiting[key]
+                return
+            event = self.waiting[key].popleft()
+        # NOTE Resubmitted rather than handled here, so that a busy key takes
+        # its turn with the others instead of holding on to a thread.
+        self.pool.submit(self._handle, key, event)
+
+def handle(event, run):
+    """
+    (SIDE-EFFECT) Handles the given push event, be it a payload or one read from
+    a queue directory; in which case it's cleaned up afterwards.
+    @see :func:`~syndicate.worker.handle_push`
+    """
+    if not isinstance(event, _QueuedEvent):
+        return handle_push(event, run)
+    try:
+        result = handle_push(event.payload, run)
+    except BaseException:
+        _fail(event.directory, event.path)
+        raise
+    os.remove(event.path)
+    return result
+
+def handle_push(payload, run):
+    """
+    (SIDE-EFFECT) Calls `run` as though it were a step of a Github workflow run
+    triggered by the given push event, and returns what it returns; or None if
+    the push wasn't one to syndicate.
+
+    Pushes to anything but the default branch of a repository, that delete the
+    branch, or that were made by this action itself, are ignored.
+
+    Each push is run with a fresh `RUNNER_TEMP` directory as its job. The ledger
+    and asset cache of each repository are kept in `SYNDICATE_WORKER_DIR`, so
+    that they carry over from one push to the next; as is the cache of Github
+    API responses, shared by every repository.
+    """
+    if not payload:
+        raise ValueError("missing payload")
+    repository = payload['repository']['full_name']
+    ref = payload.get('ref', '')
+    after = payload.get('after', '')
+    if ref != f"refs/heads/{payload['repository'].get('default_branch')}":
+        action_log(f"Ignoring push to {ref} of {repository}, which isn't its default branch.")
+        return None
+    if not after.strip('0'):
+        action_log(f"Ignoring deletion of {ref} of {repository}.")
+        return None
+    if (payload.get('head_commit') or {}).get('message', '').startswith(OWN_COMMIT_PREFIX):
+        action_log(f"Ignoring push of {after} to {repository}, which we made.")
+        return None
+
+    state_dir = os.path.join(worker_dir(), repository)
+    with tempfile.TemporaryDirectory(prefix='syndicate-') as runner_temp:
+        event_path = os.path.join(runner_temp, 'event.json')
+        with open(event_path, 'w') as f:
+            json.dump(payload, f)
+        with environment(
+            GITHUB_REPOSITORY=repository,
+            GITHUB_REF=ref,
+            GITHUB_SHA=after,
+            GITHUB_EVENT_NAME='push',
+            GITHUB_EVENT_PATH=event_path,
+            GITHUB_WORKSPACE=None,
+            RUNNER_TEMP=runner_temp,
+            SYNDICATE_SHA=None,
+            SYNDICATE_CONTENT_SOURCE='github',
+            SYNDICATE_LEDGER=os.getenv('SYNDICATE_LEDGER') or os.path.join(state_dir, 'ledger.json'),
+            SYNDICATE_ASSET_CACHE=os.getenv('SYNDICATE_ASSET_CACHE') or os.path.join(state_dir, 'assets.json'),
+            SYNDICATE_HTTP_CACHE=os.getenv('SYNDICATE_HTTP_CACHE') or os.path.join(worker_dir(), 'http-cache'),
+        ), recording():
+            return action_log_group(f"{repository}@{after[:7]}")(run)()
+
+def serve(dispatcher, host='127.0.0.1', port=8080):
+    """
+    (SIDE-EFFECT) Accepts Github push event webhooks over HTTP at the given
+    address, handing each one to the given dispatcher, until interrupted.
+
+    Only webhooks signed with `SYNDICATE_WEBHOOK_SECRET` are accepted, so this
+    refuses to start without one: otherwise, anyone able to reach the worker
+    could have it syndicate any repository its `GITHUB_TOKEN` can read.
+    @see :func:`~syndicate.worker.verify`
+    """
+    if not os.getenv('SYNDICATE_WEBHOOK_SECRET'):
+        raise ValueError("missing SYNDICATE_WEBHOOK_SECRET")
+    server = http.server.ThreadingHTTPServer((host, port), handler_for(dispatcher))
+    action_log(f"Listening for Github push events on {host or '*'}:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def handler_for(dispatcher):
+    """
+    Returns an HTTP request handler accepting signed Github push event webhooks,
+    and handing each one to the given dispatcher.
+    @see :func:`~syndicate.worker.serve`
+    """
+    class _Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not verify(body, self.headers.get('X-Hub-Signature-256')):
+                return self._respond(401, 'bad signature')
+            event = self.headers.get('X-GitHub-Event')
+            if event == 'ping':
+                return self._respond(200, 'pong')
+            if event != 'push':
+                return self._respond(202, f"ignoring {event} event")
+            try:
+                payload = json.loads(body)
+                dispatcher.submit(payload['repository']['full_name'], payload)
+            except (ValueError, KeyError, TypeError) as err:
+                return self._respond(400, f"bad push event: {err}")
+            self._respond(202, 'accepted')
+
+        def _respond(self, status, message):
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/plain')
+            self.end_headers()
+            self.wfile.write(message.encode('utf-8'))
+
+        def log_message(self, format, *args):
+            action_log(f"{self.address_string()} {format % args}")
+    return _Handler
+
+def watch(dispatcher, directory):
+    """
+    (SIDE-EFFECT) Hands each Github push event payload dropped into the given
+    directory as a '.json' file to the given dispatcher, oldest first, until
+    interrupted.
+    @see :func:`~syndicate.worker.poll`
+    """
+    action_log(f"Watching {directory} for Github push events")
+    while True:
+        poll(dispatcher, directory)
+        time.sleep(QUEUE_POLL_INTERVAL)
+
+def poll(dispatcher, directory):
+    """
+    (SIDE-EFFECT) Hands each Github push event payload currently in the given
+    directory to the given dispatcher, oldest first, and returns how many.
+
+    Each file is claimed by moving it into a 'processing' subdirectory, so that
+    several workers can share a directory without handling a push twice. It is
+    deleted once handled, or moved into a 'failed' subdirectory if that failed.
+    """
+    processing = os.path.join(directory, 'processing')
+    os.makedirs(processing, exist_ok=True)
+    names = sorted(
+        (name for name in os.listdir(directory) if name.endswith('.json')),
+        key=lambda name: (os.path.getmtime(os.path.join(directory, name)), name)
+    )
+    count = 0
+    for name in names:
+        path = os.path.join(processing, name)
+        try:
+            os.rename(os.path.join(directory, name), path)
+        except FileNotFoundError:
+            continue  # claimed by another worker
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+            key = payload['repository']['full_name']
+        except (ValueError, KeyError, TypeError) as err:
+            action_warn(f"Ignoring unreadable push event {name}: {err}")
+            _fail(directory, path)
+            continue
+        dispatcher.submit(key, _QueuedEvent(directory, path, payload))
+        count += 1
+    return count
+
+def verify(body, signature):
+    """
+    Returns True if the given webhook body was signed with the given signature
+    using `SYNDICATE_WEBHOOK_SECRET`; never if there is no such secret.
+    """
+    secret = os.getenv('SYNDICATE_WEBHOOK_SECRET')
+    if not secret or not signature:
+        return False
+    expected = 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def worker_dir():
+    """
+    Returns the directory in which the state of each repository is kept between
+    pushes: `SYNDICATE_WORKER_DIR`, or a 'syndicate' directory in the temporary
+    directory of the system.
+    """
+    return os.getenv('SYNDICATE_WORKER_DIR') or os.path.join(tempfile.gettempdir(), 'syndicate')
+
+### privates ###
+
+# A push event read from a queue directory, to be cleaned up once handled.
+_QueuedEvent = collections.namedtuple('_QueuedEvent', ['directory', 'path', 'payload'])
+
+def _fail(directory, path):
+    """(SIDE-EFFECT) Moves the given claimed event file into the 'failed' subdirectory."""
+    failed = os.path.join(directory, 'failed')
+    os.makedirs(failed, exist_ok=True)
+    os.replace(path, os.path.join(failed, os.path.basename(path)))
@@ -1,4 +1,6 @@
+import base64
 import frontmatter
+from types import SimpleNamespace
 import textwrap
 
 class MockPost:
@@ -18,3 +20,35 @@ class MockPost:
             """).strip()
         self.decoded_content = self.raw_contents.encode('utf-8')
         self.name = 'a-beautiful-mock.md'
+        self.path = f'posts/{self.name}'
+
+class MockRepo:
+    """
+    A light-weight mock of a repository object, serving the given files.
+    @see https://pygithub.readthedocs.io/en/latest/github_objects/Repository.html#github.Repository.Repository
+    """
+    def __init__(self, files):
+        self.files = {path:contents.encode('utf-8') for path, contents in files.items()}
+        self.calls = []
+
+    def get_git_tree(self, sha, recursive=False):
+        self.calls.append('get_git_tree')
+        return SimpleNamespace(
+            raw_data={'truncated': False},
+            tree=[SimpleNamespace(path=path, sha=_sha_of(path), type='blob') for path in self.files])
+
+    def get_git_blob(self, sha):
+        self.calls.append('get_git_blob')
+        path = next(path for path in self.files if _sha_of(path) == sha)
+        return SimpleNamespace(sha=sha, content=base64.b64encode(self.files[path]).decode('ascii'))
+
+    def get_commit(self, sha):
+        self.calls.append('get_commit')
+        return SimpleNamespace(files=[
+            SimpleNamespace(filename=path, sha=_sha_of(path), status='modified')
+            for path in self.files
+        ])
+
+def _sha_of(path):
+    """Returns a fake but consistent blob SHA for the given path."""
+    return f'sha-of-{path}'
@@ -0,0 +1,56 @@
+from syndicate import assets, utils
+import json
+import pytest
+
+@pytest.fixture(autouse=True)
+def github(monkeypatch, tmp_path):
+    monkeypatch.setenv('GITHUB_REPOSITORY', 'herp/derp')
+    monkeypatch.setenv('GITHUB_SHA', 'abc123')
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.delenv('GITHUB_SERVER_URL', raising=False)
+    monkeypatch.delenv('SYNDICATE_REWRITE_ASSETS', raising=False)
+    monkeypatch.setenv('SYNDICATE_ASSET_CACHE', str(tmp_path / 'assets.json'))
+    monkeypatch.setattr(utils, 'content_source', lambda: utils.ContentSource(None, None, None, lambda paths: {
+        path: f'sha-of-{path}' for path in paths if path.startswith('images/') or path.startswith('posts/')
+    }, None))
+    yield
+    assets._cache.cache_clear()
+
+def _post(text, path='posts/a.md'):
+    return utils.Post(path, None, text.encode('utf-8'))
+
+def test_rewrite_links_relative_images_to_raw_github_urls():
+    post = _post('![cat](../images/cat.png "Cat") and <img src="pic.jpg" alt="x"> and ![web](https://example.com/a.png)')
+    assert assets.rewrite(post) == (
+        '![cat](https://raw.githubusercontent.com/herp/derp/abc123/images/cat.png "Cat") and '
+        '<img src="https://raw.githubusercontent.com/herp/derp/abc123/posts/pic.jpg" alt="x"> and '
+        '![web](https://example.com/a.png)'
+    )
+
+def test_rewrite_leaves_images_missing_from_the_repo_alone():
+    post = _post('![elsewhere](/static/missing.png)')
+    assert assets.rewrite(post) == post.text
+
+def test_rewrite_resolves_each_image_once_across_posts_and_runs(monkeypatch, tmp_path):
+    resolved = []
+    monkeypatch.setattr(assets, 'read_posts', lambda paths: [utils.Post(paths[0], None, b'image')])
+    resolve = lambda path, contents: resolved.append(path) or f'https://cdn.example.com/{len(resolved)}'
+    assert assets.rewrite(_post('![a](/images/cat.png)'), namespace='silo', resolve=resolve) == '![a](https://cdn.example.com/1)'
+    assert assets.rewrite(_post('![b](../images/cat.png)', 'posts/b.md'), namespace='silo', resolve=resolve) == '![b](https://cdn.example.com/1)'
+    assets._cache.cache_clear()
+    assert assets.rewrite(_post('![c](/images/cat.png)'), namespace='silo', resolve=resolve) == '![c](https://cdn.example.com/1)'
+    assert resolved == ['images/cat.png']
+    assert json.loads((tmp_path / 'assets.json').read_text()) == {'silo:sha-of-images/cat.png': 'https://cdn.example.com/1'}
+
+def test_rewrite_does_nothing_when_turned_off(monkeypatch):
+    monkeypatch.setenv('SYNDICATE_REWRITE_ASSETS', 'false')
+    post = _post('![cat](../images/cat.png)')
+    assert assets.rewrite(post) == post.text
+
+def test_rewrite_rewrites_each_post_once(monkeypatch):
+    lookups = []
+    shas = utils.content_source().shas
+    monkeypatch.setattr(assets, 'blob_shas', lambda paths: lookups.append(paths) or shas(paths))
+    post = _post('![cat](../images/cat.png)')
+    assert assets.rewrite(post) == assets.rewrite(post)
+    assert len(lookups) == 1
@@ -0,0 +1,27 @@
+from syndicate import checkpoint
+
+def test_load_returns_nothing_when_disabled(monkeypatch):
+    monkeypatch.delenv('SYNDICATE_CHECKPOINT_DIR', raising=False)
+    monkeypatch.delenv('RUNNER_TEMP', raising=False)
+    checkpoint.add(['DEV'], ['posts/a.md'])
+    assert checkpoint.load(['DEV']) == set()
+
+def test_checkpoints_are_kept_per_set_of_silos(monkeypatch, tmp_path):
+    monkeypatch.setenv('SYNDICATE_CHECKPOINT_DIR', str(tmp_path))
+    checkpoint.add(['DEV', 'Medium'], ['posts/a.md'])
+    checkpoint.add(['medium', 'dev'], ['posts/b.md'])
+    assert checkpoint.load(['Medium', 'DEV']) == {'posts/a.md', 'posts/b.md'}
+    assert checkpoint.load(['DEV']) == set()
+
+def test_clear_forgets_progress(monkeypatch, tmp_path):
+    monkeypatch.setenv('SYNDICATE_CHECKPOINT_DIR', str(tmp_path))
+    checkpoint.add(['DEV'], ['posts/a.md'])
+    checkpoint.clear(['DEV'])
+    assert checkpoint.load(['DEV']) == set()
+
+def test_checkpoints_are_kept_per_shard(monkeypatch, tmp_path):
+    monkeypatch.setenv('SYNDICATE_CHECKPOINT_DIR', str(tmp_path))
+    monkeypatch.setenv('SYNDICATE_SHARD', '1/2')
+    checkpoint.add(['DEV'], ['posts/a.md'])
+    monkeypatch.setenv('SYNDICATE_SHARD', '2/2')
+    assert checkpoint.load(['DEV']) == set()
@@ -0,0 +1,160 @@
+from syndicate import coalesce
+from github import GithubException
+from types import SimpleNamespace
+import json
+import pytest
+import threading
+
+class FakeRefs:
+    """Just enough of a Github repo to hold leases on branches, and compare commits."""
+    def __init__(self, commits=(), files_by_sha=None):
+        self.refs = {'refs/heads/main': 'new_head'}
+        self.messages = {}
+        self.commits = list(commits)
+        self.files_by_sha = files_by_sha or {}
+
+    def create_git_tree(self, tree):
+        return SimpleNamespace(sha='empty_tree')
+
+    def create_git_commit(self, message, tree, parents):
+        sha = f'lease{len(self.messages)}'
+        self.messages[sha] = message
+        return SimpleNamespace(sha=sha)
+
+    def get_git_commit(self, sha):
+        return SimpleNamespace(message=self.messages[sha])
+
+    def create_git_ref(self, ref, sha):
+        if ref in self.refs:
+            raise GithubException(422, {'message': 'Reference already exists'}, None)
+        self.refs[ref] = sha
+
+    def get_git_ref(self, ref):
+        name = f'refs/{ref}'
+        def edit(sha, force=False):
+            self.refs[name] = sha
+        def delete():
+            del self.refs[name]
+        return SimpleNamespace(object=SimpleNamespace(sha=self.refs[name]), edit=edit, delete=delete)
+
+    def compare(self, base, head):
+        return SimpleNamespace(commits=self.commits)
+
+    def get_commit(self, sha):
+        return SimpleNamespace(files=[SimpleNamespace(filename=path) for path in self.files_by_sha[sha]])
+
+def _commit(sha, message):
+    return SimpleNamespace(sha=sha, commit=SimpleNamespace(message=message))
+
+@pytest.fixture(autouse=True)
+def github(monkeypatch):
+    monkeypatch.setenv('GITHUB_REF', 'refs/heads/main')
+    monkeypatch.setenv('GITHUB_SHA', 'old_head')
+    monkeypatch.setenv('GITHUB_RUN_ID', '42')
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.delenv('GITHUB_ENV', raising=False)
+    monkeypatch.setattr(coalesce.time, 'sleep', lambda seconds: pytest.fail('should not wait'))
+
+def test_catch_up_skips_own_commits_and_moves_to_the_branch_head(monkeypatch):
+    fake_repo = FakeRefs(
+        commits=[_commit('c1', 'Edit a post'), _commit('c2', '(syndicate): adding IDs for {\'DEV\'}')],
+        files_by_sha={'c1': ['posts/a.md'], 'c2': ['posts/b.md']}
+    )
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    assert coalesce.catch_up(backfill=None) == {'posts/a.md'}
+    assert coalesce.os.environ['SYNDICATE_SHA'] == 'new_head'
+
+def test_catch_up_only_supersedes_what_later_runs_will_syndicate(monkeypatch):
+    fake_repo = FakeRefs(
+        commits=[_commit('c1', 'Edit a post'), _commit('c2', 'Edit another post')],
+        files_by_sha={'c1': ['posts/a.md'], 'c2': ['posts/b.md']}
+    )
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    # Pushed together, only the run for c2 is coming, and it only syndicates c2.
+    assert coalesce.catch_up(backfill=None) == {'posts/b.md'}
+    monkeypatch.delenv('SYNDICATE_SHA')
+    assert coalesce.catch_up(backfill='push') == {'posts/a.md', 'posts/b.md'}
+
+def test_catch_up_does_nothing_when_already_at_the_branch_head(monkeypatch):
+    fake_repo = FakeRefs()
+    fake_repo.refs['refs/heads/main'] = 'old_head'
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    assert coalesce.catch_up(backfill=None) == set()
+    assert 'SYNDICATE_SHA' not in coalesce.os.environ
+
+def test_lease_is_held_for_the_managed_block(monkeypatch):
+    fake_repo = FakeRefs()
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    with coalesce.lease():
+        held = json.loads(fake_repo.messages[fake_repo.refs['refs/syndicate/leases/main']])
+        assert held['holder'].startswith('42-')
+    assert 'refs/syndicate/leases/main' not in fake_repo.refs
+
+def test_lease_takes_over_an_expired_lease(monkeypatch):
+    fake_repo = FakeRefs()
+    fake_repo.messages['stale'] = json.dumps({'holder': 'cancelled', 'expires': 0})
+    fake_repo.refs['refs/syndicate/leases/main'] = 'stale'
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    with coalesce.lease():
+        assert fake_repo.refs['refs/syndicate/leases/main'] != 'stale'
+    assert 'refs/syndicate/leases/main' not in fake_repo.refs
+
+def test_lease_waits_for_a_live_lease(monkeypatch):
+    fake_repo = FakeRefs()
+    fake_repo.messages['live'] = json.dumps({'holder': 'other', 'expires': coalesce.time.time() + 60})
+    fake_repo.refs['refs/syndicate/leases/main'] = 'live'
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    waits = []
+    def let_go(seconds):
+        waits.append(seconds)
+        del fake_repo.refs['refs/syndicate/leases/main']
+    monkeypatch.setattr(coalesce.time, 'sleep', let_go)
+    with coalesce.lease():
+        assert fake_repo.refs['refs/syndicate/leases/main'] != 'live'
+    assert waits == [coalesce.LEASE_POLL_INTERVAL]
+
+def test_lease_taken_after_a_long_wait_is_good_for_most_of_its_ttl(monkeypatch):
+    fake_repo = FakeRefs()
+    clock = [1000.0]
+    monkeypatch.setattr(coalesce.time, 'time', lambda: clock[0])
+    fake_repo.messages['live'] = json.dumps({'holder': 'other', 'expires': clock[0] + 600})
+    fake_repo.refs['refs/syndicate/leases/main'] = 'live'
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    waits = []
+    def wait(seconds):
+        waits.append(seconds)
+        clock[0] += seconds
+        if clock[0] >= 1580:
+            del fake_repo.refs['refs/syndicate/leases/main']
+    monkeypatch.setattr(coalesce.time, 'sleep', wait)
+    monkeypatch.setattr(coalesce, '_keep', lambda holder, ttl, stop: None)
+    with coalesce.lease(ttl=600):
+        held = json.loads(fake_repo.messages[fake_repo.refs['refs/syndicate/leases/main']])
+        assert held['expires'] - clock[0] >= 600 * 2 / 3
+    # The lease commit is only remade once it's as old as the time between renewals.
+    assert len(fake_repo.messages) == 1 + 3
+
+def test_lease_is_renewed_while_held(monkeypatch):
+    fake_repo = FakeRefs()
+    clock = [1000.0]
+    monkeypatch.setattr(coalesce.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    def expires():
+        return json.loads(fake_repo.messages[fake_repo.refs['refs/syndicate/leases/main']])['expires']
+    with coalesce.lease(ttl=0.3):
+        assert expires() == 1000.3
+        clock[0] = 5000.0
+        for _ in range(100):
+            if expires() == 5000.3:
+                break
+            threading.Event().wait(0.05)
+        assert expires() == 5000.3
+    assert 'refs/syndicate/leases/main' not in fake_repo.refs
+
+def test_lease_is_not_renewed_once_taken_over(monkeypatch):
+    fake_repo = FakeRefs()
+    monkeypatch.setattr(coalesce, 'repo', lambda: fake_repo)
+    fake_repo.messages['theirs'] = json.dumps({'holder': 'other', 'expires': 0})
+    fake_repo.refs['refs/syndicate/leases/main'] = 'theirs'
+    coalesce._renew('mine', 600)
+    assert fake_repo.refs['refs/syndicate/leases/main'] == 'theirs'
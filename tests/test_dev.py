@@ -5,6 +5,19 @@ import pytest
 import requests
 import requests_mock
 
+@pytest.fixture(autouse=True)
+def forget_articles():
+    """Needed to ensure articles listed by one test aren't seen by the next."""
+    yield
+    dev._indexes.clear()
+
+@pytest.fixture(autouse=True)
+def claimed(monkeypatch):
+    """The IDs of the articles other posts in the repo are marked with."""
+    claimed = set()
+    monkeypatch.setattr(dev, 'claimed_silo_ids', lambda silo: claimed)
+    return claimed
+
 def test_create_error_when_api_key_missing():
     with pytest.raises(ValueError):
         dev._create(MockPost())
@@ -55,3 +68,115 @@ def test_update_returns_something_on_success(requests_mock, monkeypatch):
         status_code=requests.codes.ok,
         json={'type_of': 'article', 'id': mock_id, 'url': 'https://fake.url/for-this-post'})
     assert dev._update(mock, api_key='fake_api_key')
+
+def test_unpublish_turns_articles_back_into_drafts(requests_mock):
+    post = MockPost()
+    requests_mock.put(
+        "https://dev.to/api/articles/42",
+        status_code=requests.codes.ok,
+        json={'type_of': 'article', 'id': 42, 'url': 'https://fake.url/for-this-post'})
+    assert dev.unpublish([post], api_key='fake_api_key') == {'removed': {post.path: (42, 'https://fake.url/for-this-post')}}
+    assert requests_mock.last_request.json() == {'article': {'published': False}}
+
+def test_syndicate_sorts_results_into_added_and_modified(requests_mock, monkeypatch):
+    new_post = MockPost()
+    new_post.decoded_content = new_post.raw_contents.replace('dev_silo_id: 42\n', '').encode('utf-8')
+    new_post.path = 'posts/a-new-mock.md'
+    old_post = MockPost()
+    requests_mock.get("https://dev.to/api/articles/me/all", json=[])
+    requests_mock.post(
+        "https://dev.to/api/articles",
+        status_code=requests.codes.created,
+        json={'type_of': 'article', 'id': 43, 'url': 'https://fake.url/for-new-post'})
+    requests_mock.put(
+        "https://dev.to/api/articles/42",
+        status_code=requests.codes.ok,
+        json={'type_of': 'article', 'id': 42, 'url': 'https://fake.url/for-old-post'})
+    results = dev.syndicate([new_post, old_post], 'fake_api_key')
+    assert results['added'] == {new_post.path: (43, 'https://fake.url/for-new-post')}
+    assert results['modified'] == {old_post.path: (42, 'https://fake.url/for-old-post')}
+
+def test_syndicate_adopts_existing_articles_instead_of_duplicating_them(requests_mock):
+    post = MockPost()
+    post.decoded_content = post.raw_contents.replace('dev_silo_id: 42\n', '').encode('utf-8')
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        json=[
+            {'id': 7, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-this-post', 'body_markdown': 'old news'},
+            {'id': 8, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-a-duplicate', 'body_markdown': 'old news'},
+        ])
+    requests_mock.put(
+        "https://dev.to/api/articles/7",
+        status_code=requests.codes.ok,
+        json={'type_of': 'article', 'id': 7, 'url': 'https://fake.url/for-this-post'})
+    results = dev.syndicate([post], 'fake_api_key')
+    assert results['added'] == {post.path: (7, 'https://fake.url/for-this-post')}
+    assert not any(request.method == 'POST' for request in requests_mock.request_history)
+
+def test_syndicate_does_not_adopt_articles_belonging_to_other_posts(requests_mock, claimed):
+    post = MockPost()
+    post.decoded_content = post.raw_contents.replace('dev_silo_id: 42\n', '').encode('utf-8')
+    claimed.add(7)
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        json=[{'id': 7, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-another-post', 'body_markdown': 'old news'}])
+    requests_mock.post(
+        "https://dev.to/api/articles",
+        status_code=requests.codes.created,
+        json={'type_of': 'article', 'id': 43, 'url': 'https://fake.url/for-this-post'})
+    results = dev.syndicate([post], 'fake_api_key')
+    assert results['added'] == {post.path: (43, 'https://fake.url/for-this-post')}
+    assert not any(request.method == 'PUT' for request in requests_mock.request_history)
+
+def test_syndicate_adopts_an_article_for_one_post_at_most(requests_mock):
+    posts = [MockPost(), MockPost()]
+    for n, post in enumerate(posts):
+        post.path = f'posts/{n}.md'
+        post.decoded_content = post.raw_contents.replace('dev_silo_id: 42\n', '').encode('utf-8')
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        json=[{'id': 7, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-a-post', 'body_markdown': 'old news'}])
+    requests_mock.put(
+        "https://dev.to/api/articles/7",
+        status_code=requests.codes.ok,
+        json={'type_of': 'article', 'id': 7, 'url': 'https://fake.url/for-a-post'})
+    requests_mock.post(
+        "https://dev.to/api/articles",
+        status_code=requests.codes.created,
+        json={'type_of': 'article', 'id': 43, 'url': 'https://fake.url/for-the-other-post'})
+    results = dev.syndicate(posts, 'fake_api_key')
+    assert sorted(silo_id for silo_id, _ in results['added'].values()) == [7, 43]
+
+def test_syndicate_leaves_identical_articles_alone(requests_mock):
+    post = MockPost()
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        json=[{'id': 42, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-this-post', 'body_markdown': post.raw_contents}])
+    results = dev.syndicate([post], 'fake_api_key')
+    assert results['modified'] == {post.path: (42, 'https://fake.url/for-this-post')}
+    assert requests_mock.call_count == 1
+
+def test_syndicate_pages_through_existing_articles(requests_mock, monkeypatch):
+    post = MockPost()
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        [
+            {'json': [{'id': n, 'title': f'Article {n}', 'url': f'https://fake.url/{n}'} for n in range(1000, 2000)]},
+            {'json': [{'id': 42, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-this-post', 'body_markdown': post.raw_contents}]},
+        ])
+    results = dev.syndicate([post], 'fake_api_key')
+    assert results['modified'] == {post.path: (42, 'https://fake.url/for-this-post')}
+    assert requests_mock.call_count == 2
+
+def test_syndicate_lists_articles_once_per_run(requests_mock, monkeypatch):
+    post = MockPost()
+    monkeypatch.setenv('GITHUB_SHA', 'head')
+    requests_mock.get(
+        "https://dev.to/api/articles/me/all",
+        json=[{'id': 42, 'title': 'A beautiful mock', 'url': 'https://fake.url/for-this-post', 'body_markdown': post.raw_contents}])
+    dev.syndicate([post], 'fake_api_key')
+    dev.syndicate([post], 'fake_api_key')
+    assert requests_mock.call_count == 1
+    monkeypatch.setenv('GITHUB_SHA', 'next_head')
+    dev.syndicate([post], 'fake_api_key')
+    assert requests_mock.call_count == 2
@@ -0,0 +1,33 @@
+from syndicate import graphql
+import pytest
+import requests_mock
+
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+@pytest.fixture(autouse=True)
+def github(monkeypatch):
+    monkeypatch.setenv('GITHUB_TOKEN', 'fake_token')
+    monkeypatch.setenv('GITHUB_REPOSITORY', 'herp/derp')
+    monkeypatch.delenv('GITHUB_GRAPHQL_URL', raising=False)
+
+def _answer(request, context):
+    variables = request.json()['variables']
+    commit = {'oid': 'head_sha'}
+    for name, path in variables.items():
+        if name.startswith('p'):
+            commit[f'f{name[1:]}'] = {'object': {'text': f'text of {path}'}} if path != 'gone.md' else None
+    if 'revision' in variables:
+        return {'data': {'repository': {'object': commit}}}
+    return {'data': {'repository': {'ref': {'target': commit}}}}
+
+def test_read_files_reads_every_chunk_from_the_same_commit(requests_mock, monkeypatch):
+    monkeypatch.setattr(graphql, 'MAX_FILES_PER_QUERY', 2)
+    requests_mock.post(GRAPHQL_URL, json=_answer)
+    oid, texts = graphql.read_files(['a.md', 'gone.md', 'c.md'], ref='refs/heads/main')
+    assert (oid, texts) == ('head_sha', {'a.md': 'text of a.md', 'c.md': 'text of c.md'})
+    assert [request.json()['variables'].get('revision') for request in requests_mock.request_history] == [None, 'head_sha']
+
+def test_read_files_error_when_query_fails(requests_mock):
+    requests_mock.post(GRAPHQL_URL, json={'data': None, 'errors': [{'message': 'nope'}]})
+    with pytest.raises(ValueError):
+        graphql.read_files(['a.md'], revision='abc123^')
@@ -0,0 +1,84 @@
+from syndicate import http
+import pytest
+import requests
+import requests_mock
+import time
+
+@pytest.fixture(autouse=True)
+def no_sleeping(monkeypatch):
+    """Don't actually wait between retries."""
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+def test_request_error_when_silo_missing():
+    with pytest.raises(ValueError):
+        http.request(None, 'GET', 'https://fake.url')
+
+def test_request_returns_response_without_retrying_on_success(requests_mock):
+    requests_mock.get('https://fake.url', status_code=requests.codes.ok)
+    assert http.request('Fake_Silo', 'GET', 'https://fake.url').status_code == requests.codes.ok
+    assert requests_mock.call_count == 1
+
+def test_request_retries_transient_failures(requests_mock):
+    requests_mock.put('https://fake.url', [
+        {'status_code': requests.codes.too_many_requests, 'headers': {'Retry-After': '1'}},
+        {'status_code': requests.codes.bad_gateway},
+        {'status_code': requests.codes.ok},
+    ])
+    assert http.request('Fake_Silo', 'PUT', 'https://fake.url').status_code == requests.codes.ok
+    assert requests_mock.call_count == 3
+
+def test_request_only_retries_non_idempotent_requests_the_silo_did_not_act_on(requests_mock):
+    requests_mock.post('https://fake.url', [
+        {'status_code': requests.codes.too_many_requests},
+        {'exc': requests.ConnectTimeout},
+        {'status_code': requests.codes.bad_gateway},
+        {'status_code': requests.codes.created},
+    ])
+    assert http.request('Fake_Silo', 'POST', 'https://fake.url').status_code == requests.codes.bad_gateway
+    assert requests_mock.call_count == 3
+
+def test_request_does_not_resend_non_idempotent_requests_after_they_were_sent(requests_mock):
+    requests_mock.post('https://fake.url', [
+        {'exc': requests.ReadTimeout},
+        {'status_code': requests.codes.created},
+    ])
+    with pytest.raises(requests.ReadTimeout):
+        http.request('Fake_Silo', 'POST', 'https://fake.url')
+    assert requests_mock.call_count == 1
+
+def test_request_retries_non_idempotent_requests_when_told_they_are(requests_mock):
+    requests_mock.post('https://fake.url', [
+        {'status_code': requests.codes.bad_gateway},
+        {'status_code': requests.codes.ok},
+    ])
+    assert http.request('Fake_Silo', 'POST', 'https://fake.url', idempotent=True).status_code == requests.codes.ok
+
+def test_request_times_out_by_default(requests_mock, monkeypatch):
+    monkeypatch.setenv('FAKE_SILO_TIMEOUT', '5')
+    requests_mock.get('https://fake.url', status_code=requests.codes.ok)
+    http.request('Fake_Silo', 'GET', 'https://fake.url')
+    assert requests_mock.last_request.timeout == (http.CONNECT_TIMEOUT, 5.0)
+
+def test_request_does_not_retry_permanent_failures(requests_mock):
+    requests_mock.put('https://fake.url', status_code=requests.codes.unprocessable_entity)
+    assert http.request('Fake_Silo', 'PUT', 'https://fake.url').status_code == requests.codes.unprocessable_entity
+    assert requests_mock.call_count == 1
+
+def test_request_gives_up_after_configured_retries(requests_mock, monkeypatch):
+    monkeypatch.setenv('FAKE_SILO_RETRIES', '2')
+    requests_mock.get('https://fake.url', status_code=requests.codes.service_unavailable)
+    assert http.request('Fake_Silo', 'GET', 'https://fake.url').status_code == requests.codes.service_unavailable
+    assert requests_mock.call_count == 3
+
+def test_request_honours_retry_after(requests_mock, monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    requests_mock.get('https://fake.url', [
+        {'status_code': requests.codes.too_many_requests, 'headers': {'Retry-After': '7'}},
+        {'status_code': requests.codes.ok},
+    ])
+    http.request('Fake_Silo', 'GET', 'https://fake.url')
+    assert delays == [7.0]
+
+def test_session_for_reuses_sessions():
+    assert http.session_for('Fake_Silo') is http.session_for('Fake_Silo')
@@ -0,0 +1,112 @@
+from syndicate import httpcache
+import http.server
+import hashlib
+import pytest
+import threading
+
+class FakeServer:
+    """Serves a body per path with an ETag, answering conditional requests for an unchanged body with a 304."""
+    def __init__(self):
+        self.bodies = {}
+        self.statuses = []
+        server = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.bodies[self.path].encode('utf-8')
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('X-RateLimit-Remaining', str(len(server.statuses)))
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.httpd.server_port}{path}'
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.delenv('SYNDICATE_HTTP_CACHE', raising=False)
+    monkeypatch.delenv('SYNDICATE_HTTP_CACHE_MB', raising=False)
+    monkeypatch.setenv('RUNNER_TEMP', str(tmp_path))
+    httpcache._sizes.clear()
+    yield tmp_path / 'syndicate' / 'http-cache'
+    httpcache.session_for.cache_clear()
+
+def _get(url, token='token'):
+    session = httpcache.session_for('http', '127.0.0.1', None)
+    return session.get(url, headers={'Authorization': f'token {token}', 'Accept': 'application/json'})
+
+def test_unchanged_responses_are_served_from_the_cache(server):
+    server.bodies['/repos/a/b'] = '{"name": "b"}'
+    assert _get(server.url('/repos/a/b')).json() == {'name': 'b'}
+    response = _get(server.url('/repos/a/b'))
+    assert server.statuses == [200, 304]
+    assert response.status_code == 200
+    assert response.json() == {'name': 'b'}
+    assert response.headers['Content-Type'] == 'application/json'
+    assert response.headers['X-RateLimit-Remaining'] == '2'
+
+def test_changed_responses_replace_the_cached_ones(server):
+    server.bodies['/repos/a/b'] = '{"name": "b"}'
+    _get(server.url('/repos/a/b'))
+    server.bodies['/repos/a/b'] = '{"name": "c"}'
+    assert _get(server.url('/repos/a/b')).json() == {'name': 'c'}
+    assert _get(server.url('/repos/a/b')).json() == {'name': 'c'}
+    assert server.statuses == [200, 200, 304]
+
+def test_responses_are_cached_per_token(server):
+    server.bodies['/repos/a/b'] = '{"name": "b"}'
+    _get(server.url('/repos/a/b'), token='one')
+    _get(server.url('/repos/a/b'), token='other')
+    assert server.statuses == [200, 200]
+
+def test_least_recently_used_responses_are_evicted(server, cache, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_HTTP_CACHE_MB', str(3400 / 1024 / 1024))
+    for n in range(3):
+        server.bodies[f'/{n}'] = 'x' * 1000
+    _get(server.url('/0'))
+    _get(server.url('/1'))
+    _get(server.url('/0'))  # makes /1 the least recently used
+    _get(server.url('/2'))
+    assert sum(path.stat().st_size for path in cache.iterdir()) <= httpcache.max_bytes()
+    server.statuses.clear()
+    _get(server.url('/0'))
+    _get(server.url('/1'))
+    assert server.statuses == [304, 200]
+
+def test_nothing_is_cached_without_a_cache_dir(server, cache, monkeypatch):
+    monkeypatch.delenv('RUNNER_TEMP')
+    server.bodies['/repos/a/b'] = '{"name": "b"}'
+    _get(server.url('/repos/a/b'))
+    _get(server.url('/repos/a/b'))
+    assert server.statuses == [200, 200]
+    assert not cache.exists()
+
+def test_the_cache_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv('SYNDICATE_HTTP_CACHE', 'false')
+    assert httpcache.cache_dir() is None
+    monkeypatch.setenv('SYNDICATE_HTTP_CACHE', '/some/where')
+    assert httpcache.cache_dir() == '/some/where'
@@ -0,0 +1,43 @@
+from syndicate import journal
+from .mocks import MockPost
+import pytest
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_JOURNAL', str(tmp_path / 'journal.jsonl'))
+    return tmp_path / 'journal.jsonl'
+
+def test_load_returns_none_when_disabled(monkeypatch):
+    monkeypatch.delenv('SYNDICATE_JOURNAL', raising=False)
+    monkeypatch.delenv('RUNNER_TEMP', raising=False)
+    assert journal.load() is None
+
+def test_successes_are_remembered(enabled):
+    post = MockPost()
+    journal.record('DEV', {'added': {post.path: (42, 'https://fake.url')}, 'modified': {}}, [post])
+    assert journal.successes(journal.load(), 'DEV', [post]) == {'added': {post.path: [42, 'https://fake.url']}}
+
+def test_later_outcomes_win(enabled):
+    post = MockPost()
+    journal.record('DEV', {'added': {post.path: None}}, [post])
+    journal.record('DEV', {'added': {post.path: (42, 'https://fake.url')}}, [post])
+    assert journal.successes(journal.load(), 'DEV', [post])
+
+def test_failures_are_not_successes(enabled):
+    post = MockPost()
+    journal.record('DEV', {'added': {post.path: (42, 'https://fake.url')}}, [post])
+    journal.record('DEV', {'added': {post.path: None}}, [post])
+    assert not journal.successes(journal.load(), 'DEV', [post])
+
+def test_changed_posts_are_not_successes(enabled):
+    post = MockPost()
+    journal.record('DEV', {'added': {post.path: (42, 'https://fake.url')}}, [post])
+    post.decoded_content += b' Now with more body.'
+    assert not journal.successes(journal.load(), 'DEV', [post])
+
+def test_partially_written_entries_are_ignored(enabled):
+    post = MockPost()
+    journal.record('DEV', {'added': {post.path: (42, 'https://fake.url')}}, [post])
+    with open(enabled, 'a') as f:
+        f.write('{"silo": "DEV", "pa')
+    assert journal.successes(journal.load(), 'DEV', [post])
@@ -0,0 +1,56 @@
+from syndicate import assets, ledger, utils
+from .mocks import MockPost
+import pytest
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    monkeypatch.delenv('SYNDICATE_LEDGER', raising=False)
+    monkeypatch.setenv('RUNNER_TEMP', str(tmp_path))
+
+def test_load_returns_none_when_disabled(monkeypatch):
+    monkeypatch.delenv('SYNDICATE_LEDGER', raising=False)
+    monkeypatch.delenv('RUNNER_TEMP', raising=False)
+    assert ledger.load() is None
+
+def test_load_returns_empty_ledger_when_none_saved(enabled):
+    assert ledger.load() == {}
+
+def test_recorded_posts_are_unchanged_after_saving(enabled):
+    post = MockPost()
+    known = ledger.load()
+    ledger.record(known, 'DEV', {'added': {}, 'modified': {post.path: (42, 'https://fake.url')}}, [post])
+    ledger.save(known)
+    assert ledger.is_unchanged(ledger.load(), 'DEV', post)
+
+def test_failed_posts_are_not_recorded(enabled):
+    post = MockPost()
+    known = ledger.load()
+    ledger.record(known, 'DEV', {'added': {}, 'modified': {post.path: None}}, [post])
+    assert not ledger.is_unchanged(known, 'DEV', post)
+
+def test_changed_posts_are_not_unchanged(enabled):
+    post = MockPost()
+    known = {'DEV': {post.path: ledger.fingerprint(post)}}
+    post.decoded_content += b' Now with more body.'
+    assert not ledger.is_unchanged(known, 'DEV', post)
+
+def test_posts_unknown_to_the_silo_are_never_unchanged(enabled):
+    post = MockPost()
+    known = {'Medium': {post.path: ledger.fingerprint(post)}}
+    assert not ledger.is_unchanged(known, 'Medium', post)
+
+def test_posts_whose_images_changed_are_not_unchanged(enabled, tmp_path, monkeypatch):
+    monkeypatch.setenv('GITHUB_REPOSITORY', 'herp/derp')
+    monkeypatch.setenv('GITHUB_SHA', 'abc123')
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.setenv('SYNDICATE_ASSET_CACHE', str(tmp_path / 'assets.json'))
+    shas = {'images/cat.png': 'old-cat'}
+    monkeypatch.setattr(utils, 'content_source', lambda: utils.ContentSource(None, None, None, lambda paths: shas, None))
+    post = MockPost()
+    post.decoded_content += b'\n![cat](/images/cat.png)'
+    known = {'DEV': {post.path: ledger.fingerprint(post)}}
+    assert ledger.is_unchanged(known, 'DEV', post)
+    monkeypatch.setenv('GITHUB_SHA', 'def456')
+    shas['images/cat.png'] = 'new-cat'
+    assert not ledger.is_unchanged(known, 'DEV', post)
+    assets._cache.cache_clear()
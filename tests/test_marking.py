@@ -0,0 +1,64 @@
+from syndicate import marking
+import base64
+import frontmatter
+import pytest
+import requests_mock
+
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+@pytest.fixture(autouse=True)
+def github(monkeypatch):
+    monkeypatch.setenv('GITHUB_TOKEN', 'fake_token')
+    monkeypatch.setenv('GITHUB_REPOSITORY', 'herp/derp')
+    monkeypatch.setenv('GITHUB_REF', 'refs/heads/main')
+    monkeypatch.setenv('GITHUB_SHA', 'old_head')
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.delenv('GITHUB_GRAPHQL_URL', raising=False)
+    monkeypatch.setattr(marking.time, 'sleep', lambda seconds: None)
+
+def _committed(request):
+    additions = request.json()['variables']['input']['fileChanges']['additions']
+    return {
+        addition['path']: frontmatter.loads(base64.b64decode(addition['contents']).decode('utf-8')).metadata
+        for addition in additions
+    }
+
+def test_mark_syndicated_posts_commits_in_one_request(requests_mock):
+    requests_mock.post(GRAPHQL_URL, json={'data': {'createCommitOnBranch': {'commit': {'oid': 'new_head'}}}})
+    posts = {'a.md': frontmatter.loads('---\ntitle: A\n---\nBody'), 'b.md': frontmatter.loads('---\ndev_silo_id: 2\n---\nBody')}
+    assert marking.mark_syndicated_posts({'a.md': {'DEV': 1}, 'b.md': {'DEV': 2}}, posts) == 'new_head'
+    assert requests_mock.call_count == 1
+    branch = requests_mock.last_request.json()['variables']['input']['branch']
+    assert branch == {'repositoryNameWithOwner': 'herp/derp', 'branchName': 'main'}
+    assert requests_mock.last_request.json()['variables']['input']['expectedHeadOid'] == 'old_head'
+    assert _committed(requests_mock.last_request) == {'a.md': {'title': 'A', 'dev_silo_id': 1}}
+
+def test_mark_syndicated_posts_reapplies_ids_on_the_new_head(requests_mock):
+    stale = {'data': {'createCommitOnBranch': None}, 'errors': [{'type': 'STALE_DATA', 'message': 'Expected branch to point to "old_head" but it did not.'}]}
+    head = {'data': {'repository': {'ref': {'target': {'oid': 'moved_head', 'f0': {'object': {'text': '---\ntitle: A, edited\n---\nBody'}}}}}}}
+    done = {'data': {'createCommitOnBranch': {'commit': {'oid': 'new_head'}}}}
+    requests_mock.post(GRAPHQL_URL, [{'json': stale}, {'json': head}, {'json': done}])
+    posts = {'a.md': frontmatter.loads('---\ntitle: A\n---\nBody')}
+    assert marking.mark_syndicated_posts({'a.md': {'DEV': 1}}, posts) == 'new_head'
+    assert requests_mock.last_request.json()['variables']['input']['expectedHeadOid'] == 'moved_head'
+    assert _committed(requests_mock.last_request) == {'a.md': {'title': 'A, edited', 'dev_silo_id': 1}}
+
+def test_mark_syndicated_posts_gives_up_when_branch_keeps_moving(requests_mock, monkeypatch):
+    monkeypatch.setenv('GITHUB_RETRIES', '1')
+    stale = {'data': {'createCommitOnBranch': None}, 'errors': [{'type': 'STALE_DATA', 'message': 'Expected branch to point to "old_head" but it did not.'}]}
+    head = {'data': {'repository': {'ref': {'target': {'oid': 'moved_head', 'f0': {'object': {'text': '---\ntitle: A\n---\nBody'}}}}}}}
+    requests_mock.post(GRAPHQL_URL, [{'json': stale}, {'json': head}, {'json': stale}])
+    posts = {'a.md': frontmatter.loads('---\ntitle: A\n---\nBody')}
+    assert marking.mark_syndicated_posts({'a.md': {'DEV': 1}}, posts) is None
+    assert requests_mock.call_count == 3
+
+def test_mark_syndicated_posts_gives_up_when_the_new_head_cannot_be_read(requests_mock):
+    stale = {'data': {'createCommitOnBranch': None}, 'errors': [{'type': 'STALE_DATA', 'message': 'Expected branch to point to "old_head" but it did not.'}]}
+    requests_mock.post(GRAPHQL_URL, [{'json': stale}, {'json': {'errors': [{'message': 'Something went wrong'}]}}])
+    posts = {'a.md': frontmatter.loads('---\ntitle: A\n---\nBody')}
+    assert marking.mark_syndicated_posts({'a.md': {'DEV': 1}}, posts) is None
+    assert requests_mock.call_count == 2
+
+def test_commit_updated_posts_does_nothing_when_already_marked(requests_mock):
+    assert marking.commit_updated_posts({}, set()) is None
+    assert not requests_mock.called
@@ -0,0 +1,24 @@
+from syndicate import profiling
+import pstats
+import pytest
+
+def test_profiled_does_nothing_by_default(tmp_path, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_PROFILE_DIR', str(tmp_path))
+    with profiling.profiled(None):
+        pass
+    assert not list(tmp_path.iterdir())
+
+def test_profiled_error_when_mode_unknown():
+    with pytest.raises(ValueError):
+        with profiling.profiled('gpu'):
+            pass
+
+def test_profiled_writes_reports_and_logs_summaries(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('SYNDICATE_PROFILE_DIR', str(tmp_path))
+    with profiling.profiled('cpu, mem'):
+        sorted(str(n) for n in range(10000))
+    assert pstats.Stats(str(tmp_path / 'profile-cpu.pstats')).total_calls > 0
+    assert (tmp_path / 'profile-mem.txt').read_text().startswith('Peak traced memory')
+    out = capsys.readouterr().out
+    assert '::group::Profile: CPU' in out
+    assert '::group::Profile: memory' in out
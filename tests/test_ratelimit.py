@@ -0,0 +1,68 @@
+from syndicate.ratelimit import TokenBucket, budget_for
+import pytest
+
+class FakeClock:
+    """A clock that only moves when something sleeps."""
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+def test_bucket_error_when_budget_invalid():
+    with pytest.raises(ValueError):
+        TokenBucket(0, 30)
+    with pytest.raises(ValueError):
+        TokenBucket(10, 0)
+
+def test_bucket_allows_bursts_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(3, 30, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    assert not clock.slept
+
+def test_bucket_waits_for_tokens_once_exhausted():
+    clock = FakeClock()
+    bucket = TokenBucket(3, 30, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(10)
+
+def test_bucket_waits_out_pauses():
+    clock = FakeClock()
+    bucket = TokenBucket(3, 30, clock=clock, sleep=clock.sleep)
+    bucket.pause(20)
+    bucket.acquire()
+    assert clock.now >= 20
+
+def test_bucket_adapts_to_remaining_quota():
+    clock = FakeClock()
+    bucket = TokenBucket(10, 10, clock=clock, sleep=clock.sleep)
+    bucket.observe({'X-RateLimit-Remaining': '1'})
+    bucket.acquire()
+    assert not clock.slept
+    bucket.acquire()
+    assert clock.slept
+
+def test_bucket_pauses_until_reset_when_quota_spent():
+    clock = FakeClock()
+    bucket = TokenBucket(10, 10, clock=clock, sleep=clock.sleep)
+    bucket.observe({'RateLimit-Remaining': '0', 'RateLimit-Reset': '42'})
+    bucket.acquire()
+    assert clock.now >= 42
+
+def test_budget_for_supports_budgets_per_method():
+    assert budget_for((10, 30), 'post') == (10, 30)
+    assert budget_for({'POST': (10, 30)}, 'post') == (10, 30)
+    assert budget_for({'POST': (10, 30)}, 'get') is None
+    assert budget_for(None, 'get') is None
+
+def test_budget_for_can_be_overridden_per_silo(monkeypatch):
+    monkeypatch.setenv('FAKE_SILO_RATE_LIMIT', '100/60')
+    assert budget_for({'POST': (10, 30)}, 'get', 'Fake_Silo') == (100, 60)
+    monkeypatch.setenv('FAKE_SILO_RATE_LIMIT', 'none')
+    assert budget_for({'POST': (10, 30)}, 'post', 'Fake_Silo') is None
@@ -0,0 +1,38 @@
+from syndicate import registry
+from syndicate.silos import dev
+from types import SimpleNamespace
+import pytest
+
+@pytest.fixture(autouse=True)
+def clear_registry_cache():
+    """Needed to ensure our monkeypatching doesn't get cached between tests."""
+    yield
+    registry.locate.cache_clear()
+    registry.load.cache_clear()
+    registry.capabilities.cache_clear()
+
+def test_locate_finds_built_in_silos():
+    assert registry.locate('DEV') == 'syndicate.silos.dev'
+
+def test_locate_finds_silos_registered_as_entry_points(monkeypatch):
+    monkeypatch.setattr(registry, '_entry_points', lambda: [SimpleNamespace(name='medium', value='syndicate_medium')])
+    assert registry.locate('Medium') == 'syndicate_medium'
+    assert registry.locate('Fake_Silo') is None
+
+def test_load_error_when_silo_unknown(monkeypatch):
+    monkeypatch.setattr(registry, '_entry_points', lambda: [])
+    with pytest.raises(ValueError):
+        registry.load('Fake_Silo')
+
+def test_capabilities_fill_in_what_adapters_leave_out():
+    capabilities = registry.capabilities('DEV')
+    assert capabilities.rate_limit == dev.RATE_LIMIT
+    assert capabilities.batch_size is None
+
+def test_workers_for_prefers_the_environment_to_the_adapter(monkeypatch):
+    monkeypatch.setattr(dev, 'CAPABILITIES', {'max_workers': 8})
+    monkeypatch.delenv('DEV_MAX_WORKERS', raising=False)
+    monkeypatch.delenv('SYNDICATE_MAX_WORKERS', raising=False)
+    assert registry.workers_for('DEV') == 8
+    monkeypatch.setenv('DEV_MAX_WORKERS', '2')
+    assert registry.workers_for('DEV') == 2
@@ -1,12 +1,28 @@
 import importlib.util
 import pytest
 import syndicate
+from syndicate import assets, ledger, registry
+from .mocks import MockPost
+from types import SimpleNamespace
 
 @pytest.fixture(autouse=True)
 def clear_silo_cache():
     """Needed to ensure our monkeypatching doesn't get cached between tests."""
     yield
-    syndicate._locate.cache_clear()
+    registry.locate.cache_clear()
+    registry.load.cache_clear()
+    registry.capabilities.cache_clear()
+
+@pytest.fixture
+def install_silo(monkeypatch):
+    """Returns a function which makes the given object the adapter of the given silo, and gives it an API key."""
+    def _install(adapter, silo='DEV'):
+        # Ensure we can find and load the fake silo adapter.
+        monkeypatch.setattr(importlib.util, 'find_spec', lambda s: SimpleNamespace(name='mock_spec'))
+        monkeypatch.setattr(importlib, 'import_module', lambda s: adapter)
+        # Ensure we can use the fake silo adapter.
+        monkeypatch.setenv(syndicate._api_key_for(silo), 'fake API key')
+    return _install
 
 def test_elsewhere_returns_none_when_given_no_posts():
     assert not syndicate.elsewhere([], ['Fake_Silo'])
@@ -18,7 +34,7 @@ def test_elsewhere_returns_none_when_no_api_keys_exist_for_given_silos(monkeypat
     fake_silo = 'Fake_Silo'
     # Ensure we cannot use the fake silo adapter.
     monkeypatch.delenv(syndicate._api_key_for(fake_silo), raising=False)
-    assert not syndicate.elsewhere(['a post'], [fake_silo])
+    assert not syndicate.elsewhere([MockPost()], [fake_silo])
 
 def test_elsewhere_returns_none_when_no_adapter_exists_for_given_silos(monkeypatch):
     fake_silo = 'Fake_Silo'
@@ -26,7 +42,7 @@ def test_elsewhere_returns_none_when_no_adapter_exists_for_given_silos(monkeypat
     monkeypatch.setattr(importlib.util, 'find_spec', lambda s: None)
     # Ensure we can use the fake silo adapter.
     monkeypatch.setenv(syndicate._api_key_for(fake_silo), 'fake API key')
-    assert not syndicate.elsewhere(['a post'], [fake_silo])
+    assert not syndicate.elsewhere([MockPost()], [fake_silo])
 
 def test_elsewhere_returns_syndication_results_for_recognized_silos_when_given_api_keys(monkeypatch):
     class MockSpec:
@@ -42,4 +58,96 @@ def test_elsewhere_returns_syndication_results_for_recognized_silos_when_given_a
     monkeypatch.setattr(importlib, 'import_module', lambda s: MockSilo)
     # Ensure we can use the fake silo adapter.
     monkeypatch.setenv(syndicate._api_key_for(fake_silo), 'fake API key')
-    assert syndicate.elsewhere(['a post'], [fake_silo])
+    assert syndicate.elsewhere([MockPost()], [fake_silo])
+
+def test_elsewhere_skips_posts_unchanged_since_last_syndicated(install_silo, monkeypatch, tmp_path):
+    class MockSilo:
+        calls = []
+        def syndicate(posts, api_key):
+            MockSilo.calls.append(posts)
+            return {'added': {}, 'modified': {post.path: (42, 'https://fake.url') for post in posts}}
+    fake_silo = 'DEV'
+    install_silo(MockSilo)
+    monkeypatch.setenv('SYNDICATE_LEDGER', str(tmp_path / 'ledger.json'))
+    assert syndicate.elsewhere([MockPost()], [fake_silo])['DEV']['modified']
+    assert not syndicate.elsewhere([MockPost()], [fake_silo])['DEV']['modified']
+    assert len(MockSilo.calls) == 1
+
+def test_elsewhere_only_retries_what_failed_when_resuming(install_silo, monkeypatch, tmp_path):
+    class MockSilo:
+        calls = []
+        def syndicate(posts, api_key):
+            MockSilo.calls.append([post.path for post in posts])
+            # Fail the first time around.
+            result = (42, 'https://fake.url') if len(MockSilo.calls) > 1 else None
+            return {'added': {post.path: result for post in posts if post.path.endswith('a.md')}, 'modified': {}}
+    fake_silo = 'DEV'
+    install_silo(MockSilo)
+    monkeypatch.setenv('SYNDICATE_JOURNAL', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setenv('SYNDICATE_RESUME', 'true')
+    first, second = MockPost(), MockPost()
+    first.path, second.path = 'posts/a.md', 'posts/b.md'
+    syndicate.elsewhere([first, second], [fake_silo])
+    assert syndicate.elsewhere([first, second], [fake_silo])['DEV']['added'] == {'posts/a.md': (42, 'https://fake.url')}
+    results = syndicate.elsewhere([first, second], [fake_silo])
+    assert results['DEV']['added'] == {'posts/a.md': [42, 'https://fake.url']}
+    assert MockSilo.calls == [['posts/a.md', 'posts/b.md'], ['posts/a.md', 'posts/b.md'], ['posts/b.md']]
+
+def test_elsewhere_hands_posts_over_within_the_capabilities_of_the_silo(install_silo, monkeypatch):
+    class MockSilo:
+        CAPABILITIES = {'batch_size': 2, 'max_payload_bytes': 100}
+        calls = []
+        def syndicate(posts, api_key):
+            MockSilo.calls.append([post.path for post in posts])
+            return {'added': {post.path: (42, 'https://fake.url') for post in posts}, 'modified': {}}
+    api_key_lookups = []
+    get_api_key = syndicate._get_api_key
+    monkeypatch.setattr(syndicate, '_get_api_key', lambda silo: api_key_lookups.append(silo) or get_api_key(silo))
+    install_silo(MockSilo, 'Fake_Silo')
+    posts = [MockPost() for _ in range(4)]
+    for n, post in enumerate(posts):
+        post.path = f'posts/{n}.md'
+    posts[3].decoded_content = b'x' * 101
+    results = syndicate.elsewhere(posts, ['Fake_Silo'])
+    assert sorted(results['Fake_Silo']['added']) == ['posts/0.md', 'posts/1.md', 'posts/2.md']
+    assert MockSilo.calls == [['posts/0.md', 'posts/1.md'], ['posts/2.md']]
+    assert api_key_lookups == ['Fake_Silo']
+
+def test_unpublish_only_unpublishes_posts_known_to_the_silo(install_silo, monkeypatch, tmp_path):
+    class MockSilo:
+        calls = []
+        def unpublish(posts, api_key):
+            MockSilo.calls.append([post.path for post in posts])
+            return {'removed': {post.path: (42, 'https://fake.url') for post in posts}}
+    install_silo(MockSilo)
+    monkeypatch.setenv('SYNDICATE_LEDGER', str(tmp_path / 'ledger.json'))
+    known, unknown = MockPost(), MockPost()
+    unknown.path = 'posts/never-syndicated.md'
+    unknown.decoded_content = unknown.raw_contents.replace('dev_silo_id: 42\n', '').encode('utf-8')
+    ledger.save({'DEV': {known.path: 'fingerprint'}})
+    assert syndicate.unpublish([known, unknown], ['DEV']) == {'DEV': {'removed': {known.path: (42, 'https://fake.url')}}}
+    assert MockSilo.calls == [[known.path]]
+    assert ledger.load() == {'DEV': {}}
+
+def test_unpublish_ignores_silos_that_cannot_unpublish(install_silo):
+    class MockSilo:
+        def syndicate(posts, api_key):
+            return {'added': {}, 'modified': {}}
+    install_silo(MockSilo, 'Fake_Silo')
+    assert syndicate.unpublish([MockPost()], ['Fake_Silo']) == {'Fake_Silo': {'removed': {}}}
+
+def test_elsewhere_rewrites_each_post_once(install_silo, monkeypatch, tmp_path):
+    class MockSilo:
+        def syndicate(posts, api_key):
+            for post in posts:
+                assets.rewrite(post)
+            return {'added': {}, 'modified': {post.path: (42, 'https://fake.url') for post in posts}}
+    install_silo(MockSilo)
+    monkeypatch.setenv('SYNDICATE_LEDGER', str(tmp_path / 'ledger.json'))
+    monkeypatch.setenv('SYNDICATE_JOURNAL', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setenv('SYNDICATE_RESUME', 'true')
+    rewrites = []
+    rewrite = assets._rewrite
+    monkeypatch.setattr(assets, '_rewrite', lambda post, *args: rewrites.append(post.path) or rewrite(post, *args))
+    syndicate.elsewhere([MockPost()], ['DEV'])
+    assert rewrites == [MockPost().path]
@@ -0,0 +1,402 @@
+from syndicate import utils
+from syndicate.utils import concurrently, max_workers_for, DEFAULT_MAX_WORKERS
+from .mocks import MockPost, MockRepo
+from types import SimpleNamespace
+import collections
+import frontmatter
+import json
+import pytest
+import subprocess
+import sys
+import time
+
+@pytest.fixture(autouse=True)
+def clear_checkout_cache():
+    """Needed to ensure our monkeypatching doesn't get cached between tests."""
+    yield
+    utils._local_checkout.cache_clear()
+    utils._claimed_silo_ids.cache_clear()
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """A local checkout of a repo whose latest commit changed some posts."""
+    def _git(*args):
+        return subprocess.run(['git', *args], cwd=tmp_path, check=True, capture_output=True, text=True).stdout.strip()
+    _git('init', '-q')
+    _git('config', 'user.email', 'fake@fake.email')
+    _git('config', 'user.name', 'Fake')
+    (tmp_path / 'posts').mkdir()
+    (tmp_path / 'posts' / 'old.md').write_text('old')
+    (tmp_path / 'posts' / 'doomed.md').write_text('doomed')
+    _git('add', '.')
+    _git('commit', '-qm', 'first')
+    (tmp_path / 'posts' / 'old.md').write_text('older')
+    (tmp_path / 'posts' / 'new.md').write_text('new')
+    (tmp_path / 'README.md').write_text('readme')
+    (tmp_path / 'posts' / 'doomed.md').unlink()
+    _git('add', '-A')
+    _git('commit', '-qm', 'second')
+    monkeypatch.setenv('GITHUB_WORKSPACE', str(tmp_path))
+    monkeypatch.setenv('GITHUB_SHA', _git('rev-parse', 'HEAD'))
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.delenv('SYNDICATE_CONTENT_SOURCE', raising=False)
+    return tmp_path
+
+def test_concurrently_returns_nothing_when_given_nothing():
+    assert concurrently(lambda x: x, []) == []
+
+def test_concurrently_preserves_order_of_results():
+    assert concurrently(lambda x: x * 2, range(20), max_workers=5) == [x * 2 for x in range(20)]
+
+def test_concurrently_reraises_errors():
+    def _explode(x):
+        raise RuntimeError('boom')
+    with pytest.raises(RuntimeError):
+        concurrently(_explode, [1, 2, 3], max_workers=3)
+
+def test_prefetch_yields_items_in_order():
+    assert list(utils.prefetch(iter(range(10)))) == list(range(10))
+
+def test_prefetch_stays_at_most_size_items_ahead():
+    produced = []
+    def _produce():
+        for n in range(10):
+            produced.append(n)
+            yield n
+    items = utils.prefetch(_produce(), size=2)
+    assert next(items) == 0
+    time.sleep(0.2)
+    # One consumed, two buffered, and one waiting for room in the buffer.
+    assert len(produced) <= 4
+    items.close()
+
+def test_prefetch_reraises_errors_after_the_items_before_them():
+    def _produce():
+        yield 1
+        raise ValueError('oops')
+    items = utils.prefetch(_produce())
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+def test_max_workers_for_defaults_when_not_configured(monkeypatch):
+    monkeypatch.delenv('FAKE_SILO_MAX_WORKERS', raising=False)
+    monkeypatch.delenv('SYNDICATE_MAX_WORKERS', raising=False)
+    assert max_workers_for('Fake_Silo') == DEFAULT_MAX_WORKERS
+
+def test_max_workers_for_prefers_silo_specific_limit(monkeypatch):
+    monkeypatch.setenv('SYNDICATE_MAX_WORKERS', '8')
+    monkeypatch.setenv('FAKE_SILO_MAX_WORKERS', '2')
+    assert max_workers_for('Fake_Silo') == 2
+
+def test_bulk_file_contents_reads_tree_once_when_shas_unknown(monkeypatch):
+    mock_repo = MockRepo({'posts/a.md': 'A', 'posts/b.md': 'B', 'README.md': 'R'})
+    monkeypatch.setattr(utils, 'repo', lambda: mock_repo)
+    monkeypatch.setenv('GITHUB_SHA', 'fake_sha')
+    blobs = utils.bulk_file_contents(['posts/b.md', 'posts/a.md'])
+    assert [(blob.path, blob.decoded_content) for blob in blobs] == [('posts/b.md', b'B'), ('posts/a.md', b'A')]
+    assert mock_repo.calls.count('get_git_tree') == 1
+    assert mock_repo.calls.count('get_git_blob') == 2
+
+def test_get_posts_skips_tree_when_trigger_commit_is_latest(monkeypatch):
+    mock_repo = MockRepo({'posts/a.md': 'A', 'posts/b.md': 'B', 'README.md': 'R'})
+    monkeypatch.setattr(utils, 'repo', lambda: mock_repo)
+    monkeypatch.setenv('GITHUB_SHA', 'fake_sha')
+    monkeypatch.delenv('SYNDICATE_SHA', raising=False)
+    monkeypatch.setenv('SYNDICATE_CONTENT_SOURCE', 'github')
+    posts = utils.get_posts(post_dir='posts')
+    assert sorted(post.name for post in posts) == ['a.md', 'b.md']
+    assert 'get_git_tree' not in mock_repo.calls
+
+def test_get_posts_reads_local_checkout_without_the_api(checkout, monkeypatch):
+    monkeypatch.setattr(utils, 'repo', lambda: pytest.fail('should not use the API'))
+    posts = utils.get_posts(post_dir='posts')
+    assert sorted((post.path, post.decoded_content) for post in posts) == [('posts/new.md', b'new'), ('posts/old.md', b'older')]
+    assert all(post.sha == utils._git('hash-object', post.path).strip() for post in posts)
+
+def test_get_posts_uses_the_api_when_local_checkout_is_stale(checkout, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_SHA', 'a_newer_sha')
+    mock_repo = MockRepo({'posts/a.md': 'A'})
+    monkeypatch.setattr(utils, 'repo', lambda: mock_repo)
+    assert [post.path for post in utils.get_posts(post_dir='posts')] == ['posts/a.md']
+
+def test_get_posts_error_when_content_source_unknown(monkeypatch):
+    monkeypatch.setenv('SYNDICATE_CONTENT_SOURCE', 'carrier_pigeon')
+    with pytest.raises(ValueError):
+        utils.get_posts(post_dir='posts')
+
+def test_post_parses_its_contents_once(monkeypatch):
+    parses = []
+    loads = frontmatter.loads
+    monkeypatch.setattr(frontmatter, 'loads', lambda text: parses.append(text) or loads(text))
+    post = utils.Post.of(MockPost())
+    assert utils.silo_id_for(post, 'DEV') == 42
+    assert utils.silo_id_for(post, 'Medium') is None
+    assert utils.fronted(post).get('title') == 'A beautiful mock'
+    assert post.body == 'What is a body?'
+    assert len(parses) == 1
+
+def test_post_get_looks_up_simple_keys_without_parsing(monkeypatch):
+    monkeypatch.setattr(frontmatter, 'loads', lambda text: pytest.fail('parsed the post'))
+    post = utils.Post('a.md', None, b'---\ntitle: Hello, world\ndev_silo_id: 42\npublished: true\ntags:\n  - a\n---\nBody')
+    assert post.get('title') == 'Hello, world'
+    assert utils.silo_id_for(post, 'DEV') == 42
+    assert post.get('published') is True
+    assert post.get('missing', 'default') == 'default'
+
+@pytest.mark.parametrize('header', [
+    'title: A plain title\ndev_silo_id: 42',
+    "title: 'It''s quoted'\npublished: no",
+    'title: "Double: quoted"\npublished: ~',
+    'title: 2020 in review\ndate: 2020-01-01',
+    'title: Folded\n  over two lines',
+    'title: >\n  A folded title',
+    'tags: [a, b]\ntitle: Tagged # with a comment',
+    'title: Off\npublished: On',
+    'title: &anchor Anchored\nother: *anchor',
+    '? complex key\n: value',
+    '',
+])
+def test_post_get_agrees_with_the_full_parser(header):
+    contents = f'---\n{header}\n---\nBody'
+    expected = frontmatter.loads(contents)
+    post = utils.Post('a.md', None, contents.encode('utf-8'))
+    for key in ('title', 'dev_silo_id', 'published', 'date', 'tags', 'other'):
+        assert post.get(key) == expected.get(key)
+
+@pytest.mark.parametrize('contents', [
+    '{\n  "title": "Hi",\n  "dev_silo_id": 5\n}\nBody',
+    '+++\ntitle = "Hi"\ndev_silo_id = 5\n+++\nBody',
+    'Just a body',
+    '---\ntitle: Never closed',
+])
+def test_post_get_falls_back_to_the_full_parser_for_other_headers(contents):
+    expected = frontmatter.loads(contents)
+    post = utils.Post('a.md', None, contents.encode('utf-8'))
+    assert post.get('title') == expected.get('title')
+    assert utils.silo_id_for(post, 'DEV') == expected.get('dev_silo_id')
+
+def test_post_of_a_post_is_the_same_post():
+    post = utils.Post.of(MockPost())
+    assert utils.Post.of(post) is post
+
+def test_iter_post_batches_backfills_every_post_in_batches(checkout):
+    batches = list(utils.iter_post_batches(post_dir='posts', batch_size=1, backfill='all'))
+    assert [[post.path for post in batch] for batch in batches] == [['posts/new.md'], ['posts/old.md']]
+
+def test_iter_post_batches_skips_excluded_posts(checkout):
+    batches = list(utils.iter_post_batches(post_dir='posts', batch_size=10, backfill='all', exclude=['posts/new.md']))
+    assert [[post.path for post in batch] for batch in batches] == [['posts/old.md']]
+
+def test_iter_post_batches_backfills_every_commit_in_push(checkout, tmp_path_factory, monkeypatch):
+    first = utils._git('rev-list', '--max-parents=0', 'HEAD').strip()
+    event = tmp_path_factory.mktemp('event') / 'event.json'
+    event.write_text(json.dumps({'before': first, 'after': utils._git('rev-parse', 'HEAD').strip()}))
+    monkeypatch.setenv('GITHUB_EVENT_PATH', str(event))
+    batches = list(utils.iter_post_batches(post_dir='posts', batch_size=10, backfill='push'))
+    assert sorted(post.path for post in batches[0]) == ['posts/new.md', 'posts/old.md']
+
+def test_iter_post_batches_error_when_backfill_mode_unknown(checkout):
+    with pytest.raises(ValueError):
+        list(utils.iter_post_batches(post_dir='posts', backfill='some'))
+
+def test_iter_post_batches_yields_only_posts_in_shard(checkout):
+    shards = [
+        [post.path for batch in utils.iter_post_batches(post_dir='posts', batch_size=10, backfill='all', shard=f'{n}/3') for post in batch]
+        for n in (1, 2, 3)
+    ]
+    assert sorted(path for shard in shards for path in shard) == ['posts/new.md', 'posts/old.md']
+
+def test_removed_posts_reads_removed_posts_as_they_were(checkout):
+    assert [(post.path, post.decoded_content) for post in utils.removed_posts(post_dir='posts', backfill=None)] == [('posts/doomed.md', b'doomed')]
+    assert utils.removed_posts(post_dir='posts', backfill=None, exclude=['posts/doomed.md']) == []
+    assert utils.removed_posts(post_dir='posts', backfill='all') == []
+
+def test_claimed_silo_ids_are_read_from_every_post(checkout, monkeypatch):
+    (checkout / 'posts' / 'marked.md').write_text('---\ntitle: Marked\ndev_silo_id: 42\n---\nBody')
+    utils._git('add', '.')
+    utils._git('commit', '-qm', 'mark')
+    monkeypatch.setenv('GITHUB_SHA', utils._git('rev-parse', 'HEAD').strip())
+    assert utils.claimed_silo_ids('DEV', post_dir='posts') == {42}
+    assert utils.claimed_silo_ids('Medium', post_dir='posts') == set()
+
+def test_removed_posts_leaves_renamed_posts_alone(checkout, monkeypatch):
+    utils._git('mv', 'posts/old.md', 'posts/renamed.md')
+    utils._git('commit', '-qm', 'rename')
+    monkeypatch.setenv('GITHUB_SHA', utils._git('rev-parse', 'HEAD').strip())
+    assert utils.removed_posts(post_dir='posts', backfill=None) == []
+    batches = list(utils.iter_post_batches(post_dir='posts', backfill=None))
+    assert [post.path for post in batches[0]] == ['posts/renamed.md']
+
+def test_removed_posts_reads_removed_posts_in_one_request_over_the_api(monkeypatch):
+    class FakeGraphql:
+        requests = []
+        def read_files(paths, revision=None):
+            FakeGraphql.requests.append((list(paths), revision))
+            return 'parent_sha', {path: f'was {path}' for path in paths}
+    import syndicate.graphql
+    monkeypatch.setattr(syndicate, 'graphql', FakeGraphql)
+    monkeypatch.setattr(utils, 'repo', lambda: SimpleNamespace(get_commit=lambda sha: SimpleNamespace(files=[
+        SimpleNamespace(filename='posts/a.md', sha='a', status='removed'),
+        SimpleNamespace(filename='posts/b.md', sha='b', status='modified'),
+        SimpleNamespace(filename='posts/c.md', sha='c', status='removed'),
+    ])))
+    monkeypatch.setenv('GITHUB_SHA', 'fake_sha')
+    monkeypatch.setenv('SYNDICATE_CONTENT_SOURCE', 'github')
+    posts = utils.removed_posts(post_dir='posts', backfill=None)
+    assert [(post.path, post.decoded_content) for post in posts] == [('posts/a.md', b'was posts/a.md'), ('posts/c.md', b'was posts/c.md')]
+    assert FakeGraphql.requests == [(['posts/a.md', 'posts/c.md'], 'fake_sha^')]
+
+def test_shards_partition_paths_deterministically():
+    paths = [f'posts/{n}.md' for n in range(1000)]
+    shards = [utils.shard_for(f'{n}/8') for n in range(1, 9)]
+    owners = [[shard for shard in shards if utils.in_shard(path, shard)] for path in paths]
+    assert all(len(owner) == 1 for owner in owners)
+    sizes = collections.Counter(owner[0] for owner in owners)
+    assert min(sizes.values()) > 75
+    assert utils.in_shard('posts/1.md', (3, 8)) == utils.in_shard('posts/1.md', utils.shard_for('3/8'))
+
+@pytest.mark.parametrize('spec', ['3', '0/8', '9/8', 'a/b'])
+def test_shard_for_error_when_invalid(spec):
+    with pytest.raises(ValueError):
+        utils.shard_for(spec)
+
+def test_merge_results_merges_silo_by_silo_and_path_by_path():
+    results = {'DEV': {'added': {'a.md': (1, 'a')}, 'modified': {}}}
+    new_results = {'DEV': {'added': {'b.md': (2, 'b')}, 'modified': {}}, 'Medium': {'added': {'a.md': ('x', 'y')}}}
+    assert utils.merge_results(results, new_results) == {
+        'DEV': {'added': {'a.md': (1, 'a'), 'b.md': (2, 'b')}, 'modified': {}},
+        'Medium': {'added': {'a.md': ('x', 'y')}},
+    }
+
+@pytest.fixture
+def instrumentation(monkeypatch):
+    """Starts every test with nothing recorded."""
+    monkeypatch.setattr(utils, '_spans', [])
+    monkeypatch.setattr(utils, '_requests', {})
+    monkeypatch.setattr(utils, '_rate_limits', {})
+
+def test_span_summarises_time_spent_by_phase(instrumentation):
+    with utils.span('outer'):
+        with utils.span('inner'):
+            pass
+        with utils.span('inner'):
+            pass
+    phases = utils.instrumentation()['phases']
+    assert phases['outer']['count'] == 1
+    assert phases['inner']['count'] == 2
+    assert phases['outer']['seconds'] >= phases['inner']['seconds']
+
+def test_action_log_group_records_a_span(instrumentation, capsys):
+    utils.action_log_group('some group')(lambda: utils.action_log('hi'))()
+    assert utils.instrumentation()['phases']['some group']['count'] == 1
+    assert 'took' in capsys.readouterr().out
+
+def test_record_request_tracks_lowest_rate_limit_headroom(instrumentation):
+    utils.record_request('api.github.com', 200, 0.1, {'X-RateLimit-Remaining': '10', 'X-RateLimit-Limit': '5000'})
+    utils.record_request('api.github.com', 200, 0.1, {'x-ratelimit-remaining': '8'})
+    utils.record_request('api.github.com', 503, 0.1, {'X-RateLimit-Remaining': '9'})
+    summary = utils.instrumentation()
+    assert summary['requests']['api.github.com']['count'] == 3
+    assert summary['requests']['api.github.com']['statuses'] == {'200': 2, '503': 1}
+    assert summary['rate_limits']['api.github.com'] == {'remaining': 9, 'lowest': 8, 'limit': 5000}
+
+def test_github_requests_are_recorded_without_touching_pygithubs_logging(instrumentation, requests_mock, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_HTTP_CACHE', 'false')
+    requests_mock.get('https://fake.github:443/repos/fake/repo', json={'full_name': 'fake/repo'})
+    utils._github('token', 'https://fake.github').get_repo('fake/repo')
+    assert utils.instrumentation()['requests']['fake.github']['statuses'] == {'200': 1}
+    logger = utils.logging.getLogger('github.Requester')
+    assert logger.level == utils.logging.NOTSET and logger.propagate
+
+def test_action_setinstrumentation_writes_otlp_trace_when_asked(instrumentation, tmp_path, monkeypatch):
+    monkeypatch.setenv('SYNDICATE_TRACE_FILE', str(tmp_path / 'trace.json'))
+    with utils.span('outer', silo='DEV'):
+        with utils.span('inner'):
+            pass
+    utils.action_setinstrumentation()
+    spans = json.loads((tmp_path / 'trace.json').read_text())['resourceSpans'][0]['scopeSpans'][0]['spans']
+    inner, outer = spans
+    assert inner['parentSpanId'] == outer['spanId']
+    assert 'parentSpanId' not in outer
+    assert outer['attributes'] == [{'key': 'silo', 'value': {'stringValue': 'DEV'}}]
+
+def test_environment_is_kept_to_its_own_context(monkeypatch):
+    monkeypatch.setattr(utils.os, 'environ', utils.os.environ)
+    monkeypatch.setenv('FAKE_VARIABLE', 'global')
+    def _in(value):
+        with utils.environment(FAKE_VARIABLE=value, FAKE_UNSET=None):
+            time.sleep(0.01)
+            utils.os.environ['FAKE_WRITTEN'] = value
+            return concurrently(lambda _: (utils.os.getenv('FAKE_VARIABLE'), utils.os.getenv('FAKE_WRITTEN')), [1])[0]
+    assert concurrently(_in, ['a', 'b']) == [('a', 'a'), ('b', 'b')]
+    assert utils.os.getenv('FAKE_VARIABLE') == 'global'
+    assert utils.os.getenv('FAKE_WRITTEN') is None
+
+def test_environment_is_seen_by_git(checkout, monkeypatch):
+    monkeypatch.setattr(utils.os, 'environ', utils.os.environ)
+    with utils.environment(GIT_AUTHOR_NAME='Contextual', GIT_AUTHOR_EMAIL='fake@fake.email'):
+        assert utils._git('var', 'GIT_AUTHOR_IDENT').startswith('Contextual <fake@fake.email>')
+        commit = utils._git('rev-parse', 'HEAD').strip()
+        assert utils._local_read_at(['posts/old.md'], commit)[0].decoded_content == b'older'
+
+def test_recording_is_kept_to_its_own_context(monkeypatch):
+    monkeypatch.setattr(utils, '_spans', [])
+    with utils.recording():
+        with utils.span('inside'):
+            pass
+        assert list(utils.instrumentation()['phases']) == ['inside']
+    assert utils.instrumentation()['phases'] == {}
+
+def test_job_output_merges_steps_silo_by_silo_and_path_by_path(tmp_path, monkeypatch):
+    monkeypatch.setenv('RUNNER_TEMP', str(tmp_path))
+    utils.job_addoutput({'DEV': {'added': {'a.md': (1, 'a')}, 'modified': {}}})
+    utils.job_addoutput({'DEV': {'modified': {'b.md': (2, 'b')}}, 'Medium': {'added': {'a.md': ('x', 'y')}}})
+    utils.job_addoutput({'DEV': {'added': {'a.md': (3, 'c')}}})
+    assert utils.job_getoutput() == {
+        'DEV': {'added': {'a.md': [3, 'c']}, 'modified': {'b.md': [2, 'b']}},
+        'Medium': {'added': {'a.md': ['x', 'y']}},
+    }
+    assert utils.job_getoutput(['medium']) == {'Medium': {'added': {'a.md': ['x', 'y']}}}
+
+def test_job_getoutput_folds_in_results_of_other_jobs(tmp_path, monkeypatch):
+    shards = tmp_path / 'shards'
+    (shards / '1').mkdir(parents=True)
+    (shards / '1' / 'job-state.jsonl').write_text('["DEV","added","a.md",[1,"a"]]\n')
+    (shards / 'syndicated_posts.json').write_text(json.dumps({'DEV': {'added': {'b.md': [2, 'b']}}}))
+    monkeypatch.setenv('SYNDICATE_MERGE_RESULTS', str(shards / '**' / '*.json*'))
+    monkeypatch.setenv('RUNNER_TEMP', str(tmp_path))
+    utils.job_addoutput({'DEV': {'added': {'a.md': (3, 'c')}}})
+    assert utils.job_getoutput() == {'DEV': {'added': {'a.md': [3, 'c'], 'b.md': [2, 'b']}}}
+
+def test_job_getoutput_returns_nothing_outside_a_job(monkeypatch):
+    monkeypatch.delenv('RUNNER_TEMP', raising=False)
+    utils.job_addoutput({'DEV': {'added': {'a.md': (1, 'a')}}})
+    assert utils.job_getoutput() == {}
+
+def test_importing_utils_leaves_heavy_dependencies_unloaded():
+    loaded = subprocess.run(
+        [sys.executable, '-c', 'import sys, syndicate.utils; print(" ".join(sorted(sys.modules)))'],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    assert not {'github', 'requests', 'frontmatter', 'yaml'} & set(loaded)
+
+def test_blob_shas_only_includes_files_in_the_checkout(checkout):
+    shas = utils.blob_shas(['posts/new.md', 'posts/doomed.md', 'README.md'])
+    assert shas == {
+        'posts/new.md': utils._git_blob_sha(b'new'),
+        'README.md': utils._git_blob_sha(b'readme'),
+    }
+
+def test_state_path_defaults_to_the_runner_temp_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv('SYNDICATE_FAKE_STATE', raising=False)
+    monkeypatch.setenv('RUNNER_TEMP', str(tmp_path))
+    assert utils.state_path('SYNDICATE_FAKE_STATE', 'state.json') == str(tmp_path / 'syndicate' / 'state.json')
+    assert utils.state_path('SYNDICATE_FAKE_STATE') == str(tmp_path / 'syndicate')
+    monkeypatch.setenv('SYNDICATE_FAKE_STATE', '/some/where.json')
+    assert utils.state_path('SYNDICATE_FAKE_STATE', 'state.json') == '/some/where.json'
+    monkeypatch.setenv('SYNDICATE_FAKE_STATE', 'false')
+    assert utils.state_path('SYNDICATE_FAKE_STATE', 'state.json') is None
+    monkeypatch.delenv('SYNDICATE_FAKE_STATE')
+    monkeypatch.delenv('RUNNER_TEMP')
+    assert utils.state_path('SYNDICATE_FAKE_STATE', 'state.json') is None
@@ -0,0 +1,128 @@
+from syndicate import worker
+import hashlib
+import hmac
+import http.server
+import json
+import os
+import pytest
+import requests
+from types import SimpleNamespace
+import threading
+import time
+
+@pytest.fixture(autouse=True)
+def environ(monkeypatch):
+    """Needed to ensure the contextual environment a push is run in doesn't outlive the test."""
+    monkeypatch.setattr(os, 'environ', os.environ)
+
+def _push(repository='herp/derp', ref='refs/heads/main', after='abc123', message='Add a post'):
+    return {
+        'ref': ref,
+        'after': after,
+        'repository': {'full_name': repository, 'default_branch': 'main'},
+        'head_commit': {'message': message},
+    }
+
+def test_dispatcher_handles_events_in_order_per_key_and_concurrently_across_keys():
+    handled = []
+    both_started = threading.Barrier(2, timeout=5)
+    def _handle(event):
+        key, n = event
+        if n == 0:
+            both_started.wait()  # only passes if both keys are handled at once
+        time.sleep(0.01)
+        handled.append(event)
+    dispatcher = worker.Dispatcher(_handle, max_workers=4)
+    for n in range(3):
+        dispatcher.submit('a', ('a', n))
+        dispatcher.submit('b', ('b', n))
+    dispatcher.shutdown()
+    assert [n for key, n in handled if key == 'a'] == [0, 1, 2]
+    assert [n for key, n in handled if key == 'b'] == [0, 1, 2]
+
+def test_dispatcher_carries_on_after_a_failure():
+    handled = []
+    def _handle(event):
+        if event == 'bad':
+            raise ValueError('nope')
+        handled.append(event)
+    dispatcher = worker.Dispatcher(_handle, max_workers=1)
+    dispatcher.submit('a', 'bad')
+    dispatcher.submit('a', 'good')
+    dispatcher.shutdown()
+    assert handled == ['good']
+
+def test_handle_push_runs_in_the_environment_of_the_push(monkeypatch, tmp_path):
+    monkeypatch.setenv('GITHUB_REPOSITORY', 'worker/itself')
+    monkeypatch.setenv('SYNDICATE_SHA', 'worker_sha')
+    monkeypatch.setenv('SYNDICATE_WORKER_DIR', str(tmp_path))
+    monkeypatch.delenv('SYNDICATE_LEDGER', raising=False)
+    monkeypatch.delenv('SYNDICATE_HTTP_CACHE', raising=False)
+    def _run():
+        with open(os.getenv('GITHUB_EVENT_PATH')) as f:
+            event = json.load(f)
+        os.environ['SYNDICATE_SHA'] = 'marked'
+        return (os.getenv('GITHUB_REPOSITORY'), os.getenv('GITHUB_SHA'), os.getenv('SYNDICATE_LEDGER'), os.getenv('SYNDICATE_HTTP_CACHE'), event['after'])
+    assert worker.handle_push(_push(), _run) == (
+        'herp/derp',
+        'abc123',
+        str(tmp_path / 'herp' / 'derp' / 'ledger.json'),
+        str(tmp_path / 'http-cache'),
+        'abc123',
+    )
+    assert os.getenv('GITHUB_REPOSITORY') == 'worker/itself'
+    assert os.getenv('SYNDICATE_SHA') == 'worker_sha'
+
+def test_handle_push_ignores_pushes_not_to_syndicate():
+    def _run():
+        raise AssertionError('should not run')
+    assert worker.handle_push(_push(ref='refs/heads/feature'), _run) is None
+    assert worker.handle_push(_push(after='0' * 40), _run) is None
+    assert worker.handle_push(_push(message="(syndicate): adding IDs for {'DEV'}"), _run) is None
+
+def test_poll_claims_events_and_cleans_up_after_them(tmp_path):
+    (tmp_path / 'good.json').write_text(json.dumps(_push()))
+    (tmp_path / 'bad.json').write_text(json.dumps(_push(repository='herp/broken')))
+    (tmp_path / 'unreadable.json').write_text('{')
+    def _run():
+        if os.getenv('GITHUB_REPOSITORY') == 'herp/broken':
+            raise ValueError('nope')
+    dispatcher = worker.Dispatcher(lambda event: worker.handle(event, _run), max_workers=2)
+    assert worker.poll(dispatcher, str(tmp_path)) == 2
+    dispatcher.shutdown()
+    assert sorted(os.listdir(tmp_path / 'failed')) == ['bad.json', 'unreadable.json']
+    assert os.listdir(tmp_path / 'processing') == []
+    assert not (tmp_path / 'good.json').exists()
+
+def test_verify_checks_signatures_against_the_secret(monkeypatch):
+    body = b'{"zen": "Keep it logically awesome."}'
+    monkeypatch.delenv('SYNDICATE_WEBHOOK_SECRET', raising=False)
+    assert not worker.verify(body, None)
+    assert not worker.verify(body, 'sha256=' + hmac.new(b'', body, hashlib.sha256).hexdigest())
+    monkeypatch.setenv('SYNDICATE_WEBHOOK_SECRET', 'sekrit')
+    signature = 'sha256=' + hmac.new(b'sekrit', body, hashlib.sha256).hexdigest()
+    assert worker.verify(body, signature)
+    assert not worker.verify(body, 'sha256=forged')
+    assert not worker.verify(body, None)
+
+def test_serve_refuses_to_start_without_a_secret(monkeypatch):
+    monkeypatch.delenv('SYNDICATE_WEBHOOK_SECRET', raising=False)
+    with pytest.raises(ValueError):
+        worker.serve(worker.Dispatcher(lambda event: None, max_workers=1), port=0)
+
+def test_unsigned_webhooks_are_rejected_without_a_secret(monkeypatch):
+    monkeypatch.delenv('SYNDICATE_WEBHOOK_SECRET', raising=False)
+    submitted = []
+    dispatcher = SimpleNamespace(submit=lambda key, event: submitted.append(key))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), worker.handler_for(dispatcher))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        response = requests.post(
+            f'http://127.0.0.1:{server.server_port}/',
+            data=json.dumps(_push(repository='someone/else')),
+            headers={'X-GitHub-Event': 'push'})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.status_code == 401
+    assert submitted == []
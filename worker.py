@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Syndicates the pushes to any number of repositories as they happen, without
+starting the action afresh for each of them: either as Github webhooks arrive
+over HTTP, or as push event payloads are dropped into a queue directory.
+
+    SYNDICATE_WEBHOOK_SECRET=... worker.py --silos DEV --mark-as-syndicated --port 8080
+    worker.py --silos DEV --queue /var/spool/syndicate
+"""
+import argparse
+import os
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--silos', nargs='+', required=True, help='silos to syndicate to, as for the action')
+    parser.add_argument('--mark-as-syndicated', action='store_true', help='mark newly syndicated posts, as for the action')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen for webhooks on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8080, help='port to listen for webhooks on (default: %(default)s)')
+    parser.add_argument('--queue', help='watch this directory for push events instead of listening for webhooks')
+    parser.add_argument('--threads', type=int, help='pushes to handle at once (default: SYNDICATE_WORKER_THREADS, or 4)')
+    args = parser.parse_args(argv)
+
+    # NOTE The action reads its inputs from the environment when it's loaded.
+    os.environ['INPUT_SILOS'] = '\n'.join(args.silos)
+    os.environ['INPUT_MARK_AS_SYNDICATED'] = 'true' if args.mark_as_syndicated else 'false'
+    import entrypoint
+    from syndicate import worker
+
+    dispatcher = worker.Dispatcher(lambda event: worker.handle(event, entrypoint.main), max_workers=args.threads)
+    try:
+        if args.queue:
+            worker.watch(dispatcher, args.queue)
+        else:
+            worker.serve(dispatcher, args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispatcher.shutdown()
+
+if __name__ == '__main__':
+    main()